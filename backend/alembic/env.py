@@ -15,6 +15,13 @@ from app import models
 
 target_metadata = Base.metadata
 
+# Database-only objects that are deliberately not mapped in app.models (see migration 003).
+UNMAPPED_OBJECTS = {"search_vector", "ix_books_search_vector"}
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    return not (reflected and name in UNMAPPED_OBJECTS)
+
 
 def get_url():
     url = os.getenv("DB_URL") or settings.db_url
@@ -29,6 +36,7 @@ def run_migrations_offline():
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
+        include_object=include_object,
         dialect_opts={"paramstyle": "named"},
     )
     with context.begin_transaction():
@@ -44,7 +52,7 @@ def run_migrations_online():
         poolclass=pool.NullPool,
     )
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
         with context.begin_transaction():
             context.run_migrations()
 
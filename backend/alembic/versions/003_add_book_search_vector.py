@@ -0,0 +1,35 @@
+"""add book full-text search vector
+
+Revision ID: 003
+Revises: 002
+Create Date: 2025-03-01
+
+"""
+from alembic import op
+
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Generated column, so every write keeps it current without application code. Not mapped
+    # in app.models (SQLite has no tsvector); app.search reads it with literal SQL.
+    op.execute(
+        """
+        ALTER TABLE books ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(author, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(genre, '')), 'C') ||
+            setweight(to_tsvector('english', coalesce(summary, '')), 'D')
+        ) STORED
+        """
+    )
+    op.create_index("ix_books_search_vector", "books", ["search_vector"], postgresql_using="gin")
+
+
+def downgrade():
+    op.drop_index("ix_books_search_vector", table_name="books")
+    op.drop_column("books", "search_vector")
@@ -0,0 +1,54 @@
+"""add catalog facet counts and book filter indexes
+
+Revision ID: 004
+Revises: 003
+Create Date: 2025-03-08
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "catalog_facet_counts",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("facet", sa.String(50), nullable=False),
+        sa.Column("value", sa.String(255), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False, server_default="0"),
+        sa.UniqueConstraint("facet", "value", name="uq_catalog_facet_counts_facet_value"),
+    )
+    op.create_index("ix_catalog_facet_counts_id", "catalog_facet_counts", ["id"], unique=False)
+    op.create_index(
+        "ix_catalog_facet_counts_top", "catalog_facet_counts", ["facet", sa.text("count DESC"), "value"], unique=False
+    )
+    op.create_index("ix_books_genre", "books", ["genre"], unique=False)
+    op.create_index("ix_books_author", "books", ["author"], unique=False)
+    op.create_index("ix_books_added_by_user_id", "books", ["added_by_user_id"], unique=False)
+
+    # Backfill from the existing catalogue; from here on the API keeps the counts current.
+    op.execute(
+        """
+        INSERT INTO catalog_facet_counts (facet, value, count)
+        SELECT 'genre', genre, count(*) FROM books WHERE genre IS NOT NULL AND genre <> '' GROUP BY genre
+        UNION ALL
+        SELECT 'author', author, count(*) FROM books WHERE author IS NOT NULL AND author <> '' GROUP BY author
+        UNION ALL
+        SELECT 'has_summary', CASE WHEN coalesce(length(summary), 0) > 0 THEN 'true' ELSE 'false' END, count(*)
+        FROM books GROUP BY CASE WHEN coalesce(length(summary), 0) > 0 THEN 'true' ELSE 'false' END
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_books_added_by_user_id", table_name="books")
+    op.drop_index("ix_books_author", table_name="books")
+    op.drop_index("ix_books_genre", table_name="books")
+    op.drop_index("ix_catalog_facet_counts_top", table_name="catalog_facet_counts")
+    op.drop_index("ix_catalog_facet_counts_id", table_name="catalog_facet_counts")
+    op.drop_table("catalog_facet_counts")
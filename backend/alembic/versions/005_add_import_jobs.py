@@ -0,0 +1,37 @@
+"""add import jobs
+
+Revision ID: 005
+Revises: 004
+Create Date: 2025-03-15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "import_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=True),
+        sa.Column("source_name", sa.String(255), nullable=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="running"),
+        sa.Column("rows_done", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("books_created", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("files_uploaded", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rows_invalid", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_import_jobs_id", "import_jobs", ["id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_import_jobs_id", table_name="import_jobs")
+    op.drop_table("import_jobs")
@@ -0,0 +1,53 @@
+"""add per-book rating stats
+
+Revision ID: 006
+Revises: 005
+Create Date: 2025-03-22
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "book_stats",
+        sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("rating_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_sum", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_average", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("rating_1", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_2", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_3", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_4", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("rating_5", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_book_stats_rating_count", "book_stats", ["rating_count"], unique=False)
+    op.create_index("ix_book_stats_rating_average", "book_stats", ["rating_average"], unique=False)
+
+    # Backfill from existing reviews; `python -m app.cli backfill-stats` does the same later.
+    op.execute(
+        """
+        INSERT INTO book_stats (book_id, rating_count, rating_sum, rating_average,
+                                rating_1, rating_2, rating_3, rating_4, rating_5)
+        SELECT book_id, count(*), sum(rating), sum(rating) * 1.0 / count(*),
+               sum(CASE WHEN rating = 1 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 2 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 3 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 4 THEN 1 ELSE 0 END),
+               sum(CASE WHEN rating = 5 THEN 1 ELSE 0 END)
+        FROM reviews WHERE rating BETWEEN 1 AND 5 GROUP BY book_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_book_stats_rating_average", table_name="book_stats")
+    op.drop_index("ix_book_stats_rating_count", table_name="book_stats")
+    op.drop_table("book_stats")
@@ -0,0 +1,44 @@
+"""add decayed popularity counters and trending top-K
+
+Revision ID: 007
+Revises: 006
+Create Date: 2025-03-24
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "book_popularity",
+        sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("borrow_score", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("review_score", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_table(
+        "trending_books",
+        sa.Column("rank", sa.Integer(), primary_key=True),
+        sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+    op.create_table(
+        "trending_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("decayed_at", sa.DateTime(), nullable=False),
+    )
+    # The counters and top-K are filled from the borrow/review history by
+    # `python -m app.cli refresh-trending --rebuild` (decay depends on TRENDING_HALF_LIFE_HOURS).
+
+
+def downgrade():
+    op.drop_table("trending_state")
+    op.drop_table("trending_books")
+    op.drop_table("book_popularity")
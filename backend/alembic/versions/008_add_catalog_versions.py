@@ -0,0 +1,30 @@
+"""add book and catalogue version counters for ETags
+
+Revision ID: 008
+Revises: 007
+Create Date: 2025-03-26
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("books", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    op.create_table(
+        "catalog_state",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.execute("INSERT INTO catalog_state (id, version) VALUES (1, 1)")
+
+
+def downgrade():
+    op.drop_table("catalog_state")
+    op.drop_column("books", "version")
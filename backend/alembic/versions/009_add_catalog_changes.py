@@ -0,0 +1,39 @@
+"""add catalogue change log
+
+Revision ID: 009
+Revises: 008
+Create Date: 2025-03-27
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "catalog_changes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("book_id", sa.Integer(), nullable=True),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+    )
+    op.create_index("ix_catalog_changes_version", "catalog_changes", ["version"], unique=True)
+    op.create_index("ix_catalog_changes_book_id", "catalog_changes", ["book_id"], unique=False)
+    op.create_index("ix_catalog_changes_created_at", "catalog_changes", ["created_at"], unique=False)
+    # Version 1 (migration 008) stands for the catalogue as it was before the feed existed, which
+    # the feed cannot replay, so readers from since=0 get 410 and reload. With no books there is
+    # nothing to replay: start at 0, so a new client can follow the feed from since=0.
+    op.execute("UPDATE catalog_state SET version = 0 WHERE id = 1 AND NOT EXISTS (SELECT 1 FROM books)")
+
+
+def downgrade():
+    op.drop_index("ix_catalog_changes_created_at", table_name="catalog_changes")
+    op.drop_index("ix_catalog_changes_book_id", table_name="catalog_changes")
+    op.drop_index("ix_catalog_changes_version", table_name="catalog_changes")
+    op.drop_table("catalog_changes")
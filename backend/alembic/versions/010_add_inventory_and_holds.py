@@ -0,0 +1,72 @@
+"""add book inventory, holds and the one-active-borrow index
+
+Revision ID: 010
+Revises: 009
+Create Date: 2025-03-29
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "book_inventory",
+        sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("total_copies", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("available_copies", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.text("now()"), nullable=True),
+        sa.CheckConstraint(
+            "available_copies >= 0 AND available_copies <= total_copies", name="ck_book_inventory_available"
+        ),
+    )
+    op.create_table(
+        "holds",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("book_id", sa.Integer(), sa.ForeignKey("books.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False),
+        sa.UniqueConstraint("user_id", "book_id", name="uq_holds_user_book"),
+    )
+    op.create_index("ix_holds_book_queue", "holds", ["book_id", "created_at", "id"], unique=False)
+
+    # The old SELECT-then-INSERT borrow could race into duplicate active loans: keep the first of each
+    op.execute(
+        """
+        UPDATE borrows SET returned_at = COALESCE(borrowed_at, CURRENT_TIMESTAMP)
+        WHERE returned_at IS NULL AND EXISTS (
+            SELECT 1 FROM borrows earlier
+            WHERE earlier.user_id = borrows.user_id AND earlier.book_id = borrows.book_id
+              AND earlier.returned_at IS NULL AND earlier.id < borrows.id
+        )
+        """
+    )
+    op.create_index(
+        "uq_borrows_active", "borrows", ["user_id", "book_id"], unique=True,
+        postgresql_where=sa.text("returned_at IS NULL"),
+    )
+
+    # One copy per book, or as many as are on loan now; app.inventory.ensure_inventory does the same
+    op.execute(
+        """
+        INSERT INTO book_inventory (book_id, total_copies, available_copies)
+        SELECT id, GREATEST(1, active), GREATEST(1, active) - active
+        FROM (
+            SELECT books.id, (SELECT count(*) FROM borrows
+                              WHERE borrows.book_id = books.id AND borrows.returned_at IS NULL) AS active
+            FROM books
+        ) AS loans
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("uq_borrows_active", table_name="borrows")
+    op.drop_index("ix_holds_book_queue", table_name="holds")
+    op.drop_table("holds")
+    op.drop_table("book_inventory")
@@ -0,0 +1,24 @@
+"""add per-user history indexes on borrows and reviews
+
+Revision ID: 011
+Revises: 010
+Create Date: 2025-03-30
+
+"""
+from alembic import op
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /me/borrows and /me/reviews page newest first by (time, id) within one user
+    op.create_index("ix_borrows_user_history", "borrows", ["user_id", "borrowed_at", "id"], unique=False)
+    op.create_index("ix_reviews_user_history", "reviews", ["user_id", "created_at", "id"], unique=False)
+
+
+def downgrade():
+    op.drop_index("ix_reviews_user_history", table_name="reviews")
+    op.drop_index("ix_borrows_user_history", table_name="borrows")
@@ -0,0 +1,117 @@
+"""TF-IDF vectors of the catalogue, shared by all worker processes.
+
+The matrix behind content-based recommendations and similar books used to be refit on every
+request. It is now built once per catalogue version, published through `app/shared_state.py`
+and memory-mapped by each worker; a worker rebuilds its view only when `catalog_version`
+moves. Rows are L2-normalised, so cosine similarity is a dot product.
+"""
+import asyncio
+from dataclasses import dataclass, field
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import shared_state
+from app.catalog import catalog_version
+from app.models import Book
+from app.profiling import span
+from app.recommendation_ml import MAX_BOOKS_FOR_ML, book_text
+
+ARTEFACT = "book-vectors"
+
+
+@dataclass
+class BookVectors:
+    version: int
+    book_ids: np.ndarray
+    matrix: csr_matrix
+    _rows: dict[int, int] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self._rows = {int(book_id): i for i, book_id in enumerate(self.book_ids)}
+
+    @classmethod
+    def from_arrays(cls, version: int, arrays: shared_state.Arrays) -> "BookVectors":
+        shape = tuple(int(n) for n in arrays["shape"])
+        matrix = csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=shape, copy=False)
+        return cls(version, arrays["book_ids"], matrix)
+
+    def __len__(self) -> int:
+        return len(self.book_ids)
+
+    def similar(self, book_id: int, limit: int) -> list[tuple[int, float]]:
+        """(book id, cosine similarity) of the books most like book_id, best first; [] if it has no vector."""
+        row = self._rows.get(book_id)
+        if row is None or len(self) < 2 or self.matrix.shape[1] == 0:
+            return []
+        sims = (self.matrix[row] @ self.matrix.T).toarray().ravel()
+        out = []
+        for i in np.argsort(-sims):
+            if i == row or sims[i] <= 0:
+                continue
+            out.append((int(self.book_ids[i]), float(sims[i])))
+            if len(out) >= limit:
+                break
+        return out
+
+    def similarity_to(self, book_ids: set[int]) -> dict[int, float]:
+        """Cosine similarity of every other book to the mean vector of book_ids."""
+        rows = [self._rows[b] for b in book_ids if b in self._rows]
+        if not rows or self.matrix.shape[1] == 0:
+            return {}
+        profile = np.asarray(self.matrix[rows].mean(axis=0))
+        sims = cosine_similarity(profile, self.matrix).ravel()
+        return {int(b): float(s) for b, s in zip(self.book_ids, sims) if int(b) not in book_ids}
+
+
+def _build(rows: list) -> shared_state.Arrays:
+    ids = np.array([r.id for r in rows], dtype=np.int64)
+    matrix = csr_matrix((len(rows), 0), dtype=np.float64)
+    if rows:
+        with span("ml", "tfidf_fit", f"{len(rows)} books"):
+            try:
+                vectorizer = TfidfVectorizer(max_features=200, stop_words="english", min_df=1)
+                matrix = csr_matrix(vectorizer.fit_transform([book_text(r) for r in rows]), dtype=np.float64)
+            except ValueError:  # empty vocabulary, e.g. only stop words
+                pass
+    return {
+        "book_ids": ids,
+        "data": matrix.data,
+        "indices": matrix.indices.astype(np.int32),
+        "indptr": matrix.indptr.astype(np.int32),
+        "shape": np.array(matrix.shape, dtype=np.int64),
+    }
+
+
+_current: BookVectors | None = None
+_lock = asyncio.Lock()
+
+
+async def get_book_vectors(db: AsyncSession) -> BookVectors:
+    """Vectors of the newest MAX_BOOKS_FOR_ML books at the current catalogue version."""
+    global _current
+    version = await catalog_version(db)
+    if _current is not None and _current.version == version:
+        return _current
+    async with _lock:
+        if _current is None or _current.version != version:
+            arrays = shared_state.load(ARTEFACT, version)
+            if arrays is None:
+                columns = (Book.id, Book.title, Book.author, Book.genre, Book.summary)
+                result = await db.execute(
+                    select(*columns).order_by(Book.created_at.desc(), Book.id.desc()).limit(MAX_BOOKS_FOR_ML)
+                )
+                rows = result.all()
+                arrays = await asyncio.to_thread(shared_state.load_or_build, ARTEFACT, version, lambda: _build(rows))
+            _current = BookVectors.from_arrays(version, arrays)
+    return _current
+
+
+def reset() -> None:
+    """Forget this process's mapped vectors (the shared files are left alone)."""
+    global _current
+    _current = None
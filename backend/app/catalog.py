@@ -0,0 +1,95 @@
+"""Catalogue versions and change feed.
+
+Every catalogue write appends to `catalog_changes` in the same transaction as the change, one
+row per affected book, each with the next value of the `catalog_state` version. Advancing the
+version is an UPDATE of that single row, which is held locked until commit, so versions become
+visible in order and a reader that has seen version N has seen every change up to N. That
+makes "what changed since N?" an indexed range scan (`changes_since`, `GET /changes`) and
+"has anything changed?" a primary-key lookup (`catalog_version`).
+
+Books also carry their own `version`, bumped by `touch_book`, so a book's cached responses
+can be validated without depending on unrelated writes (`app/http_cache.py`).
+"""
+from datetime import datetime
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import upsert_insert
+from app.models import Book, CatalogChange, CatalogState
+
+CHANGE_KINDS = ("created", "updated", "deleted", "summary", "analysis", "review")
+
+
+async def catalog_version(db: AsyncSession) -> int:
+    version = (await db.execute(select(CatalogState.version).where(CatalogState.id == 1))).scalar_one_or_none()
+    return version or 0
+
+
+async def _advance(db: AsyncSession, n: int) -> int:
+    """Add n to the catalogue version and return the new value."""
+    insert_ = upsert_insert(db)
+    if insert_ is not None:
+        stmt = insert_(CatalogState).values(id=1, version=n)
+        stmt = stmt.on_conflict_do_update(index_elements=["id"], set_={"version": CatalogState.version + n})
+        return (await db.execute(stmt.returning(CatalogState.version))).scalar_one()
+    result = await db.execute(update(CatalogState).where(CatalogState.id == 1).values(version=CatalogState.version + n))
+    if result.rowcount == 0:
+        await db.execute(insert(CatalogState).values(id=1, version=n))
+    return await catalog_version(db)
+
+
+async def record_changes(db: AsyncSession, kind: str, book_ids: list[int | None]) -> int:
+    """Log one change per book and return the new catalogue version. Does not commit."""
+    if kind not in CHANGE_KINDS:
+        raise ValueError(f"Unknown change kind {kind!r}")
+    if not book_ids:
+        return await catalog_version(db)
+    version = await _advance(db, len(book_ids))
+    first = version - len(book_ids) + 1
+    now = datetime.utcnow()
+    rows = [
+        {"version": first + i, "book_id": book_id, "kind": kind, "created_at": now} for i, book_id in enumerate(book_ids)
+    ]
+    await db.execute(insert(CatalogChange), rows)
+    return version
+
+
+async def record_change(db: AsyncSession, kind: str, book_id: int | None = None) -> int:
+    return await record_changes(db, kind, [book_id])
+
+
+async def touch_book(db: AsyncSession, book_id: int, kind: str = "updated") -> int:
+    """Bump the book's own version and log the change. Does not commit."""
+    await db.execute(update(Book).where(Book.id == book_id).values(version=Book.version + 1))
+    return await record_change(db, kind, book_id)
+
+
+async def oldest_change_version(db: AsyncSession) -> int | None:
+    return (await db.execute(select(func.min(CatalogChange.version)))).scalar()
+
+
+async def changes_since(db: AsyncSession, since: int, limit: int) -> list[CatalogChange]:
+    result = await db.execute(
+        select(CatalogChange).where(CatalogChange.version > since).order_by(CatalogChange.version).limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+async def history_complete_since(db: AsyncSession, since: int) -> bool:
+    """False when entries after `since` have been pruned, so a reader at `since` must resync."""
+    oldest = await oldest_change_version(db)
+    if oldest is None:
+        return since >= await catalog_version(db)
+    return oldest <= since + 1
+
+
+async def prune_changes(db: AsyncSession, before: datetime) -> int:
+    """Delete entries logged before `before`; the newest entry is always kept. Does not commit."""
+    newest = (await db.execute(select(func.max(CatalogChange.version)))).scalar()
+    if newest is None:
+        return 0
+    result = await db.execute(
+        delete(CatalogChange).where(CatalogChange.created_at < before, CatalogChange.version < newest)
+    )
+    return result.rowcount
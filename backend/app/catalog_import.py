@@ -0,0 +1,254 @@
+"""Bulk catalogue import from CSV or NDJSON metadata plus an optional zip of book files.
+
+Records are read from the stream a batch at a time (`import_batch_size`). For each batch the
+referenced files are uploaded to storage with at most `import_upload_concurrency` uploads in
+flight, the books are written with multi-row INSERTs and the facet counts with one statement
+per changed value, and the batch commits together with the job's `rows_done` watermark.
+A run that fails part-way leaves every earlier batch committed; re-running with the same
+job id skips the committed rows. Storage keys are derived from the job id and row number,
+so files re-uploaded by a resumed run overwrite their earlier copies.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+import zipfile
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from itertools import islice
+from types import SimpleNamespace
+from typing import IO, Iterator
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog import record_changes
+from app.config import settings
+from app.facets import apply_facet_deltas, facet_deltas, facet_values
+from app.http_cache import invalidate_catalog
+from app.models import Book, ImportJob
+from app.storage.base import StorageBackend
+from app.summarization import MIN_CONTENT_LENGTH
+from app.tasks import SummaryItem
+
+FORMATS = ("csv", "ndjson")
+MAX_REPORTED_ERRORS = 20
+FIELD_LIMITS = {"title": 500, "author": 255, "genre": 100}
+
+# (row number, normalised record or None, error or None)
+Row = tuple[int, dict | None, str | None]
+
+
+class CatalogImportError(Exception):
+    """The import cannot start, e.g. unknown metadata format or unreadable archive."""
+
+
+def detect_format(filename: str | None, declared: str | None = None) -> str:
+    fmt = (declared or "").lower() or os.path.splitext(filename or "")[1].lstrip(".").lower()
+    fmt = "ndjson" if fmt in ("jsonl", "json") else fmt
+    if fmt not in FORMATS:
+        raise CatalogImportError("Metadata must be CSV or NDJSON (set format=csv or format=ndjson)")
+    return fmt
+
+
+def _normalize(raw: dict) -> tuple[dict | None, str | None]:
+    if not isinstance(raw, dict):
+        return None, "record is not an object"
+    record = {}
+    for key in ("title", "author", "genre", "summary", "file"):
+        value = raw.get(key)
+        value = str(value).strip() if value is not None else ""
+        record[key] = value or None
+    if not record["title"]:
+        return None, "title is required"
+    for key, limit in FIELD_LIMITS.items():
+        if record[key] and len(record[key]) > limit:
+            return None, f"{key} is longer than {limit} characters"
+    return record, None
+
+
+def iter_rows(stream: IO[str], fmt: str) -> Iterator[Row]:
+    """Yield every data row of the metadata, numbered from 1, invalid rows included."""
+    if fmt == "csv":
+        for n, raw in enumerate(csv.DictReader(stream), start=1):
+            record, error = _normalize({k.strip().lower(): v for k, v in raw.items() if k})
+            yield n, record, error
+        return
+    n = 0
+    for line in stream:
+        if not line.strip():
+            continue
+        n += 1
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            yield n, None, f"invalid JSON: {e}"
+            continue
+        record, error = _normalize(raw)
+        yield n, record, error
+
+
+def open_metadata(fileobj: IO[bytes]) -> IO[str]:
+    return io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+
+
+def open_archive(fileobj: IO[bytes] | None) -> zipfile.ZipFile | None:
+    if fileobj is None:
+        return None
+    try:
+        return zipfile.ZipFile(fileobj)
+    except zipfile.BadZipFile:
+        raise CatalogImportError("Files archive must be a zip file") from None
+
+
+def _read_member(archive: zipfile.ZipFile, name: str) -> bytes | None:
+    name = name.removeprefix("./")
+    try:
+        return archive.read(name)
+    except KeyError:
+        return None
+
+
+@dataclass
+class ImportReport:
+    job_id: int
+    status: str = "running"
+    rows_processed: int = 0
+    rows_skipped: int = 0  # already committed by an earlier run of the job
+    rows_invalid: int = 0
+    books_created: int = 0
+    files_uploaded: int = 0
+    summaries_queued: int = 0
+    elapsed_seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: list[str] = field(default_factory=list)
+    error: str | None = None
+    summary_items: list[SummaryItem] = field(default_factory=list, repr=False)
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data.pop("summary_items")
+        return data
+
+    def add_error(self, row: int, message: str) -> None:
+        self.rows_invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f"row {row}: {message}")
+
+
+async def _upload_batch(
+    storage: StorageBackend,
+    archive: zipfile.ZipFile | None,
+    job_id: int,
+    rows: list[tuple[int, dict]],
+    report: ImportReport,
+) -> dict[int, tuple[str, str, int]]:
+    """Upload the files of a batch; returns row -> (storage key, file name, size). Rows with a missing file are dropped."""
+    sem = asyncio.Semaphore(max(1, settings.import_upload_concurrency))
+    uploaded: dict[int, tuple[str, str, int]] = {}
+
+    async def one(n: int, name: str):
+        async with sem:
+            content = await asyncio.to_thread(_read_member, archive, name) if archive else None
+            if content is None:
+                return
+            file_name = os.path.basename(name)
+            ext = file_name.split(".")[-1] if "." in file_name else "bin"
+            key = f"books/import-{job_id}-{n}.{ext}"
+            await storage.put(key, io.BytesIO(content))
+            uploaded[n] = (key, file_name, len(content))
+
+    await asyncio.gather(*(one(n, r["file"]) for n, r in rows if r["file"]))
+    for n, record in rows:
+        if record["file"] and n not in uploaded:
+            report.add_error(n, f"file {record['file']!r} not found in archive")
+    return uploaded
+
+
+async def run_import(
+    db: AsyncSession,
+    storage: StorageBackend,
+    rows: Iterator[Row],
+    job: ImportJob,
+    archive: zipfile.ZipFile | None = None,
+    batch_size: int | None = None,
+) -> ImportReport:
+    """Import rows into the catalogue under job, resuming after job.rows_done. Commits per batch."""
+    batch_size = max(1, batch_size or settings.import_batch_size)
+    report = ImportReport(job_id=job.id)
+    job.status, job.error = "running", None
+    await db.commit()
+    start = time.perf_counter()
+    try:
+        while True:
+            batch = await asyncio.to_thread(lambda: list(islice(rows, batch_size)))
+            if not batch:
+                break
+            report.rows_processed += len(batch)
+            invalid_before = report.rows_invalid
+            pending: list[tuple[int, dict]] = []
+            for n, record, error in batch:
+                if n <= job.rows_done:
+                    report.rows_skipped += 1
+                elif error:
+                    report.add_error(n, error)
+                else:
+                    pending.append((n, record))
+            uploaded = await _upload_batch(storage, archive, job.id, pending, report)
+            pending = [(n, r) for n, r in pending if not r["file"] or n in uploaded]
+            now = datetime.utcnow()
+            values = []
+            deltas: Counter = Counter()
+            for n, record in pending:
+                key, file_name, _ = uploaded.get(n, (None, None, 0))
+                row = {
+                    "title": record["title"],
+                    "author": record["author"],
+                    "genre": record["genre"],
+                    "summary": record["summary"],
+                    "file_path": key,
+                    "file_name": file_name,
+                    "added_by_user_id": job.user_id,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                deltas.update(facet_deltas(facet_values(None), facet_values(SimpleNamespace(**row))))
+                values.append(row)
+            book_ids = []
+            if values:
+                # Core insert on the table: executemany batches these into multi-row INSERT ... RETURNING.
+                books = Book.__table__
+                result = await db.execute(insert(books).returning(books.c.id, sort_by_parameter_order=True), values)
+                book_ids = list(result.scalars().all())
+            await apply_facet_deltas(db, deltas)
+            await record_changes(db, "created", book_ids)
+            job.rows_done = batch[-1][0]
+            job.books_created += len(book_ids)
+            job.files_uploaded += len(uploaded)
+            job.rows_invalid += report.rows_invalid - invalid_before
+            await db.commit()
+            if book_ids:
+                invalidate_catalog()
+            report.books_created += len(book_ids)
+            report.files_uploaded += len(uploaded)
+            for book_id, (n, record) in zip(book_ids, pending):
+                if n in uploaded and not record["summary"] and uploaded[n][2] >= MIN_CONTENT_LENGTH:
+                    key, file_name, _ = uploaded[n]
+                    report.summary_items.append((book_id, key, file_name))
+        job.status = "done"
+        await db.commit()
+    except Exception as e:
+        await db.rollback()
+        job = await db.get(ImportJob, report.job_id)
+        job.status, job.error = "failed", str(e)[:2000]
+        await db.commit()
+        report.error = job.error
+    report.status = job.status
+    report.summaries_queued = len(report.summary_items)
+    report.elapsed_seconds = round(time.perf_counter() - start, 3)
+    done = report.rows_processed - report.rows_skipped
+    report.rows_per_second = round(done / report.elapsed_seconds, 1) if report.elapsed_seconds else 0.0
+    return report
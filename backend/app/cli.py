@@ -0,0 +1,191 @@
+"""Command-line catalogue tools. Run from the backend directory:
+
+    python -m app.cli import-books books.csv --files books.zip --user-email librarian@example.com
+    python -m app.cli import-books books.csv --files books.zip --job-id 12   # resume a failed import
+    python -m app.cli export --out-dir snapshots/2025-03-20 --format parquet --state snapshots/watermarks.json
+    python -m app.cli backfill-stats
+    python -m app.cli refresh-trending --rebuild
+    python -m app.cli prune-changes --older-than-days 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+
+async def _import_books(args) -> int:
+    from app.catalog_import import (
+        CatalogImportError,
+        detect_format,
+        iter_rows,
+        open_archive,
+        open_metadata,
+        run_import,
+    )
+    from app.db import SessionLocal
+    from app.deps import get_storage
+    from app.models import ImportJob, User
+    from app.tasks import summarize_stored_books
+
+    archive_file = None
+    try:
+        try:
+            fmt = detect_format(args.metadata, args.format)
+            archive_file = open(args.files, "rb") if args.files else None
+            archive = open_archive(archive_file)
+        except (CatalogImportError, OSError) as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 2
+        async with SessionLocal() as db:
+            user_id = None
+            if args.user_email:
+                user_id = (await db.execute(select(User.id).where(User.email == args.user_email))).scalar_one_or_none()
+                if user_id is None:
+                    print(f"error: no user with email {args.user_email}", file=sys.stderr)
+                    return 2
+            if args.job_id:
+                job = await db.get(ImportJob, args.job_id)
+                if job is None:
+                    print(f"error: no import job {args.job_id}", file=sys.stderr)
+                    return 2
+            else:
+                job = ImportJob(user_id=user_id, source_name=args.metadata)
+                db.add(job)
+                await db.commit()
+            with open(args.metadata, "rb") as f:
+                report = await run_import(
+                    db, get_storage(), iter_rows(open_metadata(f), fmt), job, archive=archive, batch_size=args.batch_size
+                )
+        print(json.dumps(report.as_dict(), indent=2))
+        if report.summary_items and not args.no_summaries:
+            print(f"Summarising {len(report.summary_items)} books...", file=sys.stderr)
+            await summarize_stored_books(report.summary_items)
+        return 0 if report.status == "done" else 1
+    finally:
+        if archive_file:
+            archive_file.close()
+
+
+async def _export(args) -> int:
+    from app.db import SessionLocal
+    from app.export import (
+        EXPORT_TABLES,
+        ExportError,
+        check_format,
+        current_watermark,
+        get_export_table,
+        stream_export,
+    )
+
+    try:
+        check_format(args.format)
+        tables = {name: get_export_table(name) for name in (args.tables or EXPORT_TABLES)}
+    except ExportError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    state: dict[str, str] = {}
+    if args.state and os.path.exists(args.state) and not args.full:
+        with open(args.state) as f:
+            state = json.load(f)
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name, table in tables.items():
+        since = datetime.fromisoformat(state[name]) if name in state else None
+        path = os.path.join(args.out_dir, f"{name}.{args.format}")
+        async with SessionLocal() as db:
+            until = await current_watermark(db, table, since)
+            size = 0
+            with open(path, "wb") as out:
+                async for chunk in stream_export(db, name, args.format, since=since, until=until):
+                    out.write(chunk)
+                    size += len(chunk)
+        if until is not None:
+            state[name] = until.isoformat()
+        print(f"{name}: {size} bytes -> {path} (watermark {state.get(name)})", file=sys.stderr)
+    if args.state:
+        os.makedirs(os.path.dirname(os.path.abspath(args.state)), exist_ok=True)
+        with open(args.state, "w") as f:
+            json.dump(state, f, indent=2)
+    return 0
+
+
+async def _backfill_stats(args) -> int:
+    from app.db import SessionLocal
+    from app.stats import rebuild_book_stats
+
+    async with SessionLocal() as db:
+        books = await rebuild_book_stats(db)
+        await db.commit()
+    print(f"Rebuilt rating stats for {books} books", file=sys.stderr)
+    return 0
+
+
+async def _refresh_trending(args) -> int:
+    from app.db import SessionLocal
+    from app.trending import rebuild_popularity, refresh_trending
+
+    async with SessionLocal() as db:
+        count = await (rebuild_popularity(db) if args.rebuild else refresh_trending(db))
+        await db.commit()
+    if count is None:
+        print("Another refresh is running; nothing done", file=sys.stderr)
+        return 1
+    print(f"{count} trending books", file=sys.stderr)
+    return 0
+
+
+async def _prune_changes(args) -> int:
+    from app.catalog import prune_changes
+    from app.config import settings
+    from app.db import SessionLocal
+
+    days = args.older_than_days if args.older_than_days is not None else settings.catalog_change_retention_days
+    async with SessionLocal() as db:
+        deleted = await prune_changes(db, datetime.utcnow() - timedelta(days=days))
+        await db.commit()
+    print(f"Pruned {deleted} catalogue changes older than {days} days", file=sys.stderr)
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="LuminaLib catalogue tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imp = commands.add_parser("import-books", help="bulk-import books from CSV/NDJSON metadata")
+    imp.add_argument("metadata", help="CSV or NDJSON file with title, author, genre, summary, file columns")
+    imp.add_argument("--files", help="zip archive holding the files named in the file column")
+    imp.add_argument("--format", choices=["csv", "ndjson"], help="metadata format (default: from the extension)")
+    imp.add_argument("--job-id", type=int, help="resume this import job after a failure")
+    imp.add_argument("--user-email", help="record the books as added by this user")
+    imp.add_argument("--batch-size", type=int, help="rows per transaction (default IMPORT_BATCH_SIZE)")
+    imp.add_argument("--no-summaries", action="store_true", help="skip summarising the imported files")
+    imp.set_defaults(handler=_import_books)
+
+    exp = commands.add_parser("export", help="export tables for the warehouse, incrementally by watermark")
+    exp.add_argument("--out-dir", required=True, help="directory for <table>.<format> files")
+    exp.add_argument("--tables", nargs="+", help="tables to export (default: all)")
+    exp.add_argument("--format", default="ndjson", help="ndjson, csv or parquet (needs pyarrow)")
+    exp.add_argument("--state", help="JSON file of per-table watermarks, read before and updated after the export")
+    exp.add_argument("--full", action="store_true", help="ignore the saved watermarks and export everything")
+    exp.set_defaults(handler=_export)
+
+    stats = commands.add_parser("backfill-stats", help="recompute per-book rating stats from the reviews table")
+    stats.set_defaults(handler=_backfill_stats)
+
+    trend = commands.add_parser("refresh-trending", help="decay popularity counters and rebuild the trending list")
+    trend.add_argument("--rebuild", action="store_true", help="recompute the counters from the borrow/review history")
+    trend.set_defaults(handler=_refresh_trending)
+
+    prune = commands.add_parser("prune-changes", help="delete old entries from the catalogue change feed")
+    prune.add_argument("--older-than-days", type=int, help="retention (default CATALOG_CHANGE_RETENTION_DAYS)")
+    prune.set_defaults(handler=_prune_changes)
+
+    args = parser.parse_args(argv)
+    return asyncio.run(args.handler(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+"""Opaque keyset cursors for paged lists ordered by (sort value, id).
+
+A cursor is the last row's sort value and id as URL-safe base64 JSON. Datetimes travel as ISO
+strings, so the reader passes the parser for its sort column back to `decode_cursor`.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+def encode_cursor(value: float | datetime, row_id: int) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, parse: Callable[[Any], T]) -> tuple[T, int]:
+    """Inverse of encode_cursor, e.g. `parse=float` or `datetime.fromisoformat`; raises ValueError
+    for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, row_id = json.loads(raw)
+        return parse(value), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor") from None
@@ -2,16 +2,41 @@ from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sess
 from sqlalchemy.pool import NullPool
 from sqlalchemy.orm import declarative_base
 from app.config import settings
+from app import metrics, profiling, query_budget
 
-engine = create_async_engine(
-    settings.db_url,
-    echo=False,
-    poolclass=NullPool,
-)
+
+def _pool_options() -> dict:
+    # SQLite (tests, local runs) opens a file per connection; nothing to gain from pooling it
+    if settings.db_pool_size <= 0 or settings.db_url.startswith("sqlite"):
+        return {"poolclass": NullPool}
+    return {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow, "pool_pre_ping": True}
+
+
+# Pooled connections belong to the event loop that opened them: the engine is for the app's loop
+# (and the CLI's). Background threads run their own loops, so they use the unpooled engine.
+engine = create_async_engine(settings.db_url, echo=False, **_pool_options())
 SessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+background_engine = create_async_engine(settings.db_url, echo=False, poolclass=NullPool)
+BackgroundSessionLocal = async_sessionmaker(background_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+for _engine in (engine, background_engine):
+    metrics.instrument_engine(_engine)
+    profiling.instrument_engine(_engine)
+    query_budget.instrument_engine(_engine)
 Base = declarative_base()
 
 
 async def get_db():
     async with SessionLocal() as session:
         yield session
+
+
+def upsert_insert(session: AsyncSession):
+    """The dialect's INSERT construct with on_conflict_do_update, or None if the dialect has none."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
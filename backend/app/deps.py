@@ -1,4 +1,7 @@
-from fastapi import Depends, HTTPException, status
+import hmac
+from functools import lru_cache
+
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,28 +13,67 @@ from app.llm.base import LLMBackend
 from app.llm.mock import MockLLM
 from app.llm.ollama import OllamaLLM
 from app.llm.openai import OpenAILLM
+from app.llm.scheduler import Priority, ScheduledLLM, get_llm_scheduler
 from app.models import User
 from app.storage.base import StorageBackend
+from app.storage.cached import CachedStorage
+from app.storage.instrumented import InstrumentedStorage
 from app.storage.local import LocalStorage
 from app.storage.s3 import S3Storage
 
 security = HTTPBearer(auto_error=False)
 
 
+# Backends are built once per configuration and shared; the arguments only key the cache,
+# so tests and tools that change settings still get a backend that matches them.
+@lru_cache(maxsize=8)
+def _storage(backend: str, local_path: str, bucket: str, endpoint_url: str, cache_dir: str) -> StorageBackend:
+    storage = InstrumentedStorage(S3Storage() if backend == "s3" else LocalStorage(local_path))
+    if cache_dir:
+        # Outside the instrumentation, so the backend timings are of real fetches (misses) only
+        storage = CachedStorage(
+            storage,
+            cache_dir,
+            settings.storage_cache_max_bytes,
+            settings.storage_cache_memory_bytes,
+            settings.storage_cache_memory_object_max_bytes,
+        )
+    return storage
+
+
 def get_storage() -> StorageBackend:
-    if settings.storage_backend == "s3":
-        return S3Storage()
-    return LocalStorage(settings.local_storage_path)
+    return _storage(
+        settings.storage_backend,
+        settings.local_storage_path,
+        settings.aws_bucket,
+        settings.aws_endpoint_url,
+        settings.storage_cache_dir,
+    )
 
 
-def get_llm() -> LLMBackend:
-    if settings.llm_provider == "ollama":
+@lru_cache(maxsize=8)
+def _llm(provider: str) -> LLMBackend:
+    if provider == "ollama":
         return OllamaLLM()
-    if settings.llm_provider == "openai":
+    if provider == "openai":
         return OpenAILLM()
     return MockLLM()
 
 
+def _llm_backend() -> LLMBackend:
+    return _llm(settings.llm_provider)
+
+
+def get_llm() -> LLMBackend:
+    """LLM for request handlers: scheduled ahead of background work."""
+    return ScheduledLLM(_llm_backend(), get_llm_scheduler(), Priority.INTERACTIVE)
+
+
+def get_background_llm() -> LLMBackend:
+    """LLM for background summaries and review analysis: yields to interactive calls."""
+    return ScheduledLLM(_llm_backend(), get_llm_scheduler(), Priority.BACKGROUND)
+
+
 async def get_current_user(
     db: AsyncSession = Depends(get_db),
     creds: HTTPAuthorizationCredentials | None = Depends(security),
@@ -59,3 +101,9 @@ async def get_optional_user(
         return None
     result = await db.execute(select(User).where(User.id == int(payload["sub"])))
     return result.scalar_one_or_none()
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    """Operator endpoints: the X-Admin-Token header must match ADMIN_TOKEN, which must be set."""
+    if not settings.admin_token or not x_admin_token or not hmac.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin token required")
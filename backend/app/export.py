@@ -0,0 +1,204 @@
+"""Streaming table export for the analytics warehouse.
+
+Rows are read with a server-side cursor (`yield_per`), so only one partition of
+`EXPORT_PARTITION_ROWS` rows is in memory at a time, and written out as NDJSON, CSV or
+Parquet (one row group per partition; needs the optional `pyarrow` package).
+
+Exports are incremental: each table has a watermark column (`updated_at`, or the latest
+event time for tables without one). An export covers rows with `since < watermark <= until`,
+and `until` is read before streaming starts, so the returned watermark is known up front and
+the next export starts from it. Watermarks are set by the app when a row is flushed, not when
+its transaction commits, so a row stamped just before an export may only become visible after
+it. `until` therefore trails the clock by `export_commit_lag_seconds`: it is the table's
+maximum, but no later than that long ago, and rows newer than that wait for the next export.
+A transaction that stays open longer than the lag can still be missed. A row exported twice
+(because it changed again) carries its id, so the warehouse keeps the latest copy per id.
+"""
+import csv
+import io
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Callable
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import ColumnElement
+
+from app.config import settings
+from app.models import Book, Borrow, Review, ReviewAnalysis
+
+EXPORT_PARTITION_ROWS = 1000
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+class ExportError(Exception):
+    """Unknown table or format, or a format whose optional dependency is missing."""
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    model: Any
+    columns: tuple[str, ...]
+    watermark: Callable[[], ColumnElement]
+
+
+EXPORT_TABLES: dict[str, ExportTable] = {
+    "books": ExportTable(
+        Book,
+        ("id", "title", "author", "genre", "file_name", "summary", "added_by_user_id", "created_at", "updated_at"),
+        lambda: Book.updated_at,
+    ),
+    "borrows": ExportTable(
+        Borrow,
+        ("id", "user_id", "book_id", "borrowed_at", "returned_at"),
+        lambda: func.coalesce(Borrow.returned_at, Borrow.borrowed_at),
+    ),
+    "reviews": ExportTable(
+        Review,
+        ("id", "user_id", "book_id", "rating", "text", "created_at"),
+        lambda: Review.created_at,
+    ),
+    "review_analyses": ExportTable(
+        ReviewAnalysis,
+        ("id", "book_id", "consensus", "updated_at"),
+        lambda: ReviewAnalysis.updated_at,
+    ),
+}
+
+
+def get_export_table(name: str) -> ExportTable:
+    if name not in EXPORT_TABLES:
+        raise ExportError(f"Unknown table {name!r}; exportable: {', '.join(EXPORT_TABLES)}")
+    return EXPORT_TABLES[name]
+
+
+def check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown format {fmt!r}; use one of {', '.join(FORMATS)}")
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Parquet export needs the pyarrow package") from None
+    return fmt
+
+
+async def current_watermark(db: AsyncSession, table: ExportTable, since: datetime | None) -> datetime | None:
+    """Upper bound for an export started now; `since` when nothing changed that can be exported yet."""
+    latest = (await db.execute(select(func.max(table.watermark())))).scalar()
+    if latest is not None:
+        latest = min(latest, datetime.utcnow() - timedelta(seconds=settings.export_commit_lag_seconds))
+    if latest is None or (since is not None and latest <= since):
+        return since
+    return latest
+
+
+def _json_value(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _ndjson(columns: tuple[str, ...], rows: list) -> bytes:
+    return "".join(
+        json.dumps({c: _json_value(v) for c, v in zip(columns, row)}, ensure_ascii=False) + "\n" for row in rows
+    ).encode()
+
+
+def _csv(columns: tuple[str, ...], rows: list, header: bool) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_json_value(v) if v is not None else "" for v in row] for row in rows)
+    return buf.getvalue().encode()
+
+
+def _arrow_schema(table: ExportTable):
+    import pyarrow as pa
+
+    fields = []
+    for name in table.columns:
+        column_type = table.model.__table__.c[name].type
+        if isinstance(column_type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column_type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column_type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column_type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink the Parquet writer appends to; `take()` hands over what was written so far."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+async def stream_export(
+    db: AsyncSession,
+    table_name: str,
+    fmt: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> AsyncIterator[bytes]:
+    """Yield the encoded rows of table_name changed in (since, until], one partition at a time."""
+    table = get_export_table(table_name)
+    check_format(fmt)
+    watermark = table.watermark()
+    stmt = select(*(getattr(table.model, c) for c in table.columns)).order_by(table.model.id)
+    if since is not None:
+        stmt = stmt.where(watermark > since)
+    if until is not None:
+        stmt = stmt.where(watermark <= until)
+    result = await db.stream(stmt.execution_options(yield_per=EXPORT_PARTITION_ROWS))
+
+    writer = sink = schema = None
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = _arrow_schema(table)
+        sink = _Drain()
+        writer = pq.ParquetWriter(sink, schema)
+    header = True
+    try:
+        async for partition in result.partitions():
+            if fmt == "ndjson":
+                yield _ndjson(table.columns, partition)
+            elif fmt == "csv":
+                yield _csv(table.columns, partition, header)
+                header = False
+            else:
+                columns = list(zip(*partition))
+                writer.write_table(pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, schema)], schema=schema))
+                yield sink.take()
+        if fmt == "csv" and header:
+            yield _csv(table.columns, [], header)
+    finally:
+        await result.close()
+        if writer is not None:
+            writer.close()
+    if sink is not None:
+        yield sink.take()
@@ -0,0 +1,168 @@
+"""Text extraction for summaries, run in child processes.
+
+PDF parsing is CPU-bound and holds the GIL, so running it in the API process slows every
+other request. Each extraction runs in a process of its own instead, at most
+`extraction_workers` at a time, with an address-space limit of `extraction_memory_limit_mb`.
+A file that takes longer than `extraction_timeout` seconds has its process killed. Nothing is
+shared between extractions, so a file that hangs or crashes its process fails only its own
+book; a shared pool would be broken for every extraction running alongside it. Processes are
+forked from a forkserver that has already imported this module, so starting one costs
+milliseconds, not a fresh interpreter. The child writes the extracted text to a temporary file
+that the caller streams back in blocks, so neither side holds the whole text of a large book
+in memory.
+
+`extraction_workers = 0` extracts in the calling thread (no child process), e.g. for tests.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterator
+
+from app.config import settings
+from app.summarization import iter_document_text
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_CHARS = 64 * 1024
+
+
+class ExtractionError(Exception):
+    """Extraction failed, ran out of memory or exceeded the timeout."""
+
+
+def _init_worker(memory_limit_mb: int) -> None:
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):  # not available on this platform
+        pass
+
+
+def extract_to_file(in_path: str, out_path: str, filename: str | None) -> int:
+    """Worker entry point: extract the text of in_path into out_path. Returns characters written."""
+    with open(in_path, "rb") as f:
+        content = f.read()
+    written = 0
+    with open(out_path, "w", encoding="utf-8") as out:
+        for piece in iter_document_text(content, filename):
+            out.write(piece)
+            written += len(piece)
+    return written
+
+
+def _child(conn, memory_limit_mb: int, fn: Callable[..., Any], args: tuple) -> None:
+    """Child process entry point: run fn(*args) and send back ("ok", result) or the failure."""
+    _init_worker(memory_limit_mb)
+    try:
+        reply = ("ok", fn(*args))
+    except MemoryError:
+        reply = ("memory", None)
+    except Exception as e:
+        reply = ("error", f"{type(e).__name__}: {e}")
+    conn.send(reply)
+    conn.close()
+
+
+def _context():
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+def _run_in_process(fn: Callable[..., Any], args: tuple, timeout: float | None) -> Any:
+    """Run fn(*args) in a new child process, killing it after timeout seconds. Blocks."""
+    ctx = _context()
+    reader, writer = ctx.Pipe(duplex=False)
+    process = ctx.Process(target=_child, args=(writer, settings.extraction_memory_limit_mb, fn, args), daemon=True)
+    process.start()
+    writer.close()
+    try:
+        if not reader.poll(timeout):  # also wakes when the child exits without replying
+            logger.warning("Killing text extraction process %s after %ss", process.pid, timeout)
+            raise ExtractionError(f"extraction timed out after {timeout:.0f}s")
+        try:
+            status, value = reader.recv()
+        except EOFError:
+            process.join()
+            raise ExtractionError(f"extraction worker died (exit code {process.exitcode})") from None
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        reader.close()
+    if status == "memory":
+        raise ExtractionError("extraction exceeded the worker memory limit")
+    if status == "error":
+        raise ExtractionError(f"extraction failed: {value}")
+    return value
+
+
+# One thread per concurrent extraction, each waiting on its child process. A pool of its own,
+# so extractions queueing for a slot do not hold the default executor's threads.
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.extraction_workers, thread_name_prefix="extract")
+        return _executor
+
+
+def shutdown_pool() -> None:
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def run_in_pool(fn: Callable[..., Any], *args: Any, timeout: float | None = None) -> Any:
+    """Run fn(*args) in a child process, raising ExtractionError on failure or timeout."""
+    timeout = settings.extraction_timeout if timeout is None else timeout
+    if settings.extraction_workers <= 0:
+        try:
+            return await asyncio.wait_for(asyncio.to_thread(fn, *args), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise ExtractionError(f"extraction timed out after {timeout:.0f}s") from None
+        except Exception as e:
+            raise ExtractionError(f"extraction failed: {e}") from e
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), _run_in_process, fn, args, timeout)
+
+
+def _iter_text_file(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8") as f:
+        while True:
+            block = f.read(READ_BLOCK_CHARS)
+            if not block:
+                return
+            yield block
+
+
+@asynccontextmanager
+async def extracted_text(content: bytes, filename: str | None) -> AsyncIterator[Iterator[str]]:
+    """Extract text out of process; yields an iterator over the text in blocks."""
+    workdir = tempfile.mkdtemp(prefix="luminalib-extract-")
+    try:
+        in_path = os.path.join(workdir, "input")
+        out_path = os.path.join(workdir, "text")
+        with open(in_path, "wb") as f:
+            f.write(content)
+        await run_in_pool(extract_to_file, in_path, out_path, filename)
+        yield _iter_text_file(out_path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,128 @@
+"""Precomputed facet counts for catalogue browsing.
+
+`catalog_facet_counts` holds one row per (facet, value) with the number of books carrying
+that value. Handlers that create, edit or delete books call `update_facet_counts` with the
+book's facet values before and after the change, in the same transaction as the change, so
+reading the facets is a lookup of a few rows instead of a GROUP BY over `books`.
+"""
+from collections import Counter
+
+from sqlalchemy import delete, func, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import upsert_insert
+from app.models import Book, CatalogFacetCount
+
+FACETS = ("genre", "author", "has_summary")
+MAX_FACET_VALUES = 20
+
+FacetValues = dict[str, str | None]
+
+
+def facet_values(book: Book | None) -> FacetValues:
+    """The facet values a book contributes to; all None for a book that doesn't exist (yet)."""
+    if book is None:
+        return {facet: None for facet in FACETS}
+    return {
+        "genre": book.genre or None,
+        "author": book.author or None,
+        "has_summary": "true" if book.summary else "false",
+    }
+
+
+async def _add(db: AsyncSession, facet: str, value: str, delta: int) -> None:
+    insert = upsert_insert(db)
+    if insert is not None and delta > 0:
+        stmt = insert(CatalogFacetCount).values(facet=facet, value=value, count=delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["facet", "value"],
+            set_={"count": CatalogFacetCount.count + delta},
+        )
+        await db.execute(stmt)
+        return
+    result = await db.execute(
+        update(CatalogFacetCount)
+        .where(CatalogFacetCount.facet == facet, CatalogFacetCount.value == value)
+        .values(count=CatalogFacetCount.count + delta)
+    )
+    if result.rowcount == 0 and delta > 0:
+        db.add(CatalogFacetCount(facet=facet, value=value, count=delta))
+
+
+def facet_deltas(before: FacetValues, after: FacetValues) -> Counter:
+    """(facet, value) -> change in count for one book going from before to after."""
+    deltas: Counter = Counter()
+    for facet in FACETS:
+        old, new = before.get(facet), after.get(facet)
+        if old == new:
+            continue
+        if old is not None:
+            deltas[(facet, old)] -= 1
+        if new is not None:
+            deltas[(facet, new)] += 1
+    return deltas
+
+
+async def apply_facet_deltas(db: AsyncSession, deltas: Counter) -> None:
+    """Apply summed deltas, e.g. for a whole batch of imported books. Does not commit.
+
+    Increments go out as one multi-row upsert where the database supports it.
+    """
+    changes = sorted((key, delta) for key, delta in deltas.items() if delta)
+    insert = upsert_insert(db)
+    increments = [{"facet": f, "value": v, "count": d} for (f, v), d in changes if d > 0]
+    if insert is not None and len(increments) > 1:
+        stmt = insert(CatalogFacetCount).values(increments)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["facet", "value"],
+            set_={"count": CatalogFacetCount.count + stmt.excluded.count},
+        )
+        await db.execute(stmt)
+        changes = [(key, d) for key, d in changes if d < 0]
+    for (facet, value), delta in changes:
+        await _add(db, facet, value, delta)
+
+
+async def update_facet_counts(db: AsyncSession, before: FacetValues, after: FacetValues) -> None:
+    """Apply the difference between a book's facet values before and after a change. Does not commit."""
+    await apply_facet_deltas(db, facet_deltas(before, after))
+
+
+async def get_facets(db: AsyncSession, limit: int = MAX_FACET_VALUES) -> dict[str, list[dict]]:
+    """Catalogue-wide counts per facet, most common values first.
+
+    One `ORDER BY count DESC LIMIT :limit` per facet, joined with UNION ALL: each is a range
+    scan of `ix_catalog_facet_counts_top` (facet, count DESC, value) that stops after `limit` rows,
+    so the cost does not grow with the number of distinct authors.
+    """
+    per_facet = [
+        select(CatalogFacetCount.facet, CatalogFacetCount.value, CatalogFacetCount.count)
+        .where(CatalogFacetCount.facet == facet, CatalogFacetCount.count > 0)
+        .order_by(CatalogFacetCount.count.desc(), CatalogFacetCount.value)
+        .limit(limit)
+        .subquery()
+        .select()
+        for facet in FACETS
+    ]
+    rows = (await db.execute(union_all(*per_facet))).all()
+    facets: dict[str, list[dict]] = {facet: [] for facet in FACETS}
+    for facet, value, count in rows:
+        facets[facet].append({"value": value, "count": count})
+    for values in facets.values():
+        values.sort(key=lambda v: (-v["count"], v["value"]))  # UNION ALL does not promise an order
+    return facets
+
+
+async def rebuild_facet_counts(db: AsyncSession) -> None:
+    """Recount every facet from `books` (backfill / repair). Does not commit."""
+    await db.execute(delete(CatalogFacetCount))
+    has_summary = func.coalesce(func.length(Book.summary), 0) > 0
+    for facet, column in (("genre", Book.genre), ("author", Book.author)):
+        rows = (
+            await db.execute(select(column, func.count(Book.id)).where(column.isnot(None), column != "").group_by(column))
+        ).all()
+        db.add_all(CatalogFacetCount(facet=facet, value=value, count=count) for value, count in rows)
+    rows = (await db.execute(select(has_summary, func.count(Book.id)).group_by(has_summary))).all()
+    db.add_all(
+        CatalogFacetCount(facet="has_summary", value="true" if flag else "false", count=count) for flag, count in rows
+    )
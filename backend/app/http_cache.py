@@ -0,0 +1,126 @@
+"""HTTP caching for catalogue reads: strong ETags, 304 handling and an in-process response cache.
+
+ETags are built from the version counters in `app/catalog.py`, so checking one costs a
+primary-key lookup instead of the full query. A request whose `If-None-Match` matches gets
+`304 Not Modified`; otherwise anonymous responses are served from `response_cache`, keyed by
+URL and ETag, and built only on a miss. Public responses carry `Cache-Control` for shared
+caches (`HTTP_CACHE_S_MAXAGE`); authenticated ones are `private`.
+
+Entries are tagged ("catalog", or ("book", id)) so write endpoints can drop them explicitly
+with `invalidate_book` / `invalidate_catalog`. That frees memory in the process that made the
+write; other processes miss on their next request anyway because the version in the key changed.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.config import settings
+
+CATALOG = "catalog"
+
+
+def make_etag(*parts: Any) -> str:
+    return '"' + "-".join(str(p) for p in parts) + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Weak comparison, as RFC 9110 specifies for If-None-Match."""
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or any(c.removeprefix("W/") == etag for c in candidates)
+
+
+def cache_headers(etag: str | None = None, public: bool = True) -> dict[str, str]:
+    headers = {"Vary": "Authorization"}
+    if public:
+        headers["Cache-Control"] = f"public, max-age=0, s-maxage={settings.http_cache_s_maxage}"
+    else:
+        headers["Cache-Control"] = "private, no-cache"
+    if etag:
+        headers["ETag"] = etag
+    return headers
+
+
+def cache_key(request: Request) -> str:
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    return f"{request.url.path}?{query}"
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered response bodies, each stored with its ETag and tags."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[str, bytes, frozenset]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, etag: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != etag:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, etag: str, body: bytes, tags: tuple[Hashable, ...]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (etag, body, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag: Hashable) -> int:
+        with self._lock:
+            stale = [k for k, (_, _, tags) in self._entries.items() if tag in tags]
+            for k in stale:
+                del self._entries[k]
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+response_cache = ResponseCache(settings.response_cache_size)
+
+
+def invalidate_catalog() -> None:
+    response_cache.invalidate(CATALOG)
+
+
+def invalidate_book(book_id: int) -> None:
+    """Drop the book's own responses and every catalogue-wide one (lists include the book)."""
+    response_cache.invalidate(("book", book_id))
+    response_cache.invalidate(CATALOG)
+
+
+async def cached_response(
+    request: Request,
+    etag: str,
+    build: Callable[[], Awaitable[Any]],
+    tags: tuple[Hashable, ...] = (CATALOG,),
+) -> Response:
+    """304 if the client has etag; else the cached body for this URL and etag; else build() and cache it."""
+    headers = cache_headers(etag)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    key = cache_key(request)
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = JSONResponse(jsonable_encoder(await build())).body
+        response_cache.put(key, etag, body, tags)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,264 @@
+"""Copies of each book, atomic borrow and return, and the hold queue.
+
+`book_inventory` holds each book's total and available copies. Borrow and return change it
+with single conditional statements instead of read-check-write. That way concurrent requests
+can neither lend more copies than exist nor lend the same reader one book twice:
+
+- `borrow` takes a copy with `UPDATE book_inventory SET available_copies = available_copies - 1
+  WHERE book_id = ? AND available_copies > 0 RETURNING ...`. On PostgreSQL, concurrent takers
+  queue on the row lock and re-check the condition once they get it. SQLite serialises writers.
+  It then inserts the loan, and the partial unique index `uq_borrows_active` rejects a second
+  active loan of the book by the same reader. The caller's rollback puts the copy back.
+- `return_book` closes the loan with a conditional `UPDATE borrows ... RETURNING`. The copy goes
+  straight to the oldest hold, or back on the shelf.
+- `place_hold` queues a reader when no copy is free. `set_copies` changes the total and lends
+  any added copies to the queue.
+
+A book without an inventory row gets one on first use from `ensure_inventory`. That covers
+books added before the table existed or inserted directly. The row has `DEFAULT_COPIES`
+copies, or as many as are on loan if that is more.
+
+None of these functions commit. After an InventoryError the caller must roll back.
+"""
+from datetime import datetime
+
+from sqlalchemy import and_, case, delete, exists, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import upsert_insert
+from app.models import Book, BookInventory, Borrow, Hold
+
+DEFAULT_COPIES = 1
+
+
+class InventoryError(Exception):
+    """A borrow, return or hold that cannot happen; status_code is the HTTP status to answer with."""
+
+    status_code = 400
+
+
+class BookNotFoundError(InventoryError):
+    status_code = 404
+
+
+class AlreadyBorrowedError(InventoryError):
+    pass
+
+
+class NotBorrowedError(InventoryError):
+    pass
+
+
+class NoCopiesAvailableError(InventoryError):
+    status_code = 409
+
+
+class CopyAvailableError(InventoryError):
+    status_code = 409
+
+
+class AlreadyOnHoldError(InventoryError):
+    status_code = 409
+
+
+class NotOnHoldError(InventoryError):
+    status_code = 404
+
+
+class CopiesOnLoanError(InventoryError):
+    status_code = 409
+
+
+def _active_loans(book_id):
+    return (
+        select(func.count(Borrow.id))
+        .where(Borrow.book_id == book_id, Borrow.returned_at.is_(None))
+        .scalar_subquery()
+    )
+
+
+def _is_borrowing(book_id: int, user_id):
+    return exists().where(Borrow.book_id == book_id, Borrow.user_id == user_id, Borrow.returned_at.is_(None))
+
+
+async def ensure_inventory(db: AsyncSession, book_ids: list[int] | None = None, copies: int = DEFAULT_COPIES) -> int:
+    """Create the missing inventory rows of book_ids (every book if None); returns how many. Does not commit."""
+    active = _active_loans(Book.id)
+    total = case((active > copies, active), else_=copies)
+    rows = select(Book.id, total, total - active).where(~exists().where(BookInventory.book_id == Book.id))
+    if book_ids is not None:
+        rows = rows.where(Book.id.in_(book_ids))
+    insert_ = upsert_insert(db)
+    stmt = (insert_ or insert)(BookInventory).from_select(["book_id", "total_copies", "available_copies"], rows)
+    if insert_ is not None:
+        # Two first borrows of the same book both try to create its row
+        stmt = stmt.on_conflict_do_nothing(index_elements=["book_id"])
+    return (await db.execute(stmt)).rowcount
+
+
+def _take_copy(book_id: int):
+    return (
+        update(BookInventory)
+        .where(BookInventory.book_id == book_id, BookInventory.available_copies > 0)
+        .values(available_copies=BookInventory.available_copies - 1)
+        .returning(BookInventory.available_copies)
+    )
+
+
+async def borrow(db: AsyncSession, book_id: int, user_id: int) -> Borrow:
+    """Lend user_id a copy of book_id and drop their hold on it. Does not commit."""
+    taken = (await db.execute(_take_copy(book_id))).first()
+    if taken is None and await ensure_inventory(db, [book_id]):
+        taken = (await db.execute(_take_copy(book_id))).first()
+    if taken is None:
+        # Only the failure path pays for finding out why
+        book_exists, borrowing = (
+            await db.execute(select(exists().where(Book.id == book_id), _is_borrowing(book_id, user_id)))
+        ).one()
+        if not book_exists:
+            raise BookNotFoundError("Book not found")
+        if borrowing:
+            raise AlreadyBorrowedError("Already borrowed")
+        raise NoCopiesAvailableError("No copies available; place a hold to get the next one returned")
+    loan = Borrow(user_id=user_id, book_id=book_id)
+    db.add(loan)
+    try:
+        await db.flush()
+    except IntegrityError:
+        raise AlreadyBorrowedError("Already borrowed") from None
+    await db.execute(delete(Hold).where(Hold.user_id == user_id, Hold.book_id == book_id))
+    return loan
+
+
+async def _lend_to_next_hold(db: AsyncSession, book_id: int) -> int | None:
+    """Turn the oldest hold on book_id into a loan; returns its reader, or None if nobody is waiting."""
+    oldest = (
+        select(Hold.id)
+        .where(Hold.book_id == book_id, ~_is_borrowing(book_id, Hold.user_id))
+        .order_by(Hold.created_at, Hold.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)  # concurrent returns serve different holds
+        .scalar_subquery()
+    )
+    holder = (await db.execute(delete(Hold).where(Hold.id == oldest).returning(Hold.user_id))).scalar_one_or_none()
+    if holder is not None:
+        db.add(Borrow(user_id=holder, book_id=book_id))
+        await db.flush()
+    return holder
+
+
+async def return_book(db: AsyncSession, book_id: int, user_id: int) -> int | None:
+    """Close user_id's loan of book_id and pass the copy on. Returns the reader it was lent to from
+    the hold queue, or None if it went back on the shelf. Does not commit."""
+    closed = (
+        await db.execute(
+            update(Borrow)
+            .where(Borrow.book_id == book_id, Borrow.user_id == user_id, Borrow.returned_at.is_(None))
+            .values(returned_at=datetime.utcnow())
+            .returning(Borrow.id)
+        )
+    ).first()
+    if closed is None:
+        raise NotBorrowedError("No active borrow for this book")
+    holder = await _lend_to_next_hold(db, book_id)
+    if holder is None:
+        # A book without an inventory row gets one, counted from the loans, on its next borrow
+        await db.execute(
+            update(BookInventory)
+            .where(BookInventory.book_id == book_id, BookInventory.available_copies < BookInventory.total_copies)
+            .values(available_copies=BookInventory.available_copies + 1)
+        )
+    return holder
+
+
+async def place_hold(db: AsyncSession, book_id: int, user_id: int) -> int:
+    """Queue user_id for the next returned copy of book_id; returns their position (1 is next). Does not commit."""
+    await ensure_inventory(db, [book_id])
+    available = select(BookInventory.available_copies).where(BookInventory.book_id == book_id).scalar_subquery()
+    book_exists, borrowing, free = (
+        await db.execute(select(exists().where(Book.id == book_id), _is_borrowing(book_id, user_id), available))
+    ).one()
+    if not book_exists:
+        raise BookNotFoundError("Book not found")
+    if borrowing:
+        raise AlreadyBorrowedError("Already borrowed")
+    if free:
+        raise CopyAvailableError("A copy is available; borrow it instead")
+    hold = Hold(user_id=user_id, book_id=book_id, created_at=datetime.utcnow())
+    db.add(hold)
+    try:
+        await db.flush()
+    except IntegrityError:
+        raise AlreadyOnHoldError("Already on hold") from None
+    ahead = or_(Hold.created_at < hold.created_at, and_(Hold.created_at == hold.created_at, Hold.id <= hold.id))
+    return (await db.execute(select(func.count(Hold.id)).where(Hold.book_id == book_id, ahead))).scalar_one()
+
+
+async def cancel_hold(db: AsyncSession, book_id: int, user_id: int) -> None:
+    """Leave the hold queue of book_id. Does not commit."""
+    result = await db.execute(delete(Hold).where(Hold.book_id == book_id, Hold.user_id == user_id))
+    if result.rowcount == 0:
+        raise NotOnHoldError("Not on hold")
+
+
+async def set_copies(db: AsyncSession, book_id: int, total: int) -> list[int]:
+    """Set book_id's number of copies and lend added ones to the hold queue; returns the readers
+    served. Fails if more copies are on loan than the new total. Does not commit."""
+    await ensure_inventory(db, [book_id])
+    delta = total - BookInventory.total_copies
+    row = (
+        await db.execute(
+            update(BookInventory)
+            .where(BookInventory.book_id == book_id, BookInventory.available_copies + delta >= 0)
+            .values(total_copies=total, available_copies=BookInventory.available_copies + delta)
+            .returning(BookInventory.available_copies)
+        )
+    ).first()
+    if row is None:
+        if not (await db.execute(select(exists().where(Book.id == book_id)))).scalar():
+            raise BookNotFoundError("Book not found")
+        raise CopiesOnLoanError(f"More than {total} copies are on loan")
+    served = []
+    for _ in range(row.available_copies):
+        holder = await _lend_to_next_hold(db, book_id)
+        if holder is None:
+            break
+        served.append(holder)
+    if served:
+        await db.execute(
+            update(BookInventory)
+            .where(BookInventory.book_id == book_id)
+            .values(available_copies=BookInventory.available_copies - len(served))
+        )
+    return served
+
+
+async def availability(db: AsyncSession, book_id: int, user_id: int | None = None) -> dict | None:
+    """Copies, free copies and hold queue of book_id, with user_id's place in it; None if no such book."""
+    row = (
+        await db.execute(
+            select(BookInventory.total_copies, BookInventory.available_copies, _active_loans(Book.id))
+            .select_from(Book)
+            .outerjoin(BookInventory, BookInventory.book_id == Book.id)
+            .where(Book.id == book_id)
+        )
+    ).first()
+    if row is None:
+        return None
+    total, available, active = row
+    if total is None:  # no inventory row yet: what ensure_inventory would create
+        total = max(DEFAULT_COPIES, active)
+        available = total - active
+    queue = (
+        await db.execute(select(Hold.user_id).where(Hold.book_id == book_id).order_by(Hold.created_at, Hold.id))
+    ).scalars().all()
+    position = queue.index(user_id) + 1 if user_id in queue else None
+    return {
+        "book_id": book_id,
+        "total_copies": total,
+        "available_copies": available,
+        "on_loan": active,
+        "holds": len(queue),
+        "my_hold_position": position,
+    }
@@ -0,0 +1,102 @@
+"""Startup warm-up and readiness.
+
+The app lifespan builds the shared backends (storage, LLM, database pool) and preloads the
+recommendation model before the first request instead of during it, timing each phase.
+`/health` only says the process is up; `/health/ready` says it should get traffic: startup
+has finished and the database and storage answer now.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StartupReport:
+    complete: bool = False
+    phases_ms: dict[str, float] = field(default_factory=dict)
+    errors: dict[str, str] = field(default_factory=dict)
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(self.phases_ms.values()), 1)
+
+    def snapshot(self) -> dict:
+        return {"complete": self.complete, "total_ms": self.total_ms, "phases_ms": dict(self.phases_ms), "errors": dict(self.errors)}
+
+
+startup = StartupReport()
+
+
+@contextmanager
+def _phase(report: StartupReport, name: str):
+    """Time one startup step. A failing step is recorded, not raised: the app still starts and
+    the readiness probe decides whether it gets traffic."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        logger.exception("Startup phase %s failed", name)
+        report.errors[name] = str(e)
+    finally:
+        report.phases_ms[name] = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def check_database(db: AsyncSession) -> None:
+    await db.execute(text("SELECT 1"))
+
+
+async def check_storage() -> None:
+    from app.deps import get_storage
+
+    await get_storage().check()
+
+
+async def warm_up(db: AsyncSession, report: StartupReport = startup) -> StartupReport:
+    """Build the shared backends and preload the recommendation model, one timed phase each."""
+    from app.deps import _llm_backend
+    from app.llm.scheduler import get_llm_scheduler
+
+    report.complete = False
+    report.phases_ms.clear()
+    report.errors.clear()
+    with _phase(report, "database"):
+        await check_database(db)
+    with _phase(report, "storage"):
+        await check_storage()
+    with _phase(report, "llm"):
+        _llm_backend()
+        get_llm_scheduler()
+    if settings.warm_recommendations and settings.recommendation_engine != "llm":
+        with _phase(report, "recommendations"):
+            from app.book_vectors import get_book_vectors
+
+            await get_book_vectors(db)
+    report.complete = True
+    logger.info(
+        "Startup took %.0f ms (%s)",
+        report.total_ms,
+        ", ".join(f"{name} {ms:.0f} ms" for name, ms in report.phases_ms.items()),
+    )
+    return report
+
+
+async def readiness(db: AsyncSession, report: StartupReport = startup) -> tuple[bool, dict]:
+    """(ready, body) for the readiness probe. The checks run on every call, so an instance
+    drops out of rotation while its database or storage is unreachable and returns by itself."""
+    checks = {}
+    for name, check in (("database", lambda: check_database(db)), ("storage", check_storage)):
+        try:
+            await check()
+            checks[name] = "ok"
+        except Exception as e:
+            checks[name] = f"error: {e}"
+    ready = report.complete and all(v == "ok" for v in checks.values())
+    return ready, {"status": "ready" if ready else "not_ready", "checks": checks, "startup": report.snapshot()}
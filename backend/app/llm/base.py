@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, AsyncIterator
 
 
 class LLMBackend(ABC):
@@ -7,6 +7,10 @@ class LLMBackend(ABC):
     async def summarize(self, text: str) -> str:
         pass
 
+    async def combine_summaries(self, summaries: list[str]) -> str:
+        """Reduce ordered partial summaries of one document into a single summary."""
+        return await self.summarize("\n\n".join(summaries))
+
     @abstractmethod
     async def analyze_sentiment(self, reviews: list[str]) -> str:
         pass
@@ -31,3 +35,27 @@ class LLMBackend(ABC):
     ) -> list[dict[str, str]]:
         """Suggest well-known books similar to the given book (not necessarily in catalog). Returns list of { title, author, genre }."""
         return []
+
+    async def suggest_books_by_genre_stream(self, genres: list[str], limit: int = 10) -> AsyncIterator[dict[str, str]]:
+        """Yield suggestions one at a time as soon as each is available. Default: replays suggest_books_by_genre."""
+        for suggestion in await self.suggest_books_by_genre(genres, limit=limit):
+            yield suggestion
+
+    async def suggest_books_similar_to_stream(
+        self,
+        book_title: str,
+        book_author: str | None = None,
+        book_genre: str | None = None,
+        book_summary: str | None = None,
+        limit: int = 10,
+    ) -> AsyncIterator[dict[str, str]]:
+        """Yield similar-book suggestions one at a time. Default: replays suggest_books_similar_to."""
+        suggestions = await self.suggest_books_similar_to(
+            book_title,
+            book_author=book_author,
+            book_genre=book_genre,
+            book_summary=book_summary,
+            limit=limit,
+        )
+        for suggestion in suggestions:
+            yield suggestion
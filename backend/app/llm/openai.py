@@ -1,8 +1,12 @@
 import re
+from contextlib import aclosing
+from typing import AsyncIterator
 
 from app.config import settings
 from app.llm.base import LLMBackend
+from app.llm.parsing import iter_lines, parse_suggestion_line
 from app.llm.prompts import (
+    combine_summaries_prompt,
     recommend_for_user_prompt,
     recommend_similar_prompt,
     sentiment_prompt,
@@ -10,6 +14,7 @@ from app.llm.prompts import (
     suggest_books_similar_prompt,
     summary_prompt,
 )
+from app.metrics import note_llm_failure
 
 
 def _parse_id_list(text: str) -> list[int]:
@@ -30,7 +35,7 @@ class OpenAILLM(LLMBackend):
             return ""
         try:
             from openai import AsyncOpenAI
-            client = AsyncOpenAI(api_key=settings.openai_api_key)
+            client = AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
             resp = await client.chat.completions.create(
                 model=self.model,
                 messages=[
@@ -43,14 +48,54 @@ class OpenAILLM(LLMBackend):
                 return resp.choices[0].message.content.strip() or ""
             return ""
         except Exception:
+            note_llm_failure()
             return ""
 
+    async def _stream(self, prompt: str, system: str = "") -> AsyncIterator[str]:
+        if not settings.openai_api_key:
+            return
+        from openai import AsyncOpenAI
+        client = AsyncOpenAI(api_key=settings.openai_api_key, base_url=settings.openai_base_url or None)
+        stream = await client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": system or "You are helpful."},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=1024,
+            stream=True,
+        )
+        async for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _stream_suggestions(self, prompt: str, system: str, fallback_genre: str, limit: int) -> AsyncIterator[dict[str, str]]:
+        count = 0
+        try:
+            async with aclosing(iter_lines(self._stream(prompt, system))) as lines:
+                async for line in lines:
+                    parsed = parse_suggestion_line(line, fallback_genre)
+                    if parsed:
+                        yield parsed
+                        count += 1
+                    if count >= limit:
+                        break
+        except Exception:
+            note_llm_failure()
+            return
+
     async def summarize(self, text: str) -> str:
         if not text or len(text.strip()) < 10:
             return "Summary not available."
         prompt, system = summary_prompt(text)
         return await self._call(prompt, system)
 
+    async def combine_summaries(self, summaries: list[str]) -> str:
+        if len(summaries) == 1:
+            return summaries[0]
+        prompt, system = combine_summaries_prompt(summaries)
+        return await self._call(prompt, system)
+
     async def analyze_sentiment(self, reviews: list[str]) -> str:
         if not reviews:
             return "No reviews yet."
@@ -158,3 +203,32 @@ class OpenAILLM(LLMBackend):
             if len(suggestions) >= limit:
                 break
         return suggestions[:limit]
+
+    async def suggest_books_by_genre_stream(self, genres: list[str], limit: int = 10) -> AsyncIterator[dict[str, str]]:
+        if not genres:
+            return
+        prompt, system = suggest_books_prompt(genres, limit)
+        async with aclosing(self._stream_suggestions(prompt, system, genres[0], limit)) as suggestions:
+            async for suggestion in suggestions:
+                yield suggestion
+
+    async def suggest_books_similar_to_stream(
+        self,
+        book_title: str,
+        book_author: str | None = None,
+        book_genre: str | None = None,
+        book_summary: str | None = None,
+        limit: int = 10,
+    ) -> AsyncIterator[dict[str, str]]:
+        if not book_title or not book_title.strip():
+            return
+        prompt, system = suggest_books_similar_prompt(
+            book_title.strip(),
+            book_author,
+            book_genre,
+            book_summary,
+            limit,
+        )
+        async with aclosing(self._stream_suggestions(prompt, system, book_genre or "Fiction", limit)) as suggestions:
+            async for suggestion in suggestions:
+                yield suggestion
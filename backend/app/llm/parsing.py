@@ -0,0 +1,54 @@
+"""Parsing helpers for free-text LLM output."""
+import re
+
+
+def parse_id_list(text: str) -> list[int]:
+    ids = []
+    for part in re.split(r"[\s,]+", text.strip()):
+        part = part.strip().rstrip(".")
+        if part.isdigit():
+            ids.append(int(part))
+    return ids
+
+
+def normalize_suggestion_line(line: str) -> str:
+    """Strip numbering and markdown so '1. Dune by Frank Herbert (Sci-Fi)' becomes 'Dune by Frank Herbert (Sci-Fi)'."""
+    line = line.strip()
+    # Remove leading markdown list: "1. ", "2) ", "- ", "* "
+    line = re.sub(r"^\s*\d+[.)]\s*", "", line)
+    line = re.sub(r"^[-*]\s+", "", line)
+    return line.strip()
+
+
+def parse_suggestion_line(line: str, fallback_genre: str) -> dict[str, str] | None:
+    """Parse a line like 'Title by Author (Genre)' or 'Title by Author'. Returns dict or None."""
+    line = normalize_suggestion_line(line)
+    if not line or line.startswith("#"):
+        return None
+    by_idx = line.find(" by ")
+    if by_idx <= 0:
+        return None
+    title = line[:by_idx].strip().strip('"')
+    rest = line[by_idx + 4 :].strip()
+    paren = rest.rfind(" (")
+    if paren > 0 and rest.endswith(")"):
+        author = rest[:paren].strip()
+        genre = rest[paren + 2 : -1].strip()
+    else:
+        author = rest
+        genre = fallback_genre
+    if title and author:
+        return {"title": title, "author": author, "genre": genre or fallback_genre}
+    return None
+
+
+async def iter_lines(tokens):
+    """Re-chunk an async stream of text fragments into complete lines as soon as each newline arrives."""
+    buf = ""
+    async for token in tokens:
+        buf += token
+        while "\n" in buf:
+            line, buf = buf.split("\n", 1)
+            yield line
+    if buf:
+        yield buf
@@ -1,6 +1,7 @@
 """Structured, reusable prompts for LLM-backed features."""
 
 SUMMARY_SYSTEM = "You write concise book summaries."
+COMBINE_SYSTEM = "You merge partial summaries of one book into a single summary."
 SENTIMENT_SYSTEM = "You synthesize reader opinions."
 RECOMMEND_SYSTEM = "You recommend books. Reply only with numbers."
 SUGGEST_BOOKS_SYSTEM = "You suggest real, well-known books. One per line: Title by Author (Genre)."
@@ -12,6 +13,16 @@ def summary_prompt(text: str, max_chars: int = 4000) -> tuple[str, str]:
     return prompt, SUMMARY_SYSTEM
 
 
+def combine_summaries_prompt(summaries: list[str], max_chars: int = 8000) -> tuple[str, str]:
+    """Prompt and system message for reducing ordered partial summaries into one."""
+    parts = "\n".join(f"Part {i + 1}: {s.strip()}" for i, s in enumerate(summaries))
+    prompt = (
+        "These are summaries of consecutive parts of one book, in order. "
+        "Write one concise summary of the whole book in 2-3 sentences:\n\n" + parts[:max_chars]
+    )
+    return prompt, COMBINE_SYSTEM
+
+
 def sentiment_prompt(reviews: list[str], max_reviews: int = 20) -> tuple[str, str]:
     """Prompt and system message for review consensus / sentiment."""
     if not reviews:
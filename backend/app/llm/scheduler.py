@@ -0,0 +1,243 @@
+"""Admission control in front of the LLM backend.
+
+A local Ollama instance only serves a few generations at a time, so every LLM call goes
+through a shared scheduler: at most `llm_max_concurrency` calls run at once, waiters are
+served by priority (interactive requests before background summaries), and when more than
+`llm_max_queue` interactive calls are already waiting new ones are rejected with
+`LLMOverloadedError` instead of piling up until the HTTP client times out. Background calls
+are never shed and never time out: nobody is waiting on them, interactive calls go ahead of
+them anyway, and a summary job that failed here would have to be run again from scratch.
+
+Background tasks run on their own event loops in worker threads, so the scheduler is
+thread-safe and wakes waiters on whichever loop they are waiting on.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from contextlib import aclosing, asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator
+
+from app.config import settings
+from app.llm.base import LLMBackend
+from app.metrics import llm_call
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+class LLMOverloadedError(Exception):
+    """Raised when the LLM queue is full or a call waited longer than the queue timeout."""
+
+    def __init__(self, detail: str, retry_after: int = 5):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class _PriorityStats:
+    def __init__(self):
+        self.admitted = 0
+        self.rejected = 0
+        self.queued = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        avg = self.queue_time_total / self.admitted if self.admitted else 0.0
+        return {
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "queued": self.queued,
+            "queue_time_avg_ms": round(avg * 1000, 2),
+            "queue_time_max_ms": round(self.queue_time_max * 1000, 2),
+        }
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 32, queue_timeout: float = 60.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters: list[list[Any]] = []  # heap of [priority, seq, loop, future]
+        self._seq = itertools.count()
+        self._stats = {p: _PriorityStats() for p in Priority}
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority = Priority.INTERACTIVE):
+        """Hold one of the concurrency slots for the duration of the block."""
+        start = time.monotonic()
+        await self._acquire(priority)
+        waited = time.monotonic() - start
+        with self._lock:
+            stats = self._stats[priority]
+            stats.admitted += 1
+            stats.queue_time_total += waited
+            stats.queue_time_max = max(stats.queue_time_max, waited)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: Priority) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiters:
+                self._active += 1
+                return
+            stats = self._stats[priority]
+            # Only interactive calls wait ahead of interactive ones, so only they count towards the bound
+            if priority == Priority.INTERACTIVE and stats.queued >= self.max_queue:
+                stats.rejected += 1
+                raise LLMOverloadedError("LLM is busy, too many requests queued. Try again shortly.")
+            fut = loop.create_future()
+            entry = [priority, next(self._seq), loop, fut]
+            heapq.heappush(self._waiters, entry)
+            stats.queued += 1
+        timeout = self.queue_timeout if priority == Priority.INTERACTIVE else None
+        try:
+            await asyncio.wait_for(fut, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            with self._lock:
+                if entry in self._waiters:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._stats[priority].queued -= 1
+                    granted = False
+                else:
+                    granted = fut.done() and not fut.cancelled()
+            if granted:
+                self._release()
+            if isinstance(e, asyncio.TimeoutError):
+                with self._lock:
+                    self._stats[priority].rejected += 1
+                raise LLMOverloadedError("Timed out waiting for the LLM. Try again shortly.") from None
+            raise
+
+    def _release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                priority, _, loop, fut = heapq.heappop(self._waiters)
+                self._stats[priority].queued -= 1
+                try:
+                    # The slot passes straight to the waiter, so _active is unchanged.
+                    loop.call_soon_threadsafe(self._grant, fut)
+                    return
+                except RuntimeError:  # waiter's event loop is already closed
+                    continue
+            self._active -= 1
+
+    def _grant(self, fut: asyncio.Future) -> None:
+        if fut.done():  # waiter gave up after being picked; pass the slot on
+            self._release()
+        else:
+            fut.set_result(None)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "priorities": {p.name.lower(): s.as_dict() for p, s in self._stats.items()},
+            }
+
+
+_scheduler: LLMScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                max_concurrency=settings.llm_max_concurrency,
+                max_queue=settings.llm_max_queue,
+                queue_timeout=settings.llm_queue_timeout,
+            )
+        return _scheduler
+
+
+class ScheduledLLM(LLMBackend):
+    """LLMBackend decorator that runs every call of the wrapped backend under the scheduler."""
+
+    def __init__(self, backend: LLMBackend, scheduler: LLMScheduler, priority: Priority = Priority.INTERACTIVE):
+        self.backend = backend
+        self.scheduler = scheduler
+        self.priority = priority
+        self.backend_name = type(backend).__name__.removesuffix("LLM").lower()
+
+    async def summarize(self, text: str) -> str:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "summarize"):
+            return await self.backend.summarize(text)
+
+    async def combine_summaries(self, summaries: list[str]) -> str:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "combine_summaries"):
+            return await self.backend.combine_summaries(summaries)
+
+    async def analyze_sentiment(self, reviews: list[str]) -> str:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "analyze_sentiment"):
+            return await self.backend.analyze_sentiment(reviews)
+
+    async def recommend_similar(self, book_info: str, candidates: list[dict[str, Any]], limit: int = 10) -> list[int]:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "recommend_similar"):
+            return await self.backend.recommend_similar(book_info, candidates, limit=limit)
+
+    async def recommend_for_user(self, preferences: str, candidates: list[dict[str, Any]], limit: int = 10) -> list[int]:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "recommend_for_user"):
+            return await self.backend.recommend_for_user(preferences, candidates, limit=limit)
+
+    async def suggest_books_by_genre(self, genres: list[str], limit: int = 10) -> list[dict[str, str]]:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "suggest_books_by_genre"):
+            return await self.backend.suggest_books_by_genre(genres, limit=limit)
+
+    async def suggest_books_similar_to(
+        self,
+        book_title: str,
+        book_author: str | None = None,
+        book_genre: str | None = None,
+        book_summary: str | None = None,
+        limit: int = 10,
+    ) -> list[dict[str, str]]:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "suggest_books_similar_to"):
+            return await self.backend.suggest_books_similar_to(
+                book_title,
+                book_author=book_author,
+                book_genre=book_genre,
+                book_summary=book_summary,
+                limit=limit,
+            )
+
+    async def suggest_books_by_genre_stream(self, genres: list[str], limit: int = 10) -> AsyncIterator[dict[str, str]]:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "suggest_books_by_genre_stream"):
+            async with aclosing(self.backend.suggest_books_by_genre_stream(genres, limit=limit)) as suggestions:
+                async for suggestion in suggestions:
+                    yield suggestion
+
+    async def suggest_books_similar_to_stream(
+        self,
+        book_title: str,
+        book_author: str | None = None,
+        book_genre: str | None = None,
+        book_summary: str | None = None,
+        limit: int = 10,
+    ) -> AsyncIterator[dict[str, str]]:
+        async with self.scheduler.slot(self.priority), llm_call(self.backend_name, "suggest_books_similar_to_stream"):
+            suggestions = self.backend.suggest_books_similar_to_stream(
+                book_title,
+                book_author=book_author,
+                book_genre=book_genre,
+                book_summary=book_summary,
+                limit=limit,
+            )
+            async with aclosing(suggestions) as stream:
+                async for suggestion in stream:
+                    yield suggestion
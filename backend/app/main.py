@@ -1,25 +1,98 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.config import settings
+from app.db import SessionLocal, engine, get_db
+from app.lifecycle import readiness, warm_up
+from app.llm.scheduler import LLMOverloadedError, get_llm_scheduler
+from app.profiling import ProfilingMiddleware
+from app.query_budget import QueryBudgetMiddleware
+from app.rate_limit import RateLimitMiddleware, rate_cost
+from app.routers import admin, auth, books, changes, export, me, recommendations
+from app.tasks import start_trending_refresher
+
 
-from app.routers import auth, books, recommendations
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with SessionLocal() as db:
+        await warm_up(db)
+    stop = start_trending_refresher(settings.trending_refresh_seconds) if settings.trending_refresh_seconds > 0 else None
+    yield
+    if stop is not None:
+        stop.set()
+    await engine.dispose()
 
-app = FastAPI(title="LuminaLib API")
+
+app = FastAPI(title="LuminaLib API", lifespan=lifespan)
+# Innermost of all, so 429s still get CORS headers and show in the metrics
+app.add_middleware(RateLimitMiddleware)
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(QueryBudgetMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(books.router)
 app.include_router(recommendations.router)
+app.include_router(export.router)
+app.include_router(changes.router)
+app.include_router(me.router)
+app.include_router(admin.router)
+
+
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/health")
+@rate_cost(0)
 def health():
+    """Liveness: the process is up and serving. See /health/ready for whether it should get traffic."""
     return {"status": "ok"}
 
 
+@app.get("/health/ready")
+@rate_cost(0)
+async def health_ready(db: AsyncSession = Depends(get_db)):
+    """Readiness: startup warm-up finished and the database and storage answer. 503 otherwise."""
+    ready, body = await readiness(db)
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+
+@app.get("/metrics", include_in_schema=False)
+@rate_cost(0)
+def metrics_endpoint():
+    """Counters, gauges and histograms of this process in the Prometheus text format."""
+    if not settings.metrics_enabled:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    scheduler = get_llm_scheduler().snapshot()
+    metrics.LLM_ACTIVE.set(scheduler["active"])
+    metrics.LLM_QUEUED.set(scheduler["queued"])
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/health/llm")
+@rate_cost(0)
+def health_llm():
+    """LLM scheduler state: active and queued calls, rejections and queue time per priority."""
+    return get_llm_scheduler().snapshot()
+
+
 @app.get("/health/ollama")
+@rate_cost(0)
 async def health_ollama():
     """Verify Ollama is reachable and configured model is available."""
-    from app.config import settings
     if settings.llm_provider != "ollama":
         return {"ollama": "not_used", "llm_provider": settings.llm_provider}
     import httpx
@@ -0,0 +1,284 @@
+"""In-process metrics in the Prometheus text format, served at `GET /metrics`.
+
+Counters, gauges and histograms live in this process and are updated under one small lock
+per metric, which costs about a microsecond per update. Sources:
+
+- `MetricsMiddleware`: latency, count and in-flight requests per route template (`/books/{book_id}`,
+  never the raw path, so label values stay bounded), plus DB queries and DB time per request;
+- `instrument_engine`: SQLAlchemy cursor events time every query and charge it to the request
+  that issued it through a context variable;
+- `llm_call`: used by `ScheduledLLM`, so every LLM call is timed per backend and method;
+- `InstrumentedStorage` (`app/storage/instrumented.py`): storage operation timings;
+- `CachedStorage` (`app/storage/cached.py`): where each read through the storage cache was served from.
+
+Each worker process has its own registry; with several workers, scrape each one (or run one
+worker per container).
+"""
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+from app.profiling import span
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_registry: list["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _label_str(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{k}="{_escape(str(v))}"' for k, v in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._label_str(k)} {_number(v)}" for k, v in items]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (non-cumulative, last is +Inf), sum]
+        self._values: dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][i] += 1
+            entry[1] += value
+
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+
+    def sum(self, *labels: str) -> float:
+        entry = self._values.get(labels)
+        return entry[1] if entry else 0.0
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{self._label_str(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_str(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._label_str(labels)} {cumulative}")
+        return lines
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+def render() -> str:
+    return "\n".join(m.render() for m in _registry) + "\n"
+
+
+def clear() -> None:
+    for metric in _registry:
+        metric.clear()
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Time to serve a request, including streaming the body.", ("method", "route")
+)
+REQUESTS = Counter("http_requests_total", "Requests served.", ("method", "route", "status"))
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests being served now.", ("method",))
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries issued by one request.", ("route",), buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_TIME = Histogram("http_request_db_seconds", "Time one request spent in database queries.", ("route",))
+DB_QUERY_LATENCY = Histogram("db_query_duration_seconds", "Time per database query, from any caller.")
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds", "LLM call time once admitted by the scheduler.", ("backend", "method"), buckets=LLM_BUCKETS
+)
+LLM_ERRORS = Counter("llm_call_errors_total", "LLM calls that raised or fell back to an empty answer.", ("backend", "method"))
+LLM_ACTIVE = Gauge("llm_calls_active", "LLM calls holding a scheduler slot.")
+LLM_QUEUED = Gauge("llm_calls_queued", "LLM calls waiting for a scheduler slot.")
+STORAGE_LATENCY = Histogram("storage_operation_duration_seconds", "Time per storage operation.", ("backend", "operation"))
+STORAGE_ERRORS = Counter("storage_operation_errors_total", "Storage operations that raised.", ("backend", "operation"))
+RATE_LIMITED = Counter(
+    "http_requests_refused_total", "Requests refused by the rate limiter (429) or the expensive-route cap (503).", ("route", "reason")
+)
+STORAGE_CACHE = Counter(
+    "storage_cache_reads_total",
+    "Reads through the storage cache: memory or disk hit, miss, coalesced into a running miss, or a bad cached file.",
+    ("result",),
+)
+BACKGROUND_JOBS = Gauge("background_jobs_running", "Background summary/analysis threads running now.")
+
+# [queries, seconds] of the request being served, if any
+_request_db: ContextVar[list | None] = ContextVar("request_db", default=None)
+# [failed] of the LLM call in progress, if any
+_llm_call: ContextVar[list | None] = ContextVar("llm_call", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Time every query run through engine (sync or async) and charge it to the current request."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_started
+    DB_QUERY_LATENCY.observe(elapsed)
+    current = _request_db.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+
+
+@asynccontextmanager
+async def llm_call(backend: str, method: str):
+    """Time one LLM call and count it as an error if it raises or the backend reports a failure."""
+    state = [False]
+    token = _llm_call.set(state)
+    started = time.perf_counter()
+    try:
+        with span("llm", f"{backend}.{method}"):
+            yield
+    except BaseException:
+        state[0] = True
+        raise
+    finally:
+        LLM_LATENCY.observe(time.perf_counter() - started, backend, method)
+        if state[0]:
+            LLM_ERRORS.inc(backend, method)
+        try:
+            _llm_call.reset(token)
+        except ValueError:  # a streaming call closed from another context
+            pass
+
+
+def note_llm_failure() -> None:
+    """Called by backends that swallow an error and return an empty answer instead."""
+    state = _llm_call.get()
+    if state is not None:
+        state[0] = True
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware (not BaseHTTPMiddleware), so streaming bodies pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec(method)
+            _request_db.reset(token)
+            # The router stores the matched route in the scope; its template keeps label values bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_LATENCY.observe(elapsed, method, route)
+            REQUESTS.inc(method, route, str(status[0]))
+            REQUEST_QUERIES.observe(db[0], route)
+            REQUEST_DB_TIME.observe(db[1], route)
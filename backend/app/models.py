@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Float, UniqueConstraint, CheckConstraint, Index, text
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -31,18 +31,32 @@ class Book(Base):
     __tablename__ = "books"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(500), nullable=False)
-    author = Column(String(255), nullable=True)
-    genre = Column(String(100), nullable=True)
+    author = Column(String(255), nullable=True, index=True)
+    genre = Column(String(100), nullable=True, index=True)
     file_path = Column(String(500), nullable=True)
     file_name = Column(String(255), nullable=True)
     summary = Column(Text, nullable=True)
-    added_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    added_by_user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    version = Column(Integer, nullable=False, default=1)  # bumped on every change to the book's public data
     borrows = relationship("Borrow", back_populates="book")
     reviews = relationship("Review", back_populates="book")
     summary_record = relationship("BookSummary", back_populates="book", uselist=False)
     review_analysis = relationship("ReviewAnalysis", back_populates="book", uselist=False)
+    stats = relationship("BookStats", uselist=False, lazy="joined", viewonly=True)
+
+    @property
+    def rating_count(self) -> int:
+        return self.stats.rating_count if self.stats else 0
+
+    @property
+    def rating_average(self) -> float | None:
+        return round(self.stats.rating_average, 2) if self.stats and self.stats.rating_count else None
+
+    @property
+    def rating_histogram(self) -> dict[str, int]:
+        return self.stats.histogram() if self.stats else {str(r): 0 for r in range(1, 6)}
 
 
 class BookSummary(Base):
@@ -56,6 +70,18 @@ class BookSummary(Base):
 
 class Borrow(Base):
     __tablename__ = "borrows"
+    # At most one active loan of a book per reader; app/inventory.py relies on it instead of a pre-check
+    __table_args__ = (
+        Index(
+            "uq_borrows_active",
+            "user_id",
+            "book_id",
+            unique=True,
+            postgresql_where=text("returned_at IS NULL"),
+            sqlite_where=text("returned_at IS NULL"),
+        ),
+        Index("ix_borrows_user_history", "user_id", "borrowed_at", "id"),  # GET /me/borrows pages
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
@@ -67,6 +93,7 @@ class Borrow(Base):
 
 class Review(Base):
     __tablename__ = "reviews"
+    __table_args__ = (Index("ix_reviews_user_history", "user_id", "created_at", "id"),)  # GET /me/reviews pages
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
@@ -84,3 +111,124 @@ class ReviewAnalysis(Base):
     consensus = Column(Text, nullable=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     book = relationship("Book", back_populates="review_analysis")
+
+
+class CatalogFacetCount(Base):
+    __tablename__ = "catalog_facet_counts"
+    __table_args__ = (
+        UniqueConstraint("facet", "value", name="uq_catalog_facet_counts_facet_value"),
+        Index("ix_catalog_facet_counts_top", "facet", text("count DESC"), "value"),  # top values per facet
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    facet = Column(String(50), nullable=False)
+    value = Column(String(255), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    source_name = Column(String(255), nullable=True)
+    status = Column(String(20), nullable=False, default="running")  # running | done | failed
+    rows_done = Column(Integer, nullable=False, default=0)  # rows committed; a resumed run skips these
+    books_created = Column(Integer, nullable=False, default=0)
+    files_uploaded = Column(Integer, nullable=False, default=0)
+    rows_invalid = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class BookStats(Base):
+    """Review aggregates per book, kept current by create_review (see app/stats.py)."""
+
+    __tablename__ = "book_stats"
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    rating_count = Column(Integer, nullable=False, default=0, index=True)
+    rating_sum = Column(Integer, nullable=False, default=0)
+    rating_average = Column(Float, nullable=False, default=0.0, index=True)
+    rating_1 = Column(Integer, nullable=False, default=0)
+    rating_2 = Column(Integer, nullable=False, default=0)
+    rating_3 = Column(Integer, nullable=False, default=0)
+    rating_4 = Column(Integer, nullable=False, default=0)
+    rating_5 = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def histogram(self) -> dict[str, int]:
+        return {str(r): getattr(self, f"rating_{r}") or 0 for r in range(1, 6)}
+
+
+class BookPopularity(Base):
+    """Exponentially time-decayed borrow and review counters per book (see app/trending.py)."""
+
+    __tablename__ = "book_popularity"
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    borrow_score = Column(Float, nullable=False, default=0.0)
+    review_score = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TrendingBook(Base):
+    """Precomputed top-K of book_popularity, rebuilt by the trending refresh job."""
+
+    __tablename__ = "trending_books"
+    rank = Column(Integer, primary_key=True)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+    score = Column(Float, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+
+
+class TrendingState(Base):
+    """Single row recording when the popularity counters were last decayed."""
+
+    __tablename__ = "trending_state"
+    id = Column(Integer, primary_key=True)
+    decayed_at = Column(DateTime, nullable=False)
+
+
+class CatalogState(Base):
+    """Single row holding the catalogue version, bumped by every write that changes catalogue reads."""
+
+    __tablename__ = "catalog_state"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CatalogChange(Base):
+    """Append-only log of catalogue writes; `version` is the catalog_state version the change produced."""
+
+    __tablename__ = "catalog_changes"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, unique=True, index=True)
+    book_id = Column(Integer, nullable=True, index=True)  # no FK: deleted books keep their entries
+    kind = Column(String(20), nullable=False)  # created | updated | deleted | summary | analysis | review
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class BookInventory(Base):
+    """Copies of a book and how many are on the shelf, changed by single conditional updates (see app/inventory.py)."""
+
+    __tablename__ = "book_inventory"
+    __table_args__ = (
+        CheckConstraint("available_copies >= 0 AND available_copies <= total_copies", name="ck_book_inventory_available"),
+    )
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    total_copies = Column(Integer, nullable=False, default=1)
+    available_copies = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class Hold(Base):
+    """A reader waiting for a copy of a book; returned copies go to the oldest hold first."""
+
+    __tablename__ = "holds"
+    __table_args__ = (
+        UniqueConstraint("user_id", "book_id", name="uq_holds_user_book"),
+        Index("ix_holds_book_queue", "book_id", "created_at", "id"),
+    )
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
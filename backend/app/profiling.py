@@ -0,0 +1,243 @@
+"""Opt-in per-request profiling: span breakdowns of sampled and slow requests.
+
+With `PROFILE_SAMPLE_RATE` or `PROFILE_SLOW_MS` set, `ProfilingMiddleware` opens a trace for
+every request. While the trace is open, these are recorded as spans with their offset and
+duration: database queries (with an SQL fingerprint), LLM calls, storage operations and the
+stages of the recommendation pipeline (`span("ml", ...)`). When the request ends, the trace is
+kept if the request was sampled or took at least `PROFILE_SLOW_MS`. Kept traces go into a
+ring buffer of the last `PROFILE_BUFFER_SIZE`, which `GET /admin/profiles` reads.
+
+For sampled requests, `PROFILE_CPU` also starts a statistical CPU profiler. It is a thread
+that records the event-loop thread's Python stack every `PROFILE_CPU_INTERVAL_MS`. The stacks
+are reported as collapsed "outer;inner count" lines, the input format of flame-graph tools.
+The loop serves other requests concurrently, so those stacks may include their work too.
+
+With no trace open, `span()` costs a context-variable lookup.
+"""
+import collections
+import itertools
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from app.config import settings
+
+MAX_SPANS = 500
+MAX_STACKS = 50
+
+
+@dataclass
+class Trace:
+    method: str
+    path: str
+    started: float = field(default_factory=time.perf_counter)
+    started_at: datetime = field(default_factory=datetime.utcnow)
+    spans: list[tuple] = field(default_factory=list)  # (kind, name, offset_s, duration_s, detail)
+    dropped_spans: int = 0
+    queries: dict[str, list] = field(default_factory=dict)  # fingerprint -> [count, seconds]
+
+    def add_span(self, kind: str, name: str, started: float, duration: float, detail: str | None = None) -> None:
+        if len(self.spans) >= MAX_SPANS:
+            self.dropped_spans += 1
+            return
+        self.spans.append((kind, name, started - self.started, duration, detail))
+
+
+_trace: ContextVar[Trace | None] = ContextVar("profile_trace", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _trace.get()
+
+
+@contextmanager
+def span(kind: str, name: str, detail: str | None = None):
+    """Record the enclosed block as a span of the current trace; no-op outside a profiled request."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(kind, name, started, time.perf_counter() - started, detail)
+
+
+_NUMBER = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"\$\d+|%\(\w+\)s|\?")
+_PARAM_LIST = re.compile(r"\(\s*\?(\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """SQL with literals and placeholders replaced by `?` and IN-lists collapsed, so the same query
+    with different values (or a different number of ids) groups together."""
+    sql = _STRING.sub("?", statement)
+    sql = _PARAM.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PARAM_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def instrument_engine(engine) -> None:
+    """Record the queries run through engine as spans of the current trace."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _trace.get() is not None:
+        context._profile_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _trace.get()
+    started = getattr(context, "_profile_started", None)
+    if trace is None or started is None:
+        return
+    elapsed = time.perf_counter() - started
+    sql = fingerprint(statement)
+    totals = trace.queries.setdefault(sql, [0, 0.0])
+    totals[0] += 1
+    totals[1] += elapsed
+    trace.add_span("db", sql.split(" ", 1)[0].upper(), started, elapsed, sql)
+
+
+class _CpuSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval until stopped."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self.samples = 0
+        self._done = threading.Event()
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def stop(self) -> list[str]:
+        self._done.set()
+        self.join()
+        return [f"{stack} {n}" for stack, n in self.stacks.most_common(MAX_STACKS)]
+
+
+class ProfileBuffer:
+    """The most recent kept traces, oldest dropped first."""
+
+    def __init__(self, size: int):
+        self._lock = threading.Lock()
+        self._items: collections.deque[dict] = collections.deque(maxlen=max(1, size))
+        self._ids = itertools.count(1)
+
+    def add(self, profile: dict) -> dict:
+        with self._lock:
+            profile["id"] = next(self._ids)
+            self._items.append(profile)
+        return profile
+
+    def list(self) -> list[dict]:
+        with self._lock:
+            return list(reversed(self._items))
+
+    def get(self, profile_id: int) -> dict | None:
+        with self._lock:
+            return next((p for p in self._items if p["id"] == profile_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+profiles = ProfileBuffer(settings.profile_buffer_size)
+
+
+def profiling_enabled() -> bool:
+    return settings.profile_sample_rate > 0 or settings.profile_slow_ms > 0
+
+
+def _report(trace: Trace, route: str, status: int, duration: float, reason: str, cpu: list[str] | None) -> dict[str, Any]:
+    by_kind: dict[str, float] = {}
+    for kind, _, _, seconds, _ in trace.spans:
+        by_kind[kind] = by_kind.get(kind, 0.0) + seconds
+    queries = sorted(trace.queries.items(), key=lambda item: -item[1][1])
+    return {
+        "method": trace.method,
+        "path": trace.path,
+        "route": route,
+        "status": status,
+        "reason": reason,
+        "started_at": trace.started_at.isoformat(),
+        "duration_ms": round(duration * 1000, 2),
+        "time_by_kind_ms": {kind: round(s * 1000, 2) for kind, s in sorted(by_kind.items())},
+        "queries": [
+            {"fingerprint": sql, "count": count, "total_ms": round(seconds * 1000, 2)} for sql, (count, seconds) in queries
+        ],
+        "spans": [
+            {"kind": kind, "name": name, "offset_ms": round(offset * 1000, 2), "duration_ms": round(d * 1000, 2), "detail": detail}
+            for kind, name, offset, d, detail in trace.spans
+        ],
+        "dropped_spans": trace.dropped_spans,
+        "cpu_profile": cpu,
+    }
+
+
+class ProfilingMiddleware:
+    """Plain ASGI middleware: opens a trace per request and keeps it when sampled or slow."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_enabled():
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        sampled = random.random() < settings.profile_sample_rate
+        sampler = None
+        if sampled and settings.profile_cpu:
+            sampler = _CpuSampler(threading.get_ident(), settings.profile_cpu_interval_ms / 1000)
+            sampler.start()
+        trace = Trace(scope["method"], scope["path"])
+        token = _trace.set(trace)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - trace.started
+            _trace.reset(token)
+            cpu = sampler.stop() if sampler is not None else None
+            slow = settings.profile_slow_ms > 0 and duration * 1000 >= settings.profile_slow_ms
+            if sampled or slow:
+                route = getattr(scope.get("route"), "path", None) or "unmatched"
+                profiles.add(_report(trace, route, status[0], duration, "slow" if slow else "sampled", cpu))
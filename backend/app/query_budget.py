@@ -0,0 +1,150 @@
+"""Query budgets: how many SQL statements a route may run per request.
+
+Each route in `app/routers` declares its budget with `@query_budget(n)` under the route
+decorator. The count includes the queries of its dependencies, such as the user lookup in
+`get_current_user`. `QueryBudgetMiddleware` counts the statements each request runs, using
+SQLAlchemy cursor events on the engines, and checks them:
+
+- over budget: the route got an extra round trip;
+- the same statement shape (SQL fingerprint) `QUERY_REPEAT_THRESHOLD` times or more: an N+1 loop.
+
+Bulk routes whose query count grows with their input by design (the batched catalogue import)
+declare `@query_budget(None)` and are not checked.
+
+`QUERY_BUDGET_MODE=log` (the default) logs a warning for such requests. `raise` raises
+`QueryBudgetExceededError`, which the test suite turns on, so a change that adds queries to a route
+fails the tests until its budget is raised on purpose. `off` skips the check. Tests can also
+count a block directly with `count_queries()` / `assert_max_queries(n)`.
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, TypeVar
+
+from app.config import settings
+from app.profiling import fingerprint
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable)
+
+
+class QueryBudgetExceededError(AssertionError):
+    """A request or block ran more queries than its budget, or repeated one statement too often."""
+
+
+@dataclass
+class QueryLog:
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Statement fingerprints run at least threshold times: likely N+1 loops."""
+        counts = Counter(fingerprint(s) for s in self.statements)
+        return {sql: n for sql, n in counts.most_common() if n >= threshold}
+
+    def describe(self, limit: int = 20) -> str:
+        lines = [f"  {i + 1}. {fingerprint(s)[:200]}" for i, s in enumerate(self.statements[:limit])]
+        if self.count > limit:
+            lines.append(f"  ... {self.count - limit} more")
+        return "\n".join(lines)
+
+
+# Every open log receives every statement, so a test's count_queries() also sees the request's queries
+_active: ContextVar[tuple[QueryLog, ...]] = ContextVar("query_logs", default=())
+
+
+def instrument_engine(engine) -> None:
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for log in _active.get():
+        log.statements.append(statement)
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryLog]:
+    """Record the statements run inside the block (in this task and the threads it starts with
+    asyncio.to_thread)."""
+    log = QueryLog()
+    token = _active.set(_active.get() + (log,))
+    try:
+        yield log
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def assert_max_queries(budget: int) -> Iterator[QueryLog]:
+    with count_queries() as log:
+        yield log
+    if log.count > budget:
+        raise QueryBudgetExceededError(f"{log.count} queries, budget {budget}:\n{log.describe()}")
+
+
+def query_budget(budget: int | None) -> Callable[[F], F]:
+    """Declare the most queries one request to this route may run (None: unbounded, unchecked).
+    Returns the endpoint unchanged."""
+
+    def mark(endpoint: F) -> F:
+        endpoint.__query_budget__ = budget
+        return endpoint
+
+    return mark
+
+
+_UNDECLARED = object()
+
+
+def route_budget(route):
+    """The route's declared budget: an int, None for unbounded, or _UNDECLARED (health, metrics,
+    unmatched paths), which still gets the N+1 check."""
+    return getattr(getattr(route, "endpoint", None), "__query_budget__", _UNDECLARED)
+
+
+def check(log: QueryLog, budget, where: str) -> str | None:
+    """The problem with this request's queries, if any."""
+    problems = []
+    if isinstance(budget, int) and log.count > budget:
+        problems.append(f"{where} ran {log.count} queries, budget {budget}")
+    threshold = settings.query_repeat_threshold
+    # Fingerprinting is the costly part, and no statement can repeat threshold times in fewer queries
+    if log.count >= threshold:
+        for sql, n in log.repeated(threshold).items():
+            problems.append(f"{where} ran the same statement {n} times (N+1?): {sql[:200]}")
+    return "; ".join(problems) or None
+
+
+class QueryBudgetMiddleware:
+    """Plain ASGI middleware checking each request's queries against its route's budget."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        mode = settings.query_budget_mode
+        if scope["type"] != "http" or mode == "off":
+            await self.app(scope, receive, send)
+            return
+        with count_queries() as log:
+            await self.app(scope, receive, send)
+        route = scope.get("route")
+        budget = route_budget(route)
+        if budget is None:
+            return
+        problem = check(log, budget, f"{scope['method']} {getattr(route, 'path', scope['path'])}")
+        if problem is None:
+            return
+        if mode == "raise":
+            raise QueryBudgetExceededError(f"{problem}\n{log.describe()}")
+        logger.warning("%s", problem)
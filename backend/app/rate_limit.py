@@ -0,0 +1,230 @@
+"""Rate limiting and admission control, in front of the routers.
+
+Every client has a token bucket of `RATE_LIMIT_BURST` tokens that refills at
+`RATE_LIMIT_PER_SECOND`. The client is the user id in a valid bearer token, otherwise the
+client address. Each request spends its route's cost, which is 1 unless the endpoint declares
+another with `@rate_cost(n)` under the route decorator. The LLM and ML routes cost more. A
+request whose bucket is short gets a 429 with `Retry-After` set to the seconds until it would
+have enough tokens. Refused requests spend nothing.
+
+Routes declared `expensive=True` also share a per-process cap of `EXPENSIVE_MAX_CONCURRENCY`
+requests in flight. Past the cap they get a 503 with `Retry-After` straight away instead of
+queueing. A burst of slow LLM calls then cannot hold every connection and worker thread that
+cheap routes need.
+
+Buckets live in this process by default (`RATE_LIMIT_BACKEND=memory`), so with N workers a
+client gets up to N times the rate. `shared` keeps them in a memory-mapped file under
+`SHARED_STATE_DIR`, which every worker on the host updates under a byte-range lock on the
+client's slot. Cross-host limits belong at the load balancer.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Protocol, TypeVar
+
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+from app import metrics
+from app.auth import decode_token
+from app.config import settings
+
+F = TypeVar("F", bound=Callable)
+
+DEFAULT_COST = 1.0
+
+
+def rate_cost(cost: float, expensive: bool = False) -> Callable[[F], F]:
+    """Declare the tokens one request to this route spends (0: free) and whether it counts
+    against the expensive-route concurrency cap. Returns the endpoint unchanged."""
+
+    def mark(endpoint: F) -> F:
+        endpoint.__rate_cost__ = cost
+        endpoint.__expensive__ = expensive
+        return endpoint
+
+    return mark
+
+
+def route_cost(route) -> tuple[float, bool]:
+    endpoint = getattr(route, "endpoint", None)
+    return getattr(endpoint, "__rate_cost__", DEFAULT_COST), getattr(endpoint, "__expensive__", False)
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + max(0.0, now - updated) * rate)
+
+
+class BucketStore(Protocol):
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        """Spend cost tokens from key's bucket: 0 if taken, else the seconds until there would be enough."""
+
+
+class MemoryBucketStore:
+    """Buckets of this process, the least recently seen dropped past max_keys (a dropped
+    client starts again with a full bucket)."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = _refill(tokens, updated, now, rate, burst)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+
+class SharedBucketStore:
+    """Buckets shared by the processes on this host through a memory-mapped file of fixed slots.
+
+    A client hashes to one slot, holding (key hash, tokens, updated), and only that slot is
+    locked while it is updated. Two clients hashing to the same slot reset each other's bucket
+    to full, which errs towards admitting.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path: str, slots: int = 65536):
+        self.slots = slots
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        size = slots * self.SLOT.size
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size)
+
+    def take(self, key: str, cost: float, rate: float, burst: float) -> float:
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+        offset = (key_hash % self.slots) * self.SLOT.size
+        now = time.time()  # the same clock in every process
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+        try:
+            stored_hash, tokens, updated = self.SLOT.unpack_from(self._map, offset)
+            if stored_hash != key_hash:
+                tokens, updated = burst, now
+            tokens = _refill(tokens, updated, now, rate, burst)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self.SLOT.pack_into(self._map, offset, key_hash, tokens, now)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+        return wait
+
+
+class ConcurrencyGate:
+    """Counts the expensive requests in flight in this process (one event loop, so no lock)."""
+
+    def __init__(self):
+        self.in_flight = 0
+
+    def try_enter(self, cap: int) -> bool:
+        if self.in_flight >= cap:
+            return False
+        self.in_flight += 1
+        return True
+
+    def leave(self) -> None:
+        self.in_flight -= 1
+
+
+memory_store = MemoryBucketStore()
+expensive_gate = ConcurrencyGate()
+
+
+@lru_cache(maxsize=8)
+def _shared_store(path: str) -> SharedBucketStore:
+    return SharedBucketStore(path)
+
+
+def get_store() -> BucketStore:
+    if settings.rate_limit_backend == "shared":
+        return _shared_store(os.path.join(settings.shared_state_dir, "rate-limits.bin"))
+    return memory_store
+
+
+def client_key(scope) -> str:
+    """user:<id> for a valid bearer token, else ip:<client address> (behind a proxy, run the
+    server with its forwarded-headers option so this is the real client)."""
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                payload = decode_token(token)
+                if payload and "sub" in payload:
+                    return f"user:{payload['sub']}"
+            break
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def _match_route(scope):
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+    return None
+
+
+def _refuse(status: int, detail: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(
+        status_code=status, content={"detail": detail}, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class RateLimitMiddleware:
+    """Plain ASGI middleware: spend the route's cost from the client's bucket, then hold an
+    expensive-route slot for the whole response, streamed bodies included."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.rate_limit_enabled:
+            await self.app(scope, receive, send)
+            return
+        route = _match_route(scope)
+        if route is not None:
+            scope["route"] = route  # as the router would, so refusals are labelled by route in the metrics
+        cost, expensive = route_cost(route)
+        label = getattr(route, "path", "unmatched")
+        if cost > 0:
+            burst = max(settings.rate_limit_burst, cost)  # a cost above the burst could never be paid
+            wait = get_store().take(client_key(scope), cost, settings.rate_limit_per_second, burst)
+            if wait > 0:
+                metrics.RATE_LIMITED.inc(label, "rate")
+                await _refuse(429, "Rate limit exceeded", wait)(scope, receive, send)
+                return
+        cap = settings.expensive_max_concurrency
+        if not expensive or cap <= 0:
+            await self.app(scope, receive, send)
+            return
+        if not expensive_gate.try_enter(cap):
+            metrics.RATE_LIMITED.inc(label, "busy")
+            await _refuse(503, "Server busy, try again shortly", 1)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            expensive_gate.leave()
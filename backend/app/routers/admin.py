@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from app.config import settings
+from app.deps import require_admin
+from app.profiling import profiles, profiling_enabled
+from app.query_budget import query_budget
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profiles")
+@query_budget(0)
+async def list_profiles(limit: int = 50):
+    """Kept request profiles, newest first, without their spans."""
+    summaries = [
+        {k: p[k] for k in ("id", "method", "path", "route", "status", "reason", "started_at", "duration_ms", "time_by_kind_ms")}
+        for p in profiles.list()[: max(0, limit)]
+    ]
+    return {
+        "enabled": profiling_enabled(),
+        "sample_rate": settings.profile_sample_rate,
+        "slow_ms": settings.profile_slow_ms,
+        "profiles": summaries,
+    }
+
+
+@router.get("/profiles/{profile_id}")
+@query_budget(0)
+async def get_profile(profile_id: int):
+    """One profile: spans in start order, queries grouped by fingerprint, and the CPU stacks if sampled."""
+    profile = profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found (or rotated out)")
+    return profile
+
+
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(0)
+async def clear_profiles():
+    profiles.clear()
@@ -7,11 +7,13 @@ from app.models import User
 from app.schemas import UserCreate, UserResponse, UserUpdate, TokenResponse, LoginRequest
 from app.auth import hash_password, verify_password, create_token
 from app.deps import get_current_user
+from app.query_budget import query_budget
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/signup", response_model=UserResponse)
+@query_budget(3)
 async def signup(data: UserCreate, db: AsyncSession = Depends(get_db)):
     r = await db.execute(select(User).where(User.email == data.email))
     if r.scalar_one_or_none():
@@ -24,6 +26,7 @@ async def signup(data: UserCreate, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
+@query_budget(1)
 async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     r = await db.execute(select(User).where(User.email == data.email))
     user = r.scalar_one_or_none()
@@ -34,11 +37,13 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
+@query_budget(1)
 async def me(user: User = Depends(get_current_user)):
     return user
 
 
 @router.put("/me", response_model=UserResponse)
+@query_budget(3)
 async def update_profile(data: UserUpdate, user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     if data.full_name is not None:
         user.full_name = data.full_name
@@ -48,5 +53,6 @@ async def update_profile(data: UserUpdate, user: User = Depends(get_current_user
 
 
 @router.post("/signout")
+@query_budget(0)
 async def signout():
     return {"message": "Signed out"}
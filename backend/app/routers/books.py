@@ -1,127 +1,70 @@
 import uuid
-from datetime import datetime
 from io import BytesIO
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File, Form, BackgroundTasks
 from fastapi.responses import FileResponse, Response
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app import inventory
 from app.db import get_db
-from app.models import User, Book, Borrow, Review, BookSummary, ReviewAnalysis
+from app.models import User, Book, BookStats, Borrow, Review, BookSummary, ReviewAnalysis, ImportJob
 from app.schemas import (
+    AvailabilityResponse,
+    BookBatchRequest,
+    BookBatchResponse,
     BookCreate,
     BookDetailResponse,
     BookListResponse,
     BookResponse,
+    BookSearchHit,
+    BookSearchResponse,
     BookUpdate,
+    HoldResponse,
+    ImportJobResponse,
+    ImportReportResponse,
+    InventoryUpdate,
     MyReviewResponse,
     ReviewCreate,
     ReviewResponse,
+    TrendingBookResponse,
+    TrendingResponse,
 )
-from app.deps import get_current_user, get_optional_user, get_storage, get_llm
+from app.catalog import catalog_version, record_change, touch_book
+from app.catalog_import import CatalogImportError, detect_format, iter_rows, open_archive, open_metadata, run_import
+from app.deps import get_current_user, get_optional_user, get_storage, get_llm, require_admin
+from app.facets import facet_values, get_facets, update_facet_counts
+from app.http_cache import cache_headers, cached_response, invalidate_book, invalidate_catalog, make_etag
+from app.inventory import InventoryError
+from app.search import search_books
+from app.stats import record_rating
+from app.summarization import MIN_CONTENT_LENGTH, get_progress
+from app.tasks import run_bulk_summary_task, run_summary_task, run_sentiment_task
+from app.trending import get_trending, record_event
+from app.query_budget import query_budget
 
 router = APIRouter(prefix="/books", tags=["books"])
 
-# Constants for text extraction
-MIN_CONTENT_LENGTH = 50
-MAX_PDF_PAGES = 50
-MAX_PDF_TEXT_LENGTH = 12000
-MAX_TEXT_LENGTH = 8000
-MIN_EXTRACTED_TEXT_LENGTH = 100
-
 # Constants for pagination
 DEFAULT_PAGE_LIMIT = 20
 MIN_PAGE_LIMIT = 1
 MAX_PAGE_LIMIT = 100
+MAX_BATCH_IDS = 250  # ids per GET/POST /books/batch
 
 # Constants for ratings
 MIN_RATING = 1
 MAX_RATING = 5
 
-
-def _extract_text_for_summary(content: bytes, filename: str | None) -> str | None:
-    """Extract plain text from file content for LLM summarization. Returns None if not usable."""
-    if not content or len(content) < MIN_CONTENT_LENGTH:
-        return None
-    ext = (filename or "").split(".")[-1].lower() if "." in (filename or "") else ""
-    if ext == "pdf":
-        try:
-            from pypdf import PdfReader
-            reader = PdfReader(BytesIO(content))
-            parts = []
-            for page in reader.pages[:MAX_PDF_PAGES]:
-                t = page.extract_text()
-                if t:
-                    parts.append(t)
-            text = "\n".join(parts).strip()[:MAX_PDF_TEXT_LENGTH]
-            if not text or text.startswith("%PDF") or len(text) < MIN_EXTRACTED_TEXT_LENGTH:
-                return None
-            return text
-        except Exception:  # PDF parsing can fail for various reasons
-            return None
-    try:
-        text = content.decode("utf-8", errors="ignore").strip()[:MAX_TEXT_LENGTH]
-        if not text or text.startswith("%PDF"):
-            return None
-        return text
-    except Exception:  # Text decoding can fail for binary content
-        return None
-
-
-def _run_summary_task(book_id: int, text: str):
-    import asyncio
-    import threading
-    from app.db import SessionLocal
-    from app.deps import get_llm
-
-    async def _run():
-        llm = get_llm()
-        summary_text = await llm.summarize(text)
-        async with SessionLocal() as db:
-            from app.models import BookSummary, Book
-            summary_result = await db.execute(select(BookSummary).where(BookSummary.book_id == book_id))
-            summary_row = summary_result.scalar_one_or_none()
-            if summary_row:
-                summary_row.content = summary_text
-            else:
-                summary_row = BookSummary(book_id=book_id, content=summary_text)
-                db.add(summary_row)
-            book_result = await db.execute(select(Book).where(Book.id == book_id))
-            book = book_result.scalar_one()
-            book.summary = summary_text
-            await db.commit()
-
-    def run():
-        asyncio.run(_run())
-    threading.Thread(target=run, daemon=True).start()
-
-
-def _run_sentiment_task(book_id: int, review_texts: list[str]):
-    import asyncio
-    import threading
-    from app.db import SessionLocal
-    from app.deps import get_llm
-
-    async def _run():
-        llm = get_llm()
-        consensus = await llm.analyze_sentiment(review_texts)
-        async with SessionLocal() as db:
-            from app.models import ReviewAnalysis
-            analysis_result = await db.execute(select(ReviewAnalysis).where(ReviewAnalysis.book_id == book_id))
-            analysis_row = analysis_result.scalar_one_or_none()
-            if analysis_row:
-                analysis_row.consensus = consensus
-            else:
-                analysis_row = ReviewAnalysis(book_id=book_id, consensus=consensus)
-                db.add(analysis_row)
-            await db.commit()
-
-    def run():
-        asyncio.run(_run())
-    threading.Thread(target=run, daemon=True).start()
+# Sort keys for GET /books; books without reviews sort last for the rating-based ones
+BOOK_SORTS = {
+    "newest": (Book.created_at.desc(),),
+    "title": (Book.title.asc(),),
+    "rating": (BookStats.rating_average.desc().nulls_last(), BookStats.rating_count.desc().nulls_last()),
+    "reviews": (BookStats.rating_count.desc().nulls_last(),),
+}
 
 
 @router.post("", response_model=BookResponse)
+@query_budget(6)
 async def create_book(
     background_tasks: BackgroundTasks,
     title: str = Form(...),
@@ -152,39 +95,262 @@ async def create_book(
         added_by_user_id=user.id,
     )
     db.add(book)
+    await update_facet_counts(db, facet_values(None), facet_values(book))
+    await db.flush()
+    await record_change(db, "created", book.id)
     await db.commit()
     await db.refresh(book)
+    invalidate_catalog()
 
-    if file_path and content:
-        text = _extract_text_for_summary(content, file_name)
-        if text:
-            background_tasks.add_task(_run_summary_task, book.id, text)
+    if file_path and len(content) >= MIN_CONTENT_LENGTH:
+        background_tasks.add_task(run_summary_task, book.id, content, file_name)
 
     return book
 
 
+@router.post("/import", response_model=ImportReportResponse)
+@query_budget(None)
+async def import_books(
+    background_tasks: BackgroundTasks,
+    metadata: UploadFile = File(...),
+    files: UploadFile = File(None),
+    format: str = Form(None),
+    job_id: int = Form(None),
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    storage=Depends(get_storage),
+):
+    """Bulk-import books from CSV/NDJSON metadata (title, author, genre, summary, file) and an optional zip of files.
+
+    A failed run can be resumed by sending the same files again with its job_id.
+    """
+    try:
+        fmt = detect_format(metadata.filename, format)
+        archive = open_archive(files.file if files and files.filename else None)
+    except CatalogImportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if job_id is not None:
+        job = await db.get(ImportJob, job_id)
+        if not job or job.user_id != user.id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+        if job.status == "done":
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Import job already completed")
+    else:
+        job = ImportJob(user_id=user.id, source_name=metadata.filename)
+        db.add(job)
+        await db.commit()
+    report = await run_import(db, storage, iter_rows(open_metadata(metadata.file), fmt), job, archive=archive)
+    if report.summary_items:
+        background_tasks.add_task(run_bulk_summary_task, report.summary_items)
+    return report.as_dict()
+
+
+@router.get("/import/{job_id}", response_model=ImportJobResponse)
+@query_budget(2)
+async def get_import_job(
+    job_id: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    job = await db.get(ImportJob, job_id)
+    if not job or job.user_id != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Import job not found")
+    return job
+
+
 @router.get("", response_model=BookListResponse)
+@query_budget(4)
 async def list_books(
+    request: Request,
     skip: int = 0,
     limit: int = DEFAULT_PAGE_LIMIT,
+    genre: str | None = None,
+    author: str | None = None,
+    has_summary: bool | None = None,
+    added_by: int | None = None,
+    sort: str = "newest",
+    facets: bool = True,
     db: AsyncSession = Depends(get_db),
 ):
+    if sort not in BOOK_SORTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"sort must be one of {', '.join(BOOK_SORTS)}"
+        )
     limit = min(max(MIN_PAGE_LIMIT, limit), MAX_PAGE_LIMIT)
-    total_result = await db.execute(select(func.count(Book.id)))
-    total = total_result.scalar() or 0
-    books_result = await db.execute(
-        select(Book).offset(skip).limit(limit).order_by(Book.created_at.desc())
+    etag = make_etag("catalog", await catalog_version(db))
+    return await cached_response(
+        request, etag, lambda: _list_books(db, skip, limit, genre, author, has_summary, added_by, sort, facets)
     )
+
+
+async def _list_books(
+    db: AsyncSession,
+    skip: int,
+    limit: int,
+    genre: str | None,
+    author: str | None,
+    has_summary: bool | None,
+    added_by: int | None,
+    sort: str,
+    facets: bool,
+) -> BookListResponse:
+    filters = []
+    if genre:
+        filters.append(Book.genre == genre)
+    if author:
+        filters.append(Book.author == author)
+    if has_summary is not None:
+        with_summary = func.coalesce(func.length(Book.summary), 0) > 0
+        filters.append(with_summary if has_summary else ~with_summary)
+    if added_by is not None:
+        filters.append(Book.added_by_user_id == added_by)
+    total_result = await db.execute(select(func.count(Book.id)).where(*filters))
+    total = total_result.scalar() or 0
+    stmt = select(Book).where(*filters)
+    if sort in ("rating", "reviews"):
+        stmt = stmt.outerjoin(BookStats, BookStats.book_id == Book.id)
+    books_result = await db.execute(stmt.order_by(*BOOK_SORTS[sort], Book.id.desc()).offset(skip).limit(limit))
     items = books_result.scalars().all()
-    return BookListResponse(items=items, total=total, skip=skip, limit=limit)
+    facet_counts = await get_facets(db) if facets else None
+    return BookListResponse(items=items, total=total, skip=skip, limit=limit, facets=facet_counts)
+
+
+@router.get("/search", response_model=BookSearchResponse)
+@query_budget(5)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    genre: str | None = None,
+    author: str | None = None,
+    limit: int = DEFAULT_PAGE_LIMIT,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Ranked full-text search over title, author, genre and summary, with prefix matching."""
+    limit = min(max(MIN_PAGE_LIMIT, limit), MAX_PAGE_LIMIT)
+    try:
+        hits, next_cursor = await search_books(db, q, genre=genre, author=author, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    items = [
+        BookSearchHit.model_validate({**BookResponse.model_validate(book).model_dump(), "rank": rank})
+        for book, rank in hits
+    ]
+    return BookSearchResponse(items=items, next_cursor=next_cursor)
+
+
+@router.get("/trending", response_model=TrendingResponse)
+@query_budget(1)
+async def trending(
+    limit: int = DEFAULT_PAGE_LIMIT,
+    genre: str | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Most borrowed and reviewed books lately, from the periodically rebuilt top-K."""
+    limit = min(max(MIN_PAGE_LIMIT, limit), MAX_PAGE_LIMIT)
+    hits, computed_at = await get_trending(db, limit, genre=genre)
+    items = [
+        TrendingBookResponse.model_validate({**BookResponse.model_validate(book).model_dump(), "score": round(score, 4)})
+        for book, score in hits
+    ]
+    return TrendingResponse(items=items, computed_at=computed_at)
+
+
+@router.get("/batch", response_model=BookBatchResponse)
+@query_budget(4)
+async def get_books_batch(
+    request: Request,
+    response: Response,
+    ids: str = Query(..., description=f"comma-separated book ids, at most {MAX_BATCH_IDS}"),
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_optional_user),
+):
+    """Details of several books in the order given, with the caller's borrow and review state.
+
+    A constant number of queries for any number of ids. Unknown ids are listed in `missing`.
+    Anonymous reads are cached by the catalogue version, like GET /books.
+    """
+    book_ids = _batch_ids(ids.split(","))
+    if user is None:
+        etag = make_etag("catalog", await catalog_version(db))
+        return await cached_response(request, etag, lambda: _books_batch(db, book_ids, None))
+    response.headers.update(cache_headers(public=False))
+    return await _books_batch(db, book_ids, user)
+
+
+@router.post("/batch", response_model=BookBatchResponse)
+@query_budget(4)
+async def post_books_batch(
+    data: BookBatchRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_optional_user),
+):
+    """GET /books/batch for id lists too long for a URL."""
+    book_ids = _batch_ids(data.ids)
+    response.headers.update(cache_headers(public=False))
+    return await _books_batch(db, book_ids, user)
+
+
+def _batch_ids(raw: list) -> list[int]:
+    """Distinct ids in their first-seen order; 400 if malformed, empty or too many."""
+    try:
+        book_ids = list(dict.fromkeys(int(str(v).strip()) for v in raw if str(v).strip()))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="ids must be integers")
+    if not book_ids or len(book_ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail=f"Pass between 1 and {MAX_BATCH_IDS} ids"
+        )
+    return book_ids
+
+
+async def _books_batch(db: AsyncSession, book_ids: list[int], user: User | None) -> BookBatchResponse:
+    books = {b.id: b for b in (await db.execute(select(Book).where(Book.id.in_(book_ids)))).scalars()}
+    borrowed: set[int] = set()
+    reviews: dict[int, Review] = {}
+    if user and books:
+        borrowed = set(
+            (await db.execute(
+                select(Borrow.book_id).where(
+                    Borrow.user_id == user.id, Borrow.book_id.in_(books), Borrow.returned_at.is_(None)
+                )
+            )).scalars()
+        )
+        review_rows = await db.execute(
+            select(Review).where(Review.user_id == user.id, Review.book_id.in_(books)).order_by(Review.id)
+        )
+        for review in review_rows.scalars():
+            reviews.setdefault(review.book_id, review)
+    items = []
+    for book_id in book_ids:
+        if book_id in books:
+            review = reviews.get(book_id)
+            my_review = MyReviewResponse(rating=review.rating, text=review.text) if review else None
+            items.append(_detail(books[book_id], book_id in borrowed, book_id in borrowed, my_review))
+    return BookBatchResponse(items=items, missing=[book_id for book_id in book_ids if book_id not in books])
 
 
 @router.get("/{book_id}", response_model=BookDetailResponse)
+@query_budget(4)
 async def get_book(
     book_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     user: User | None = Depends(get_optional_user),
 ):
+    """Anonymous reads are validated and cached by the book's version; signed-in ones carry per-user fields."""
+    if user is None:
+        version = (await db.execute(select(Book.version).where(Book.id == book_id))).scalar_one_or_none()
+        if version is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+        etag = make_etag("book", book_id, version)
+        return await cached_response(request, etag, lambda: _book_detail(db, book_id, None), tags=(("book", book_id),))
+    response.headers.update(cache_headers(public=False))
+    return await _book_detail(db, book_id, user)
+
+
+async def _book_detail(db: AsyncSession, book_id: int, user: User | None) -> BookDetailResponse:
     book_result = await db.execute(select(Book).where(Book.id == book_id))
     book = book_result.scalar_one_or_none()
     if not book:
@@ -208,6 +374,10 @@ async def get_book(
         review_row = review_result.scalars().first()
         if review_row:
             my_review = MyReviewResponse(rating=review_row.rating, text=review_row.text)
+    return _detail(book, currently_borrowed_by_me, can_review, my_review)
+
+
+def _detail(book: Book, currently_borrowed_by_me: bool, can_review: bool, my_review: MyReviewResponse | None) -> BookDetailResponse:
     return BookDetailResponse(
         id=book.id,
         title=book.title,
@@ -215,6 +385,9 @@ async def get_book(
         genre=book.genre,
         summary=book.summary,
         created_at=book.created_at,
+        rating_count=book.rating_count,
+        rating_average=book.rating_average,
+        rating_histogram=book.rating_histogram,
         currently_borrowed_by_me=currently_borrowed_by_me,
         can_review=can_review,
         file_name=book.file_name,
@@ -222,7 +395,22 @@ async def get_book(
     )
 
 
+@router.get("/{book_id}/summary/progress")
+@query_budget(1)
+async def get_summary_progress(book_id: int, db: AsyncSession = Depends(get_db)):
+    """Progress of the background summary for a book (tracked in this API process)."""
+    progress = get_progress(book_id)
+    if progress:
+        return progress.as_dict()
+    book_result = await db.execute(select(Book).where(Book.id == book_id))
+    book = book_result.scalar_one_or_none()
+    if not book:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    return {"book_id": book_id, "status": "done" if book.summary else "not_started"}
+
+
 @router.get("/{book_id}/file")
+@query_budget(2)
 async def get_book_file(
     book_id: int,
     user: User = Depends(get_current_user),
@@ -244,6 +432,7 @@ async def get_book_file(
 
 
 @router.put("/{book_id}", response_model=BookResponse)
+@query_budget(9)
 async def update_book(
     book_id: int,
     data: BookUpdate,
@@ -254,18 +443,23 @@ async def update_book(
     book = book_result.scalar_one_or_none()
     if not book:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    before = facet_values(book)
     if data.title is not None:
         book.title = data.title
     if data.author is not None:
         book.author = data.author
     if data.genre is not None:
         book.genre = data.genre
+    await update_facet_counts(db, before, facet_values(book))
+    await touch_book(db, book_id, "updated")
     await db.commit()
     await db.refresh(book)
+    invalidate_book(book_id)
     return book
 
 
 @router.delete("/{book_id}")
+@query_budget(12)
 async def delete_book(
     book_id: int,
     user: User = Depends(get_current_user),
@@ -278,50 +472,125 @@ async def delete_book(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
     if book.file_path:
         await storage.delete(book.file_path)
+    await update_facet_counts(db, facet_values(book), facet_values(None))
     await db.delete(book)
+    await record_change(db, "deleted", book_id)
     await db.commit()
+    invalidate_book(book_id)
     return {"ok": True}
 
 
 @router.post("/{book_id}/borrow")
+@query_budget(7)
 async def borrow_book(
     book_id: int,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    book_result = await db.execute(select(Book).where(Book.id == book_id))
-    book = book_result.scalar_one_or_none()
-    if not book:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
-    existing_borrow_result = await db.execute(
-        select(Borrow).where(Borrow.book_id == book_id, Borrow.user_id == user.id, Borrow.returned_at.is_(None))
-    )
-    if existing_borrow_result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Already borrowed")
-    borrow = Borrow(user_id=user.id, book_id=book_id)
-    db.add(borrow)
+    """Borrow a copy. 409 when none is free: place a hold to get the next one returned."""
+    try:
+        await inventory.borrow(db, book_id, user.id)
+    except InventoryError as e:
+        await _inventory_failed(db, e)
+    await record_event(db, book_id, borrows=1)
     await db.commit()
     return {"ok": True}
 
 
 @router.post("/{book_id}/return")
+@query_budget(5)
 async def return_book(
     book_id: int,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    borrow_result = await db.execute(
-        select(Borrow).where(Borrow.book_id == book_id, Borrow.user_id == user.id, Borrow.returned_at.is_(None))
-    )
-    borrow = borrow_result.scalar_one_or_none()
-    if not borrow:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No active borrow for this book")
-    borrow.returned_at = datetime.utcnow()
+    """Return a borrowed copy; it goes to the oldest hold on the book, if any."""
+    try:
+        holder = await inventory.return_book(db, book_id, user.id)
+    except InventoryError as e:
+        await _inventory_failed(db, e)
+    if holder is not None:
+        await record_event(db, book_id, borrows=1)
     await db.commit()
     return {"ok": True}
 
 
+@router.get("/{book_id}/availability", response_model=AvailabilityResponse)
+@query_budget(3)
+async def get_availability(
+    book_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    user: User | None = Depends(get_optional_user),
+):
+    """Copies, free copies and the hold queue. Not cached: it changes with every borrow."""
+    result = await inventory.availability(db, book_id, user.id if user else None)
+    if result is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    response.headers.update(cache_headers(public=False))
+    return result
+
+
+@router.put("/{book_id}/inventory", response_model=AvailabilityResponse, dependencies=[Depends(require_admin)])
+@query_budget(None)
+async def set_inventory(
+    book_id: int,
+    data: InventoryUpdate,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Set the number of copies (admin only). Added copies go to the hold queue first."""
+    if data.total_copies < 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="total_copies must be 0 or more")
+    try:
+        served = await inventory.set_copies(db, book_id, data.total_copies)
+    except InventoryError as e:
+        await _inventory_failed(db, e)
+    if served:
+        await record_event(db, book_id, borrows=len(served))
+    await db.commit()
+    return await inventory.availability(db, book_id, user.id)
+
+
+@router.post("/{book_id}/hold", response_model=HoldResponse)
+@query_budget(6)
+async def place_hold(
+    book_id: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Join the queue for a book with no free copy; the next returned copy is lent to the oldest hold."""
+    try:
+        position = await inventory.place_hold(db, book_id, user.id)
+    except InventoryError as e:
+        await _inventory_failed(db, e)
+    await db.commit()
+    return HoldResponse(book_id=book_id, position=position)
+
+
+@router.delete("/{book_id}/hold")
+@query_budget(3)
+async def cancel_hold(
+    book_id: int,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        await inventory.cancel_hold(db, book_id, user.id)
+    except InventoryError as e:
+        await _inventory_failed(db, e)
+    await db.commit()
+    return {"ok": True}
+
+
+async def _inventory_failed(db: AsyncSession, error: InventoryError):
+    # Undo a copy taken before the failure (e.g. a duplicate loan rejected by the unique index)
+    await db.rollback()
+    raise HTTPException(status_code=error.status_code, detail=str(error))
+
+
 @router.post("/{book_id}/reviews", response_model=ReviewResponse)
+@query_budget(10)
 async def create_review(
     book_id: int,
     data: ReviewCreate,
@@ -339,24 +608,34 @@ async def create_review(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Rating must be {MIN_RATING}-{MAX_RATING}")
     review = Review(user_id=user.id, book_id=book_id, rating=data.rating, text=data.text)
     db.add(review)
+    await record_rating(db, book_id, data.rating)
+    await record_event(db, book_id, reviews=1)
+    await touch_book(db, book_id, "review")
     await db.commit()
     await db.refresh(review)
+    invalidate_book(book_id)
 
     reviews_result = await db.execute(select(Review).where(Review.book_id == book_id))
     all_reviews = reviews_result.scalars().all()
     texts = [r.text or f"Rating: {r.rating}" for r in all_reviews if r.text or r.rating]
     if texts:
-        background_tasks.add_task(_run_sentiment_task, book_id, texts)
+        background_tasks.add_task(run_sentiment_task, book_id, texts)
 
     return review
 
 
 @router.get("/{book_id}/analysis")
-async def get_analysis(book_id: int, db: AsyncSession = Depends(get_db)):
-    book_result = await db.execute(select(Book).where(Book.id == book_id))
-    book = book_result.scalar_one_or_none()
-    if not book:
+@query_budget(3)
+async def get_analysis(book_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    version = (await db.execute(select(Book.version).where(Book.id == book_id))).scalar_one_or_none()
+    if version is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    etag = make_etag("analysis", book_id, version)
+    return await cached_response(request, etag, lambda: _analysis(db, book_id), tags=(("book", book_id),))
+
+
+async def _analysis(db: AsyncSession, book_id: int) -> dict:
+    book = (await db.execute(select(Book).where(Book.id == book_id))).scalar_one()
     analysis_result = await db.execute(select(ReviewAnalysis).where(ReviewAnalysis.book_id == book_id))
     review_analysis = analysis_result.scalar_one_or_none()
     return {"summary": book.summary, "consensus": review_analysis.consensus if review_analysis else None}
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog import catalog_version, changes_since, history_complete_since
+from app.db import get_db
+from app.query_budget import query_budget
+from app.schemas import ChangeFeedResponse
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+DEFAULT_FEED_LIMIT = 500
+MAX_FEED_LIMIT = 5000
+
+
+@router.get("", response_model=ChangeFeedResponse)
+@query_budget(3)
+async def change_feed(
+    response: Response,
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_FEED_LIMIT, ge=1, le=MAX_FEED_LIMIT),
+    db: AsyncSession = Depends(get_db),
+):
+    """Catalogue changes after version `since`, oldest first.
+
+    `410 Gone` means entries after `since` have been pruned (or `since` is from another
+    database): reload everything, then continue from the returned `X-Catalog-Version`.
+    """
+    version = await catalog_version(db)
+    response.headers["X-Catalog-Version"] = str(version)
+    if since > version or (since < version and not await history_complete_since(db, since)):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Changes after this version are no longer kept; resync",
+            headers={"X-Catalog-Version": str(version)},
+        )
+    changes = await changes_since(db, since, limit)
+    next_since = changes[-1].version if changes else since
+    return ChangeFeedResponse(
+        version=version, changes=changes, next_since=next_since, has_more=next_since < version
+    )
+
+
+@router.get("/version")
+@query_budget(1)
+async def current_version(db: AsyncSession = Depends(get_db)):
+    """The current catalogue version: one primary-key read, for cheap "has anything changed?" polls."""
+    return {"version": await catalog_version(db)}
@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_db
+from app.deps import require_admin
+from app.export import (
+    EXPORT_TABLES,
+    FORMATS,
+    ExportError,
+    check_format,
+    current_watermark,
+    get_export_table,
+    stream_export,
+)
+from app.query_budget import query_budget
+
+# Bulk export includes every reader's borrows and reviews: an operator feature
+router = APIRouter(prefix="/export", tags=["export"], dependencies=[Depends(require_admin)])
+
+
+@router.get("")
+@query_budget(0)
+async def list_exports():
+    return {"tables": list(EXPORT_TABLES), "formats": list(FORMATS)}
+
+
+@router.get("/{table}")
+@query_budget(2)
+async def export_table(
+    table: str,
+    format: str = "ndjson",
+    since: datetime | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    """Stream the rows of a table changed after `since`.
+
+    The `X-Export-Watermark` response header is the `since` to send next time.
+    """
+    try:
+        export = get_export_table(table)
+    except ExportError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    try:
+        check_format(format)
+    except ExportError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    until = await current_watermark(db, export, since)
+
+    async def body():
+        # The request's session is released before the body streams, so close it here once done.
+        try:
+            async for chunk in stream_export(db, table, format, since=since, until=until):
+                yield chunk
+        finally:
+            await db.close()
+
+    headers = {"Content-Disposition": f'attachment; filename="{table}.{format}"'}
+    if until is not None:
+        headers["X-Export-Watermark"] = until.isoformat()
+    return StreamingResponse(body(), media_type=FORMATS[format], headers=headers)
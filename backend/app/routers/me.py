@@ -0,0 +1,81 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cursor import decode_cursor, encode_cursor
+from app.db import get_db
+from app.deps import get_current_user
+from app.http_cache import cache_headers
+from app.models import Book, Borrow, Review, User
+from app.query_budget import query_budget
+from app.schemas import (
+    BookResponse,
+    BorrowHistoryItem,
+    BorrowHistoryResponse,
+    ReviewHistoryItem,
+    ReviewHistoryResponse,
+)
+
+router = APIRouter(prefix="/me", tags=["me"])
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+
+def _page(stmt, at_column, id_column, limit: int, cursor: str | None):
+    """Newest first by (at, id), after the cursor: one indexed range scan of the user's rows."""
+    if cursor:
+        try:
+            at, row_id = decode_cursor(cursor, datetime.fromisoformat)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        stmt = stmt.where(or_(at_column < at, and_(at_column == at, id_column < row_id)))
+    return stmt.order_by(at_column.desc(), id_column.desc()).limit(limit + 1)
+
+
+@router.get("/borrows", response_model=BorrowHistoryResponse)
+@query_budget(2)
+async def my_borrows(
+    response: Response,
+    active: bool | None = None,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str | None = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """The signed-in user's borrows with their books, newest first: current ones with `active=true`,
+    returned ones with `active=false`, both by default."""
+    stmt = select(Borrow, Book).join(Book, Book.id == Borrow.book_id).where(Borrow.user_id == user.id)
+    if active is not None:
+        stmt = stmt.where(Borrow.returned_at.is_(None) if active else Borrow.returned_at.is_not(None))
+    rows = (await db.execute(_page(stmt, Borrow.borrowed_at, Borrow.id, limit, cursor))).all()
+    next_cursor = encode_cursor(rows[limit - 1][0].borrowed_at, rows[limit - 1][0].id) if len(rows) > limit else None
+    items = [
+        BorrowHistoryItem(id=borrow.id, borrowed_at=borrow.borrowed_at, returned_at=borrow.returned_at, book=BookResponse.model_validate(book))
+        for borrow, book in rows[:limit]
+    ]
+    response.headers.update(cache_headers(public=False))
+    return BorrowHistoryResponse(items=items, next_cursor=next_cursor)
+
+
+@router.get("/reviews", response_model=ReviewHistoryResponse)
+@query_budget(2)
+async def my_reviews(
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: str | None = None,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """The signed-in user's reviews with their books, newest first."""
+    stmt = select(Review, Book).join(Book, Book.id == Review.book_id).where(Review.user_id == user.id)
+    rows = (await db.execute(_page(stmt, Review.created_at, Review.id, limit, cursor))).all()
+    next_cursor = encode_cursor(rows[limit - 1][0].created_at, rows[limit - 1][0].id) if len(rows) > limit else None
+    items = [
+        ReviewHistoryItem(id=review.id, rating=review.rating, text=review.text, created_at=review.created_at, book=BookResponse.model_validate(book))
+        for review, book in rows[:limit]
+    ]
+    response.headers.update(cache_headers(public=False))
+    return ReviewHistoryResponse(items=items, next_cursor=next_cursor)
@@ -1,23 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from typing import Any, AsyncIterator
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.catalog import catalog_version
 from app.db import get_db
 from app.models import User, Book, UserPreference, Borrow
 from app.config import settings
 from app.deps import get_current_user, get_llm
 from app.schemas import PreferenceCreate
-from app.recommendation_ml import (
-    similar_books,
-    collaborative_scores,
-    content_similarity_to_user_books,
-    build_book_matrix,
-)
+from app.book_vectors import get_book_vectors
+from app.recommendation_ml import MAX_BOOKS_FOR_ML, collaborative_scores
+from app.http_cache import cached_response, make_etag
+from app.trending import popularity_scores
 from app.llm.base import LLMBackend
+from app.llm.scheduler import LLMOverloadedError
+from app.profiling import span
+from app.query_budget import query_budget
+from app.rate_limit import rate_cost
 
 router = APIRouter(tags=["recommendations"])
 
-MAX_BOOKS_FOR_ML = 500
 MAX_CANDIDATES_FOR_LLM = 80
 
 
@@ -28,7 +34,33 @@ def _norm(scores: dict[int, float]) -> dict[int, float]:
     return {k: v / m for k, v in scores.items()}
 
 
+def _sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _sse_suggestions(suggestions: AsyncIterator[dict[str, str]]) -> AsyncIterator[str]:
+    """Emit one `suggestion` event per parsed line, then a final `done` event with the count."""
+    count = 0
+    try:
+        async for suggestion in suggestions:
+            count += 1
+            yield _sse_event("suggestion", suggestion)
+    except LLMOverloadedError as e:
+        yield _sse_event("error", {"detail": e.detail, "retry_after": e.retry_after})
+        return
+    yield _sse_event("done", {"count": count})
+
+
+def _sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/preferences")
+@query_budget(2)
 async def list_preferences(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
@@ -38,6 +70,7 @@ async def list_preferences(
 
 
 @router.post("/preferences")
+@query_budget(3)
 async def set_preference(
     data: PreferenceCreate,
     user: User = Depends(get_current_user),
@@ -54,6 +87,8 @@ async def set_preference(
 
 
 @router.get("/recommendations/suggestions")
+@query_budget(2)
+@rate_cost(10, expensive=True)
 async def get_ai_suggestions(
     limit: int = 10,
     user: User = Depends(get_current_user),
@@ -70,6 +105,8 @@ async def get_ai_suggestions(
 
 
 @router.get("/recommendations/suggestions/similar/{book_id}")
+@query_budget(2)
+@rate_cost(10, expensive=True)
 async def get_ai_suggestions_similar_to_book(
     book_id: int,
     limit: int = 6,
@@ -92,7 +129,49 @@ async def get_ai_suggestions_similar_to_book(
     return {"suggestions": suggestions}
 
 
+@router.get("/recommendations/suggestions/stream")
+@query_budget(2)
+@rate_cost(10, expensive=True)
+async def stream_ai_suggestions(
+    limit: int = 10,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    llm: LLMBackend = Depends(get_llm),
+):
+    """Server-Sent Events variant of /recommendations/suggestions: one event per suggestion as it is generated."""
+    prefs = await db.execute(select(UserPreference.genre).where(UserPreference.user_id == user.id))
+    genres = [r[0] for r in prefs.all() if r[0]]
+    return _sse_response(_sse_suggestions(llm.suggest_books_by_genre_stream(genres, limit=limit)))
+
+
+@router.get("/recommendations/suggestions/similar/{book_id}/stream")
+@query_budget(2)
+@rate_cost(10, expensive=True)
+async def stream_ai_suggestions_similar_to_book(
+    book_id: int,
+    limit: int = 6,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    llm: LLMBackend = Depends(get_llm),
+):
+    """Server-Sent Events variant of /recommendations/suggestions/similar/{book_id}."""
+    r = await db.execute(select(Book).where(Book.id == book_id))
+    book = r.scalar_one_or_none()
+    if book is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    suggestions = llm.suggest_books_similar_to_stream(
+        book_title=book.title or "",
+        book_author=book.author,
+        book_genre=book.genre,
+        book_summary=book.summary,
+        limit=limit,
+    )
+    return _sse_response(_sse_suggestions(suggestions))
+
+
 @router.get("/recommendations")
+@query_budget(8)
+@rate_cost(5, expensive=True)
 async def get_recommendations(
     limit: int = 10,
     user: User = Depends(get_current_user),
@@ -130,28 +209,35 @@ async def get_recommendations(
     candidate_ids = {b.id for b in candidates}
 
     preference_score: dict[int, float] = {}
-    for b in candidates:
-        s = 1.0
-        if b.genre and b.genre.lower() in genre_weights:
-            s += genre_weights[b.genre.lower()]
-        preference_score[b.id] = s
-    preference_score = _norm(preference_score)
+    with span("ml", "preference"):
+        for b in candidates:
+            s = 1.0
+            if b.genre and b.genre.lower() in genre_weights:
+                s += genre_weights[b.genre.lower()]
+            preference_score[b.id] = s
+        preference_score = _norm(preference_score)
 
     all_borrows_result = await db.execute(select(Borrow.user_id, Borrow.book_id))
     all_borrows = [(r[0], r[1]) for r in all_borrows_result.all()]
-    collab_score = collaborative_scores(borrowed_ids, all_borrows, candidate_ids)
-    collab_score = _norm(collab_score)
+    with span("ml", "collaborative", f"{len(all_borrows)} borrows"):
+        collab_score = _norm(collaborative_scores(borrowed_ids, all_borrows, candidate_ids))
+
+    with span("ml", "book_vectors"):
+        vectors = await get_book_vectors(db)
+    with span("ml", "content", f"{len(vectors)} books"):
+        content_score = _norm({bid: s for bid, s in vectors.similarity_to(borrowed_ids).items() if bid in candidate_ids})
 
-    _, X = build_book_matrix(books)
-    content_score = content_similarity_to_user_books(books, borrowed_ids, X) if X is not None else {}
-    content_score = _norm(content_score)
+    # Cold start: with no borrows the collaborative and content scores are all zero, so lean on popularity
+    popularity_weight = settings.recommendation_popularity_weight if not borrowed_ids else 0.0
+    popularity_score = _norm(await popularity_scores(db, candidate_ids)) if popularity_weight > 0 else {}
 
     blended: dict[int, float] = {}
-    for bid in candidate_ids:
-        p = preference_score.get(bid, 0.0)
-        c = collab_score.get(bid, 0.0)
-        t = content_score.get(bid, 0.0)
-        blended[bid] = 0.4 * p + 0.4 * c + 0.2 * t
+    with span("ml", "blend"):
+        for bid in candidate_ids:
+            p = preference_score.get(bid, 0.0)
+            c = collab_score.get(bid, 0.0)
+            t = content_score.get(bid, 0.0)
+            blended[bid] = 0.4 * p + 0.4 * c + 0.2 * t + popularity_weight * popularity_score.get(bid, 0.0)
 
     book_by_id = {b.id: b for b in books}
     ordered = sorted(blended.items(), key=lambda x: -x[1])[:limit]
@@ -164,34 +250,53 @@ async def get_recommendations(
 
 
 @router.get("/recommendations/similar/{book_id}")
+@query_budget(5)
+@rate_cost(5, expensive=True)
 async def get_similar_books(
     book_id: int,
+    request: Request,
     limit: int = 10,
     db: AsyncSession = Depends(get_db),
     llm: LLMBackend = Depends(get_llm),
 ):
+    """Same for every caller, so validated and cached by the catalogue version."""
     r = await db.execute(select(Book).where(Book.id == book_id))
     book = r.scalar_one_or_none()
     if book is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+    etag = make_etag("similar", settings.recommendation_engine, await catalog_version(db))
+    return await cached_response(request, etag, lambda: _similar_books(db, llm, book, limit))
+
+
+async def _similar_books(db: AsyncSession, llm: LLMBackend, book: Book, limit: int) -> list[dict]:
+    book_id = book.id
+    if settings.recommendation_engine != "llm":
+        with span("ml", "book_vectors"):
+            vectors = await get_book_vectors(db)
+        with span("ml", "similar", f"{len(vectors)} books"):
+            similar = vectors.similar(book_id, limit)
+        if not similar:
+            return []
+        result = await db.execute(select(Book).where(Book.id.in_([bid for bid, _ in similar])))
+        book_by_id = {b.id: b for b in result.scalars().all()}
+        return [
+            {"id": b.id, "title": b.title, "author": b.author, "genre": b.genre, "score": round(s, 4)}
+            for bid, s in similar
+            for b in (book_by_id.get(bid),)
+            if b
+        ]
+
     books_result = await db.execute(select(Book).order_by(Book.created_at.desc()).limit(MAX_BOOKS_FOR_ML))
     books = books_result.scalars().all()
     others = [b for b in books if b.id != book_id]
     if not others:
         return []
 
-    if settings.recommendation_engine == "llm":
-        book_info = f"{book.title or ''} by {book.author or ''} ({book.genre or ''}). { (book.summary or '')[:300]}"
-        candidate_dicts = [{"id": b.id, "title": b.title or "", "author": b.author or "", "genre": b.genre or ""} for b in others[:MAX_CANDIDATES_FOR_LLM]]
-        ids = await llm.recommend_similar(book_info, candidate_dicts, limit=limit)
-        book_by_id = {b.id: b for b in books}
-        return [
-            {"id": bid, "title": book_by_id[bid].title, "author": book_by_id[bid].author, "genre": book_by_id[bid].genre, "score": 1.0}
-            for bid in ids if bid in book_by_id
-        ][:limit]
-
-    similar = similar_books(books, book_id, limit=limit)
+    book_info = f"{book.title or ''} by {book.author or ''} ({book.genre or ''}). { (book.summary or '')[:300]}"
+    candidate_dicts = [{"id": b.id, "title": b.title or "", "author": b.author or "", "genre": b.genre or ""} for b in others[:MAX_CANDIDATES_FOR_LLM]]
+    ids = await llm.recommend_similar(book_info, candidate_dicts, limit=limit)
+    book_by_id = {b.id: b for b in books}
     return [
-        {"id": b.id, "title": b.title, "author": b.author, "genre": b.genre, "score": round(s, 4)}
-        for b, s in similar
-    ]
+        {"id": bid, "title": book_by_id[bid].title, "author": book_by_id[bid].author, "genre": book_by_id[bid].genre, "score": 1.0}
+        for bid in ids if bid in book_by_id
+    ][:limit]
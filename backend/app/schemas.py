@@ -52,6 +52,9 @@ class BookResponse(BaseModel):
     genre: Optional[str] = None
     summary: Optional[str] = None
     created_at: datetime
+    rating_count: int = 0
+    rating_average: Optional[float] = None  # None until the book has a review
+    rating_histogram: dict[str, int] = {}  # review count per rating "1".."5"
 
     class Config:
         from_attributes = True
@@ -69,11 +72,92 @@ class BookDetailResponse(BookResponse):
     my_review: Optional[MyReviewResponse] = None  # Current user's review if they have submitted one
 
 
+class BookBatchRequest(BaseModel):
+    ids: list[int]
+
+
+class BookBatchResponse(BaseModel):
+    items: list[BookDetailResponse]  # in the order of the requested ids
+    missing: list[int] = []  # requested ids with no book
+
+
+class FacetValue(BaseModel):
+    value: str
+    count: int
+
+
 class BookListResponse(BaseModel):
     items: list[BookResponse]
     total: int
     skip: int
     limit: int
+    facets: Optional[dict[str, list[FacetValue]]] = None  # catalogue-wide counts per genre/author/has_summary
+
+
+class BookSearchHit(BookResponse):
+    rank: float
+
+
+class TrendingBookResponse(BookResponse):
+    score: float  # decayed borrow + review activity
+
+
+class TrendingResponse(BaseModel):
+    items: list[TrendingBookResponse]
+    computed_at: Optional[datetime] = None  # when the trending list was last rebuilt
+
+
+class BookSearchResponse(BaseModel):
+    items: list[BookSearchHit]
+    next_cursor: Optional[str] = None  # pass back as `cursor` for the next page; None on the last page
+
+
+class ImportJobResponse(BaseModel):
+    id: int
+    status: str
+    source_name: Optional[str] = None
+    rows_done: int
+    books_created: int
+    files_uploaded: int
+    rows_invalid: int
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ImportReportResponse(BaseModel):
+    job_id: int
+    status: str
+    rows_processed: int
+    rows_skipped: int
+    rows_invalid: int
+    books_created: int
+    files_uploaded: int
+    summaries_queued: int
+    elapsed_seconds: float
+    rows_per_second: float
+    errors: list[str] = []  # first few invalid rows
+    error: Optional[str] = None  # why a failed run stopped; resume with the same job_id
+
+
+class CatalogChangeResponse(BaseModel):
+    version: int
+    book_id: Optional[int] = None
+    kind: str  # created | updated | deleted | summary | analysis | review
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ChangeFeedResponse(BaseModel):
+    version: int  # current catalogue version
+    changes: list[CatalogChangeResponse]
+    next_since: int  # pass as `since` next time
+    has_more: bool
 
 
 class ReviewCreate(BaseModel):
@@ -93,6 +177,49 @@ class ReviewResponse(BaseModel):
         from_attributes = True
 
 
+class AvailabilityResponse(BaseModel):
+    book_id: int
+    total_copies: int
+    available_copies: int
+    on_loan: int
+    holds: int  # readers waiting; each returned copy goes to the oldest hold
+    my_hold_position: Optional[int] = None  # 1 = next in line; None if not on hold or anonymous
+
+
+class InventoryUpdate(BaseModel):
+    total_copies: int
+
+
+class HoldResponse(BaseModel):
+    book_id: int
+    position: int
+
+
+class BorrowHistoryItem(BaseModel):
+    id: int
+    borrowed_at: datetime
+    returned_at: Optional[datetime] = None  # None while the book is still borrowed
+    book: BookResponse
+
+
+class BorrowHistoryResponse(BaseModel):
+    items: list[BorrowHistoryItem]
+    next_cursor: Optional[str] = None  # pass back as `cursor` for the next page; None on the last page
+
+
+class ReviewHistoryItem(BaseModel):
+    id: int
+    rating: int
+    text: Optional[str] = None
+    created_at: datetime
+    book: BookResponse
+
+
+class ReviewHistoryResponse(BaseModel):
+    items: list[ReviewHistoryItem]
+    next_cursor: Optional[str] = None
+
+
 class PreferenceCreate(BaseModel):
     genre: str
     weight: float = 1.0
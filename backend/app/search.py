@@ -0,0 +1,273 @@
+"""Full-text search over book title, author, genre and summary.
+
+On PostgreSQL the query runs against the `books.search_vector` generated tsvector column
+(GIN-indexed, migration 003) and is ranked with `ts_rank`; title matches weigh most, then
+author, genre and summary. Other databases (SQLite in tests and local runs) use an
+in-process inverted index with the same weighting, prefix matching and filters. The index
+follows the catalogue change feed (`app/catalog.py`): before a query it re-reads only the
+books changed since the version it last saw.
+
+Every query term matches as a prefix ("hob" finds "Hobbit") and all terms must match.
+Results are ordered by (rank, id) descending and paged with an opaque keyset cursor.
+"""
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import and_, func, literal_column, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog import catalog_version, changes_since, history_complete_since
+from app.cursor import decode_cursor, encode_cursor
+from app.models import Book
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+TS_CONFIG = literal_column("'english'::regconfig")
+MAX_QUERY_TERMS = 8
+REBUILD_AFTER_CHANGES = 5000  # further behind than this, rebuilding is cheaper than replaying changes
+
+# Field weights, matching ts_rank's defaults for setweight A/B/C/D.
+FIELD_WEIGHTS = {"title": 1.0, "author": 0.4, "genre": 0.2, "summary": 0.1}
+
+
+def tokenize(text: str | None) -> list[str]:
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+@dataclass
+class _Doc:
+    terms: dict[str, float]
+    genre: str
+    author: str
+
+
+class InMemorySearchIndex:
+    """Inverted index term -> {book_id: weighted term frequency}, with a sorted vocabulary for prefix lookups."""
+
+    def __init__(self):
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._docs: dict[int, _Doc] = {}
+        self._vocab: list[str] = []
+        self._vocab_dirty = False
+        self._lock = threading.Lock()
+        self.version: int | None = None  # catalogue version the index reflects
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._docs.clear()
+            self._vocab = []
+            self._vocab_dirty = False
+            self.version = None
+
+    def add(self, book_id: int, title: str | None, author: str | None, genre: str | None, summary: str | None) -> None:
+        terms: dict[str, float] = defaultdict(float)
+        for field, text in (("title", title), ("author", author), ("genre", genre), ("summary", summary)):
+            for term in tokenize(text):
+                terms[term] += FIELD_WEIGHTS[field]
+        with self._lock:
+            self._remove_locked(book_id)
+            self._docs[book_id] = _Doc(dict(terms), (genre or "").lower(), (author or "").lower())
+            for term, weight in terms.items():
+                postings = self._postings[term]
+                if not postings:
+                    self._vocab_dirty = True
+                postings[book_id] = weight
+
+    def remove(self, book_id: int) -> None:
+        with self._lock:
+            self._remove_locked(book_id)
+
+    def _remove_locked(self, book_id: int) -> None:
+        doc = self._docs.pop(book_id, None)
+        if doc is None:
+            return
+        for term in doc.terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(book_id, None)
+            if not postings:
+                del self._postings[term]
+                self._vocab_dirty = True
+
+    def _expand(self, prefix: str) -> list[str]:
+        if self._vocab_dirty:
+            self._vocab = sorted(self._postings)
+            self._vocab_dirty = False
+        start = bisect.bisect_left(self._vocab, prefix)
+        out = []
+        for term in self._vocab[start:]:
+            if not term.startswith(prefix):
+                break
+            out.append(term)
+        return out
+
+    def search(
+        self,
+        terms: list[str],
+        genre: str | None = None,
+        author: str | None = None,
+        limit: int = 20,
+        after: tuple[float, int] | None = None,
+    ) -> list[tuple[int, float]]:
+        """Return up to limit (book_id, rank) pairs, best first, strictly after the keyset position."""
+        if not terms:
+            return []
+        genre = genre.lower() if genre else None
+        author = author.lower() if author else None
+        with self._lock:
+            n_docs = max(1, len(self._docs))
+            expanded = [[self._postings[t] for t in self._expand(term)] for term in terms]
+            if not all(expanded):
+                return []
+            # Start from the term with the fewest postings; later terms only score its candidates.
+            expanded.sort(key=lambda lists: sum(len(p) for p in lists))
+            scores: dict[int, float] = defaultdict(float)
+            for postings in expanded[0]:
+                idf = math.log(1 + n_docs / len(postings))
+                for book_id, weight in postings.items():
+                    scores[book_id] += weight * idf
+            if genre or author:
+                docs = self._docs
+                scores = {
+                    b: s for b, s in scores.items()
+                    if (not genre or docs[b].genre == genre) and (not author or author in docs[b].author)
+                }
+            for lists in expanded[1:]:
+                if not scores:
+                    return []
+                idfs = [math.log(1 + n_docs / len(p)) for p in lists]
+                if sum(len(p) for p in lists) < len(scores) * len(lists):
+                    # Cheaper to score the whole term once than to probe every list per candidate.
+                    term_scores: dict[int, float] = defaultdict(float)
+                    for postings, idf in zip(lists, idfs):
+                        for book_id, weight in postings.items():
+                            term_scores[book_id] += weight * idf
+                    scores = {b: s + term_scores[b] for b, s in scores.items() if b in term_scores}
+                    continue
+                narrowed = {}
+                for book_id, score in scores.items():
+                    extra = 0.0
+                    for postings, idf in zip(lists, idfs):
+                        weight = postings.get(book_id)
+                        if weight:
+                            extra += weight * idf
+                    if extra:
+                        narrowed[book_id] = score + extra
+                scores = narrowed
+            hits = []
+            for book_id, score in scores.items():
+                rank = round(score, 6)
+                if after and (rank > after[0] or (rank == after[0] and book_id >= after[1])):
+                    continue
+                hits.append((book_id, rank))
+        return heapq.nsmallest(limit, hits, key=lambda h: (-h[1], -h[0]))
+
+
+search_index = InMemorySearchIndex()
+_refresh_lock = threading.Lock()
+
+
+def _index_rows(rows: Iterable) -> None:
+    for row in rows:
+        search_index.add(row.id, row.title, row.author, row.genre, row.summary)
+
+
+async def refresh_index(db: AsyncSession) -> None:
+    """Bring the in-process index up to date with the catalogue.
+
+    Books named in the changes since the index's version are re-read, or dropped when they no
+    longer exist. The index is rebuilt from scratch on first use, when the version went
+    backwards (a different database), or when the changes are pruned or too many to replay.
+    """
+    version = await catalog_version(db)
+    if version == search_index.version:
+        return
+    columns = (Book.id, Book.title, Book.author, Book.genre, Book.summary)
+    seen = search_index.version
+    if (
+        seen is not None
+        and seen < version <= seen + REBUILD_AFTER_CHANGES
+        and await history_complete_since(db, seen)
+    ):
+        changed = {c.book_id for c in await changes_since(db, seen, REBUILD_AFTER_CHANGES) if c.book_id is not None}
+        rows = (await db.execute(select(*columns).where(Book.id.in_(changed)))).all() if changed else []
+        with _refresh_lock:
+            for book_id in changed:
+                search_index.remove(book_id)
+            _index_rows(rows)
+    else:
+        rows = (await db.execute(select(*columns))).all()
+        with _refresh_lock:
+            search_index.clear()
+            _index_rows(rows)
+    search_index.version = version
+
+
+def _tsquery(terms: list[str]) -> str:
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+async def _search_postgres(
+    db: AsyncSession,
+    terms: list[str],
+    genre: str | None,
+    author: str | None,
+    limit: int,
+    after: tuple[float, int] | None,
+) -> list[tuple[Book, float]]:
+    vector = literal_column("books.search_vector")
+    query = func.to_tsquery(TS_CONFIG, _tsquery(terms))
+    rank = func.ts_rank(vector, query)
+    stmt = select(Book, rank.label("rank")).where(vector.op("@@")(query))
+    if genre:
+        stmt = stmt.where(func.lower(Book.genre) == genre.lower())
+    if author:
+        stmt = stmt.where(Book.author.icontains(author, autoescape=True))  # "%" and "_" match themselves
+    if after:
+        stmt = stmt.where(or_(rank < after[0], and_(rank == after[0], Book.id < after[1])))
+    stmt = stmt.order_by(rank.desc(), Book.id.desc()).limit(limit)
+    return [(book, float(r)) for book, r in (await db.execute(stmt)).all()]
+
+
+async def search_books(
+    db: AsyncSession,
+    q: str,
+    genre: str | None = None,
+    author: str | None = None,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> tuple[list[tuple[Book, float]], str | None]:
+    """Ranked (book, rank) hits for q and the cursor of the next page (None on the last page).
+
+    Raises ValueError for a malformed cursor.
+    """
+    after = decode_cursor(cursor, float) if cursor else None
+    terms = tokenize(q)[:MAX_QUERY_TERMS]
+    if not terms:
+        return [], None
+    if db.get_bind().dialect.name == "postgresql":
+        hits = await _search_postgres(db, terms, genre, author, limit + 1, after)
+    else:
+        await refresh_index(db)
+        ranked = search_index.search(terms, genre=genre, author=author, limit=limit + 1, after=after)
+        books = {}
+        if ranked:
+            result = await db.execute(select(Book).where(Book.id.in_([book_id for book_id, _ in ranked])))
+            books = {b.id: b for b in result.scalars().all()}
+        hits = [(books[book_id], rank) for book_id, rank in ranked if book_id in books]
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last_book, last_rank = hits[-1]
+        next_cursor = encode_cursor(last_rank, last_book.id)
+    return hits, next_cursor
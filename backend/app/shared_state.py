@@ -0,0 +1,73 @@
+"""Read-only artefacts shared between API worker processes through memory-mapped files.
+
+With several workers (see `gunicorn.conf.py`), anything built in memory would be built and
+held once per worker. `load_or_build` instead publishes an artefact's numpy arrays as `.npy`
+files under `SHARED_STATE_DIR/<name>-<version>/` and maps them read-only, so every worker
+shares the same pages through the OS page cache. The first worker that needs a version builds
+it while holding an exclusive `flock`; the others block on the lock and then map what it
+published. The directory is renamed into place, so a reader never sees a half-written one.
+
+Versions come from the database (the catalogue version, `app/catalog.py`), which is how
+workers learn that an artefact is stale: nothing has to be signalled between processes.
+"""
+import fcntl
+import os
+import re
+import shutil
+import tempfile
+from typing import Callable
+
+import numpy as np
+
+from app.config import settings
+
+Arrays = dict[str, np.ndarray]
+
+
+def _path(name: str, version: int) -> str:
+    return os.path.join(settings.shared_state_dir, f"{name}-{version}")
+
+
+def load(name: str, version: int) -> Arrays | None:
+    """The published arrays of name at version, memory-mapped, or None if not built yet.
+
+    Also None if another worker removes the directory while it is being mapped, after publishing
+    a newer version; `load_or_build` then takes the lock and maps or rebuilds.
+    """
+    path = _path(name, version)
+    try:
+        files = sorted(f for f in os.listdir(path) if f.endswith(".npy"))
+        return {f[: -len(".npy")]: np.load(os.path.join(path, f), mmap_mode="r") for f in files}
+    except FileNotFoundError:
+        return None
+
+
+def _remove_older(name: str, version: int) -> None:
+    # Workers still mapping an old version keep their pages; unlinking only drops the names.
+    pattern = re.compile(rf"{re.escape(name)}-(\d+)$")
+    for entry in os.listdir(settings.shared_state_dir):
+        match = pattern.match(entry)
+        if match and int(match.group(1)) < version:
+            shutil.rmtree(os.path.join(settings.shared_state_dir, entry), ignore_errors=True)
+
+
+def load_or_build(name: str, version: int, build: Callable[[], Arrays]) -> Arrays:
+    """Map name at version, building and publishing it first if no process has yet. Blocking."""
+    arrays = load(name, version)
+    if arrays is not None:
+        return arrays
+    os.makedirs(settings.shared_state_dir, exist_ok=True)
+    with open(os.path.join(settings.shared_state_dir, f".{name}.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            arrays = load(name, version)
+            if arrays is None:
+                tmp = tempfile.mkdtemp(dir=settings.shared_state_dir, prefix=f".{name}-")
+                for key, array in build().items():
+                    np.save(os.path.join(tmp, f"{key}.npy"), array)
+                os.rename(tmp, _path(name, version))
+                _remove_older(name, version)
+                arrays = load(name, version)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+    return arrays
@@ -0,0 +1,61 @@
+"""Per-book review aggregates: count, sum, average and a 1-5 histogram.
+
+`record_rating` upserts the book's `book_stats` row in the same transaction as the review it
+counts, so list pages read the aggregates with the book (one joined row) instead of scanning
+`reviews`. `rebuild_book_stats` recomputes every row from `reviews` for backfills and repairs.
+"""
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import upsert_insert
+from app.models import BookStats, Review
+
+RATINGS = range(1, 6)
+
+
+async def record_rating(db: AsyncSession, book_id: int, rating: int) -> None:
+    """Count one new review of book_id. Does not commit."""
+    bucket = f"rating_{rating}"
+    insert_ = upsert_insert(db)
+    if insert_ is not None:
+        stmt = insert_(BookStats).values(
+            book_id=book_id, rating_count=1, rating_sum=rating, rating_average=float(rating), **{bucket: 1}
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["book_id"],
+            set_={
+                "rating_count": BookStats.rating_count + 1,
+                "rating_sum": BookStats.rating_sum + rating,
+                "rating_average": (BookStats.rating_sum + rating) * 1.0 / (BookStats.rating_count + 1),
+                bucket: getattr(BookStats, bucket) + 1,
+                "updated_at": func.now(),
+            },
+        )
+        await db.execute(stmt)
+        return
+    result = await db.execute(
+        update(BookStats)
+        .where(BookStats.book_id == book_id)
+        .values(
+            rating_count=BookStats.rating_count + 1,
+            rating_sum=BookStats.rating_sum + rating,
+            rating_average=(BookStats.rating_sum + rating) * 1.0 / (BookStats.rating_count + 1),
+            **{bucket: getattr(BookStats, bucket) + 1},
+        )
+    )
+    if result.rowcount == 0:
+        db.add(BookStats(book_id=book_id, rating_count=1, rating_sum=rating, rating_average=float(rating), **{bucket: 1}))
+
+
+async def rebuild_book_stats(db: AsyncSession) -> int:
+    """Recompute every book's stats from `reviews`; returns the number of books with reviews. Does not commit."""
+    await db.execute(delete(BookStats))
+    count = func.count(Review.id)
+    total = func.sum(Review.rating)
+    columns = [Review.book_id, count, total, total * 1.0 / count]
+    columns += [func.sum(case((Review.rating == r, 1), else_=0)) for r in RATINGS]
+    names = ["book_id", "rating_count", "rating_sum", "rating_average"] + [f"rating_{r}" for r in RATINGS]
+    result = await db.execute(
+        insert(BookStats).from_select(names, select(*columns).where(Review.rating.in_(RATINGS)).group_by(Review.book_id))
+    )
+    return result.rowcount
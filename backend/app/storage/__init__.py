@@ -1,5 +1,6 @@
 from app.storage.base import StorageBackend
+from app.storage.cached import CachedStorage
 from app.storage.local import LocalStorage
 from app.storage.s3 import S3Storage
 
-__all__ = ["StorageBackend", "LocalStorage", "S3Storage"]
+__all__ = ["StorageBackend", "CachedStorage", "LocalStorage", "S3Storage"]
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import BinaryIO
+from typing import BinaryIO, Iterable
 
 
 class StorageBackend(ABC):
@@ -14,3 +14,13 @@ class StorageBackend(ABC):
     @abstractmethod
     async def delete(self, key: str) -> bool:
         pass
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete several keys; returns how many were deleted. Backends with a batch call override this."""
+        deleted = 0
+        for key in keys:
+            deleted += await self.delete(key)
+        return deleted
+
+    async def check(self) -> None:
+        """Raise if the backend cannot serve requests; used by the readiness probe."""
@@ -0,0 +1,278 @@
+"""Read-through cache in front of any StorageBackend, for object stores such as S3.
+
+Book files are written once and read many times, so `CachedStorage` keeps what it reads:
+
+- objects up to `memory_object_max_bytes` in an in-process LRU bounded by `memory_max_bytes`;
+- every object in `cache_dir`, an LRU bounded by `max_bytes`. Each file is named
+  `<sha256 of key>.<sha256 of content>`, and the content hash is checked on every read, so a
+  truncated or corrupted file is dropped and fetched again instead of being served. The
+  directory is re-indexed at startup (least recently used by mtime), so the cache survives
+  restarts;
+- concurrent misses for one key share one fetch (single flight). The fetch runs as its own task,
+  so a client that disconnects does not cancel it for the others.
+
+Writes and deletes go straight to the backend and drop the cached copy. A fetch that was already
+running when the key was overwritten is not cached. Each process keeps its own index. Processes
+sharing a directory bound it to roughly `max_bytes` each, and a file another process evicted is
+simply a miss.
+
+One instance serves the request loop and the background threads that run their own loops (see
+`app/tasks.py`), so the index is guarded by a lock, and misses only coalesce with a fetch
+running on the caller's own loop.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Iterable
+
+from app.metrics import STORAGE_CACHE
+from app.storage.base import StorageBackend
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class CachedStorage(StorageBackend):
+    """StorageBackend decorator caching reads of the wrapped backend in memory and on local disk."""
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        cache_dir: str,
+        max_bytes: int,
+        memory_max_bytes: int = 0,
+        memory_object_max_bytes: int = 0,
+    ):
+        self.backend = backend
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_object_max_bytes = min(memory_object_max_bytes, memory_max_bytes)
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_bytes = 0
+        # sha256(key) -> (file name, size), least recently used first
+        self._disk: OrderedDict[str, tuple[str, int]] = OrderedDict()
+        self._disk_bytes = 0
+        # (event loop, key) -> the fetch of key running on that loop
+        self._inflight: dict[tuple[asyncio.AbstractEventLoop, str], asyncio.Task] = {}
+        # Fetches that were running when their key was written or deleted: not cached
+        self._stale: set[asyncio.Task] = set()
+        # Guards everything above; held only for index updates, never across I/O or an await
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            key_hash, dot, content_hash = name.partition(".")
+            if not dot or len(key_hash) != 64 or len(content_hash) != 64:
+                continue  # temporary files of an interrupted write, or not ours
+            stat = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((stat.st_mtime, key_hash, name, stat.st_size))
+        for _, key_hash, name, size in sorted(entries):
+            self._disk[key_hash] = (name, size)
+            self._disk_bytes += size
+        for name in self._evict_disk():
+            self._unlink(name)
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "memory_objects": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_objects": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "inflight": len(self._inflight),
+            }
+
+    # Memory tier (callers hold the lock)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_object_max_bytes:
+            return
+        self._forget(key)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    def _forget(self, key: str) -> None:
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+
+    # Disk tier (file I/O runs in threads, outside the lock; the index is changed under it)
+
+    def _read_file(self, name: str) -> tuple[bytes | None, bool]:
+        """The file's content and whether it matches the hash in its name."""
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # recency for the index rebuilt at the next start
+        except FileNotFoundError:
+            return None, False
+        return data, _sha256(data) == name.partition(".")[2]
+
+    def _write_file(self, key_hash: str, data: bytes) -> str:
+        name = f"{key_hash}.{_sha256(data)}"
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, os.path.join(self.cache_dir, name))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return name
+
+    def _unlink(self, name: str) -> None:
+        try:
+            os.unlink(os.path.join(self.cache_dir, name))
+        except FileNotFoundError:
+            pass
+
+    def _drop_disk(self, key_hash: str) -> str | None:
+        entry = self._disk.pop(key_hash, None)
+        if entry is None:
+            return None
+        self._disk_bytes -= entry[1]
+        return entry[0]
+
+    def _evict_disk(self) -> list[str]:
+        """Drop the least recently used files from the index until it fits; the caller unlinks them."""
+        evicted = []
+        while self._disk_bytes > self.max_bytes and self._disk:
+            _, (name, size) = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(name)
+        return evicted
+
+    def _unlink_all(self, names: list[str]) -> None:
+        for name in names:
+            self._unlink(name)
+
+    async def _from_disk(self, key_hash: str) -> bytes | None:
+        with self._lock:
+            entry = self._disk.get(key_hash)
+        if entry is None:
+            return None
+        name = entry[0]
+        data, valid = await asyncio.to_thread(self._read_file, name)
+        with self._lock:
+            current = self._disk.get(key_hash, (None,))[0] == name
+            if valid and current:
+                self._disk.move_to_end(key_hash)
+            elif not valid and current:
+                self._drop_disk(key_hash)
+        if valid:
+            return data
+        STORAGE_CACHE.inc("corrupt" if data is not None else "vanished")
+        await asyncio.to_thread(self._unlink, name)
+        return None
+
+    async def _to_disk(self, key_hash: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        name = await asyncio.to_thread(self._write_file, key_hash, data)
+        with self._lock:
+            old = self._drop_disk(key_hash)
+            self._disk[key_hash] = (name, len(data))
+            self._disk_bytes += len(data)
+            unused = self._evict_disk()
+        if old is not None and old != name:
+            unused.append(old)
+        if unused:
+            await asyncio.to_thread(self._unlink_all, unused)
+
+    # StorageBackend
+
+    async def get(self, key: str) -> bytes | None:
+        slot = (asyncio.get_running_loop(), key)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            else:
+                task = self._inflight.get(slot)
+                coalesced = task is not None
+                if not coalesced:
+                    task = asyncio.ensure_future(self._fill(key))
+                    self._inflight[slot] = task
+        if data is not None:
+            STORAGE_CACHE.inc("memory")
+            return data
+        if coalesced:
+            STORAGE_CACHE.inc("coalesced")
+        else:
+            task.add_done_callback(lambda done: self._fill_done(slot, done))
+        return await asyncio.shield(task)
+
+    def _fill_done(self, slot: tuple, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._inflight.get(slot) is task:
+                del self._inflight[slot]
+            self._stale.discard(task)
+
+    def _remember_unless_stale(self, task: asyncio.Task, key: str, data: bytes) -> bool:
+        with self._lock:
+            if task in self._stale:
+                return False
+            self._remember(key, data)
+            return True
+
+    async def _fill(self, key: str) -> bytes | None:
+        this = asyncio.current_task()
+        key_hash = _sha256(key.encode())
+        data = await self._from_disk(key_hash)
+        if data is not None:
+            STORAGE_CACHE.inc("disk")
+            self._remember_unless_stale(this, key, data)
+            return data
+        STORAGE_CACHE.inc("miss")
+        data = await self.backend.get(key)
+        if data is not None and self._remember_unless_stale(this, key, data):
+            await self._to_disk(key_hash, data)
+        return data
+
+    async def _invalidate(self, key: str) -> None:
+        with self._lock:
+            # Later reads, on any loop, start a fresh fetch
+            for slot in [slot for slot in self._inflight if slot[1] == key]:
+                self._stale.add(self._inflight.pop(slot))
+            self._forget(key)
+            name = self._drop_disk(_sha256(key.encode()))
+        if name is not None:
+            await asyncio.to_thread(self._unlink, name)
+
+    async def put(self, key: str, content: BinaryIO, content_type: str = "") -> str:
+        try:
+            return await self.backend.put(key, content, content_type)
+        finally:
+            await self._invalidate(key)
+
+    async def delete(self, key: str) -> bool:
+        try:
+            return await self.backend.delete(key)
+        finally:
+            await self._invalidate(key)
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        try:
+            return await self.backend.delete_many(keys)
+        finally:
+            for key in keys:
+                await self._invalidate(key)
+
+    async def check(self) -> None:
+        await self.backend.check()
+        if not os.access(self.cache_dir, os.W_OK):
+            raise OSError(f"{self.cache_dir} is not writable")
@@ -0,0 +1,47 @@
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Iterable
+
+from app.metrics import STORAGE_ERRORS, STORAGE_LATENCY
+from app.profiling import span
+from app.storage.base import StorageBackend
+
+
+class InstrumentedStorage(StorageBackend):
+    """StorageBackend decorator that times every operation of the wrapped backend."""
+
+    def __init__(self, backend: StorageBackend):
+        self.backend = backend
+        self.backend_name = type(backend).__name__.removesuffix("Storage").lower()
+
+    @contextmanager
+    def _timed(self, operation: str, key: str | None = None):
+        started = time.perf_counter()
+        try:
+            with span("storage", f"{self.backend_name}.{operation}", key):
+                yield
+        except Exception:
+            STORAGE_ERRORS.inc(self.backend_name, operation)
+            raise
+        finally:
+            STORAGE_LATENCY.observe(time.perf_counter() - started, self.backend_name, operation)
+
+    async def put(self, key: str, content: BinaryIO, content_type: str = "") -> str:
+        with self._timed("put", key):
+            return await self.backend.put(key, content, content_type)
+
+    async def get(self, key: str) -> bytes | None:
+        with self._timed("get", key):
+            return await self.backend.get(key)
+
+    async def delete(self, key: str) -> bool:
+        with self._timed("delete", key):
+            return await self.backend.delete(key)
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        with self._timed("delete_many"):
+            return await self.backend.delete_many(keys)
+
+    async def check(self) -> None:
+        with self._timed("check"):
+            await self.backend.check()
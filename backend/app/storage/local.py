@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from typing import BinaryIO
 from app.storage.base import StorageBackend
@@ -24,6 +25,10 @@ class LocalStorage(StorageBackend):
             return None
         return path.read_bytes()
 
+    async def check(self) -> None:
+        if not os.access(self.root, os.W_OK):
+            raise OSError(f"{self.root} is not writable")
+
     async def delete(self, key: str) -> bool:
         path = self._path(key)
         if path.exists():
@@ -1,25 +1,84 @@
 import asyncio
-from typing import BinaryIO
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Iterable
 from app.storage.base import StorageBackend
 from app.config import settings
 
+DELETE_BATCH = 1000  # most keys one DeleteObjects request takes
+
 
 class S3Storage(StorageBackend):
-    def __init__(self):
-        if not settings.aws_bucket:
+    """S3 (or an S3-compatible server at `endpoint_url`) through one boto3 client.
+
+    The client is built once, on first use. Building one resolves credentials and endpoints,
+    which costs milliseconds, and each client has its own connection pool. Clients are
+    thread-safe, so every transfer shares it and reuses its keep-alive connections. boto3 calls
+    block, so they run on this backend's own bounded executor instead of the default one, which
+    the rest of the app uses. The executor matches the connection pool, so no transfer waits for
+    a connection while holding a thread.
+    """
+
+    def __init__(
+        self,
+        bucket: str | None = None,
+        region: str | None = None,
+        endpoint_url: str | None = None,
+        max_connections: int | None = None,
+    ):
+        self.bucket = bucket or settings.aws_bucket
+        if not self.bucket:
             raise ValueError("AWS_BUCKET must be set when STORAGE_BACKEND=s3")
-        self.bucket = settings.aws_bucket
-        self.region = settings.aws_region or "us-east-1"
+        self.region = region or settings.aws_region or "us-east-1"
+        self.endpoint_url = endpoint_url if endpoint_url is not None else settings.aws_endpoint_url
+        self.max_connections = max(1, max_connections or settings.s3_max_connections)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_connections, thread_name_prefix="s3")
+        self._client_lock = threading.Lock()
+        self._client_instance = None
 
     def _client(self):
-        import boto3
-        return boto3.client("s3", region_name=self.region)
+        if self._client_instance is None:
+            with self._client_lock:
+                if self._client_instance is None:
+                    import boto3
+                    from botocore.config import Config
+
+                    config = Config(
+                        max_pool_connections=self.max_connections,
+                        retries={"mode": "standard"},
+                        # Local stand-ins (MinIO, moto) serve buckets by path, not by subdomain
+                        s3={"addressing_style": "path"} if self.endpoint_url else None,
+                    )
+                    # A session of its own: the default one is not thread-safe to create clients from
+                    self._client_instance = boto3.session.Session().client(
+                        "s3", region_name=self.region, endpoint_url=self.endpoint_url or None, config=config
+                    )
+        return self._client_instance
+
+    async def _run(self, fn, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def _get_object(self, key: str) -> bytes | None:
+        from botocore.exceptions import ClientError
+        try:
+            resp = self._client().get_object(Bucket=self.bucket, Key=key)
+            return resp["Body"].read()  # still network I/O, so on the transfer thread too
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return None
+            raise
+
+    def _delete_objects(self, keys: list[str]) -> int:
+        resp = self._client().delete_objects(
+            Bucket=self.bucket, Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+        )
+        return len(keys) - len(resp.get("Errors", []))
 
     async def put(self, key: str, content: BinaryIO, content_type: str = "") -> str:
-        client = self._client()
         body = content.read()
-        await asyncio.to_thread(
-            client.put_object,
+        await self._run(
+            self._client().put_object,
             Bucket=self.bucket,
             Key=key,
             Body=body,
@@ -28,24 +87,23 @@ class S3Storage(StorageBackend):
         return key
 
     async def get(self, key: str) -> bytes | None:
-        from botocore.exceptions import ClientError
-        client = self._client()
-        try:
-            resp = await asyncio.to_thread(
-                client.get_object,
-                Bucket=self.bucket,
-                Key=key,
-            )
-            return resp["Body"].read()
-        except ClientError as e:
-            if e.response.get("Error", {}).get("Code") == "NoSuchKey":
-                return None
-            raise
+        return await self._run(self._get_object, key)
+
+    async def check(self) -> None:
+        await self._run(self._client().head_bucket, Bucket=self.bucket)
 
     async def delete(self, key: str) -> bool:
-        client = self._client()
         try:
-            await asyncio.to_thread(client.delete_object, Bucket=self.bucket, Key=key)
+            await self._run(self._client().delete_object, Bucket=self.bucket, Key=key)
             return True
         except Exception:
             return False
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """One DeleteObjects request per 1000 keys, in parallel, instead of a request per key."""
+        keys = list(dict.fromkeys(keys))
+        batches = [keys[i : i + DELETE_BATCH] for i in range(0, len(keys), DELETE_BATCH)]
+        return sum(await asyncio.gather(*(self._run(self._delete_objects, batch) for batch in batches)))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
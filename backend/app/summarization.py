@@ -0,0 +1,225 @@
+"""Map-reduce summarisation of whole uploaded books.
+
+Text is extracted page by page and cut into chunks of `summary_chunk_chars`; chunks are
+summarised concurrently (at most `summary_concurrency` in flight, so only that many chunks
+are held in memory at once) and the ordered partial summaries are reduced, in batches,
+into one summary. Chunk summaries are cached by content hash so re-uploads and retries
+don't pay for the same chunk twice. Progress per book is kept in-process for
+`GET /books/{id}/summary/progress`.
+"""
+import asyncio
+import codecs
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from io import BytesIO
+from typing import Iterable, Iterator
+
+from app.config import settings
+from app.llm.base import LLMBackend
+
+logger = logging.getLogger(__name__)
+
+MIN_CONTENT_LENGTH = 50
+TEXT_READ_SIZE = 64 * 1024
+REDUCE_BATCH = 8
+MAX_TRACKED_BOOKS = 1000
+
+
+def _file_ext(filename: str | None) -> str:
+    return (filename or "").split(".")[-1].lower() if "." in (filename or "") else ""
+
+
+def iter_document_text(content: bytes, filename: str | None) -> Iterator[str]:
+    """Yield the text of a stored file piece by piece (one PDF page or one read block at a time)."""
+    if not content or len(content) < MIN_CONTENT_LENGTH:
+        return
+    if _file_ext(filename) == "pdf":
+        from pypdf import PdfReader
+        try:
+            reader = PdfReader(BytesIO(content))
+            pages = reader.pages
+        except Exception:  # PDF parsing can fail for various reasons
+            return
+        for page in pages:
+            try:
+                text = page.extract_text()
+            except Exception:  # one bad page should not lose the rest of the book
+                continue
+            if text and not text.startswith("%PDF"):
+                yield text + "\n"
+        return
+    if content[:4] == b"%PDF":
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    for start in range(0, len(content), TEXT_READ_SIZE):
+        text = decoder.decode(content[start : start + TEXT_READ_SIZE])
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_chunks(pieces: Iterable[str], chunk_chars: int) -> Iterator[str]:
+    """Regroup text pieces into chunks of about chunk_chars, breaking on whitespace where possible."""
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        while len(buf) >= chunk_chars:
+            cut = buf.rfind(" ", chunk_chars // 2, chunk_chars)
+            cut = cut if cut > 0 else chunk_chars
+            chunk, buf = buf[:cut].strip(), buf[cut:]
+            if chunk:
+                yield chunk
+    buf = buf.strip()
+    if buf:
+        yield buf
+
+
+class ChunkSummaryCache:
+    """Thread-safe LRU of chunk summaries keyed by a hash of the chunk text and the LLM."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(chunk: str) -> str:
+        model = f"{settings.llm_provider}:{settings.ollama_model}:{settings.openai_model}"
+        return hashlib.sha256(f"{model}\0{chunk}".encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+
+chunk_cache = ChunkSummaryCache(settings.summary_cache_size)
+
+
+@dataclass
+class SummaryProgress:
+    book_id: int
+    status: str = "extracting"  # extracting -> summarizing -> reducing -> done | failed | no_text
+    chunks_extracted: int = 0
+    chunks_summarized: int = 0
+    chunks_cached: int = 0
+    extraction_complete: bool = False
+    started_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+    error: str | None = None
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+_progress: OrderedDict[int, SummaryProgress] = OrderedDict()
+_progress_lock = threading.Lock()
+
+
+def _start_progress(book_id: int) -> SummaryProgress:
+    progress = SummaryProgress(book_id=book_id)
+    with _progress_lock:
+        _progress.pop(book_id, None)
+        _progress[book_id] = progress
+        while len(_progress) > MAX_TRACKED_BOOKS:
+            _progress.popitem(last=False)
+    return progress
+
+
+def record_failure(book_id: int, error: str) -> None:
+    progress = _start_progress(book_id)
+    progress.status = "failed"
+    progress.error = error
+    progress.finished_at = time.time()
+
+
+def get_progress(book_id: int) -> SummaryProgress | None:
+    with _progress_lock:
+        return _progress.get(book_id)
+
+
+async def _summarize_chunk(llm: LLMBackend, chunk: str, progress: SummaryProgress) -> str:
+    key = ChunkSummaryCache.key(chunk)
+    cached = chunk_cache.get(key)
+    if cached is not None:
+        progress.chunks_cached += 1
+        return cached
+    summary = await llm.summarize(chunk)
+    if summary:
+        chunk_cache.put(key, summary)
+    return summary
+
+
+async def _combine(llm: LLMBackend, batch: list[str]) -> str:
+    return batch[0] if len(batch) == 1 else await llm.combine_summaries(batch)
+
+
+async def reduce_summaries(llm: LLMBackend, partials: list[str]) -> str:
+    """Combine ordered partial summaries REDUCE_BATCH at a time until one remains."""
+    partials = [p for p in partials if p and p.strip()]
+    while len(partials) > 1:
+        batches = [partials[i : i + REDUCE_BATCH] for i in range(0, len(partials), REDUCE_BATCH)]
+        combined = await asyncio.gather(*(_combine(llm, b) for b in batches))
+        partials = [p for p in combined if p]
+    return partials[0] if partials else ""
+
+
+async def summarize_document(
+    llm: LLMBackend,
+    chunks: Iterable[str],
+    book_id: int = 0,
+) -> str | None:
+    """Summarise every chunk (bounded concurrency) and reduce to one summary. None if there was no usable text."""
+    progress = _start_progress(book_id)
+    sem = asyncio.Semaphore(max(1, settings.summary_concurrency))
+    results: dict[int, str] = {}
+    tasks: list[asyncio.Task] = []
+
+    async def run(idx: int, chunk: str):
+        try:
+            results[idx] = await _summarize_chunk(llm, chunk, progress)
+            progress.chunks_summarized += 1
+        finally:
+            sem.release()
+
+    try:
+        for idx, chunk in enumerate(chunks):
+            if idx >= settings.summary_max_chunks:
+                logger.info("Book %s: stopping after %d chunks", book_id, idx)
+                break
+            progress.chunks_extracted += 1
+            progress.status = "summarizing"
+            await sem.acquire()  # bounds the chunks held in memory to the in-flight ones
+            tasks.append(asyncio.create_task(run(idx, chunk)))
+        progress.extraction_complete = True
+        if not tasks:
+            progress.status = "no_text"
+            return None
+        await asyncio.gather(*tasks)
+        progress.status = "reducing"
+        summary = await reduce_summaries(llm, [results[i] for i in sorted(results)])
+        progress.status = "done"
+        return summary
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        progress.status = "failed"
+        progress.error = str(e)
+        raise
+    finally:
+        progress.finished_at = time.time()
@@ -0,0 +1,148 @@
+"""Background jobs: book summaries and review sentiment started by request handlers, and the
+periodic trending refresh started with the app.
+
+Each job runs in its own daemon thread with its own event loop and database session, so it
+never blocks the request that started it or shares the request's session.
+"""
+import asyncio
+import logging
+import threading
+from typing import Awaitable, Callable
+
+from sqlalchemy import select
+
+from app.catalog import touch_book
+from app.config import settings
+from app.extraction import ExtractionError, extracted_text
+from app.facets import facet_values, update_facet_counts
+from app.http_cache import invalidate_book
+from app.metrics import BACKGROUND_JOBS
+from app.models import Book, BookSummary, ReviewAnalysis
+from app.summarization import iter_chunks, record_failure, summarize_document
+
+logger = logging.getLogger(__name__)
+
+# (book_id, storage key, original file name)
+SummaryItem = tuple[int, str, str | None]
+
+
+def _start_thread(job: Callable[[], Awaitable[None]]) -> None:
+    def run():
+        BACKGROUND_JOBS.inc()
+        try:
+            asyncio.run(job())
+        finally:
+            BACKGROUND_JOBS.dec()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+async def summarize_book(book_id: int, content: bytes, file_name: str | None) -> None:
+    """Summarise one uploaded file and store the result on the book."""
+    from app.db import BackgroundSessionLocal
+    from app.deps import get_background_llm
+
+    llm = get_background_llm()
+    try:
+        async with extracted_text(content, file_name) as pieces:
+            chunks = iter_chunks(pieces, settings.summary_chunk_chars)
+            summary_text = await summarize_document(llm, chunks, book_id=book_id)
+    except ExtractionError as e:
+        logger.warning("Text extraction failed for book %s: %s", book_id, e)
+        record_failure(book_id, str(e))
+        return
+    if summary_text is None:
+        return
+    async with BackgroundSessionLocal() as db:
+        summary_result = await db.execute(select(BookSummary).where(BookSummary.book_id == book_id))
+        summary_row = summary_result.scalar_one_or_none()
+        if summary_row:
+            summary_row.content = summary_text
+        else:
+            summary_row = BookSummary(book_id=book_id, content=summary_text)
+            db.add(summary_row)
+        book_result = await db.execute(select(Book).where(Book.id == book_id))
+        book = book_result.scalar_one()
+        before = facet_values(book)
+        book.summary = summary_text
+        await update_facet_counts(db, before, facet_values(book))
+        await touch_book(db, book_id, "summary")
+        await db.commit()
+    invalidate_book(book_id)
+
+
+async def summarize_stored_books(items: list[SummaryItem], concurrency: int | None = None) -> None:
+    """Summarise many stored files, reading each from storage only when its turn comes."""
+    from app.deps import get_storage
+
+    storage = get_storage()
+    sem = asyncio.Semaphore(max(1, concurrency or settings.import_summary_concurrency))
+
+    async def one(book_id: int, key: str, file_name: str | None):
+        async with sem:
+            try:
+                content = await storage.get(key)
+                if content:
+                    await summarize_book(book_id, content, file_name)
+            except Exception:
+                logger.exception("Summary failed for book %s", book_id)
+
+    await asyncio.gather(*(one(*item) for item in items))
+
+
+def run_summary_task(book_id: int, content: bytes, file_name: str | None):
+    _start_thread(lambda: summarize_book(book_id, content, file_name))
+
+
+def run_bulk_summary_task(items: list[SummaryItem]):
+    """One thread for a whole import instead of one per book."""
+    if items:
+        _start_thread(lambda: summarize_stored_books(items))
+
+
+async def analyze_reviews(book_id: int, review_texts: list[str]) -> None:
+    from app.db import BackgroundSessionLocal
+    from app.deps import get_background_llm
+
+    llm = get_background_llm()
+    consensus = await llm.analyze_sentiment(review_texts)
+    async with BackgroundSessionLocal() as db:
+        analysis_result = await db.execute(select(ReviewAnalysis).where(ReviewAnalysis.book_id == book_id))
+        analysis_row = analysis_result.scalar_one_or_none()
+        if analysis_row:
+            analysis_row.consensus = consensus
+        else:
+            analysis_row = ReviewAnalysis(book_id=book_id, consensus=consensus)
+            db.add(analysis_row)
+        await touch_book(db, book_id, "analysis")
+        await db.commit()
+    invalidate_book(book_id)
+
+
+def run_sentiment_task(book_id: int, review_texts: list[str]):
+    _start_thread(lambda: analyze_reviews(book_id, review_texts))
+
+
+async def refresh_trending_once() -> int | None:
+    from app.db import BackgroundSessionLocal
+    from app.trending import refresh_trending
+
+    async with BackgroundSessionLocal() as db:
+        count = await refresh_trending(db)
+        await db.commit()
+    return count
+
+
+def start_trending_refresher(interval: float) -> threading.Event:
+    """Refresh trending books every `interval` seconds until the returned event is set."""
+    stop = threading.Event()
+
+    async def loop():
+        while not stop.wait(interval):
+            try:
+                await refresh_trending_once()
+            except Exception:
+                logger.exception("Trending refresh failed")
+
+    _start_thread(loop)
+    return stop
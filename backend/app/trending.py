@@ -0,0 +1,156 @@
+"""Trending books from exponentially time-decayed borrow and review counters.
+
+`record_event` adds to a book's `book_popularity` counters in the same transaction as the
+borrow or review. The counters are decayed in bulk rather than on every write:
+`refresh_trending` multiplies all of them by `0.5 ** (elapsed / TRENDING_HALF_LIFE_HOURS)`
+since the previous refresh, drops the ones that have faded to nothing and rebuilds the
+`trending_books` top-K that `GET /books/trending` reads. Events between two refreshes are
+therefore not decayed relative to each other, an error bounded by the refresh interval.
+
+Each API process may run the refresh job; the `trending_state` row is claimed with a
+compare-and-set on its timestamp, so concurrent runs never apply the same decay twice.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import upsert_insert
+from app.models import Book, BookPopularity, Borrow, Review, TrendingBook, TrendingState
+
+logger = logging.getLogger(__name__)
+
+BORROW_WEIGHT = 1.0
+REVIEW_WEIGHT = 2.0  # a review is a stronger signal of interest than a borrow
+PRUNE_BELOW = 0.01  # counters under this are deleted; roughly seven half-lives after a single borrow
+
+
+def decay_factor(elapsed_seconds: float, half_life_hours: float | None = None) -> float:
+    half_life = (half_life_hours or settings.trending_half_life_hours) * 3600
+    return 0.5 ** (max(0.0, elapsed_seconds) / half_life)
+
+
+def _score():
+    return BORROW_WEIGHT * BookPopularity.borrow_score + REVIEW_WEIGHT * BookPopularity.review_score
+
+
+async def record_event(db: AsyncSession, book_id: int, borrows: float = 0.0, reviews: float = 0.0) -> None:
+    """Add a borrow and/or review to book_id's counters. Does not commit."""
+    insert_ = upsert_insert(db)
+    if insert_ is not None:
+        stmt = insert_(BookPopularity).values(book_id=book_id, borrow_score=borrows, review_score=reviews)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["book_id"],
+            set_={
+                "borrow_score": BookPopularity.borrow_score + borrows,
+                "review_score": BookPopularity.review_score + reviews,
+            },
+        )
+        await db.execute(stmt)
+        return
+    result = await db.execute(
+        update(BookPopularity)
+        .where(BookPopularity.book_id == book_id)
+        .values(borrow_score=BookPopularity.borrow_score + borrows, review_score=BookPopularity.review_score + reviews)
+    )
+    if result.rowcount == 0:
+        db.add(BookPopularity(book_id=book_id, borrow_score=borrows, review_score=reviews))
+
+
+async def _claim_decay(db: AsyncSession, now: datetime) -> tuple[bool, datetime | None]:
+    """Move trending_state to now. Returns (claimed, previous decay time or None on the first run)."""
+    previous = (await db.execute(select(TrendingState.decayed_at).where(TrendingState.id == 1))).scalar_one_or_none()
+    if previous is None:
+        try:
+            async with db.begin_nested():
+                db.add(TrendingState(id=1, decayed_at=now))
+        except IntegrityError:
+            return False, None
+        return True, None
+    result = await db.execute(
+        update(TrendingState).where(TrendingState.id == 1, TrendingState.decayed_at == previous).values(decayed_at=now)
+    )
+    return result.rowcount == 1, previous
+
+
+async def _rebuild_top_k(db: AsyncSession, now: datetime) -> int:
+    top = await db.execute(
+        select(BookPopularity.book_id, _score()).order_by(_score().desc(), BookPopularity.book_id).limit(
+            settings.trending_top_k
+        )
+    )
+    rows = [
+        {"rank": rank, "book_id": book_id, "score": round(score, 6), "computed_at": now}
+        for rank, (book_id, score) in enumerate(top.all(), start=1)
+    ]
+    await db.execute(delete(TrendingBook))
+    if rows:
+        await db.execute(insert(TrendingBook), rows)
+    return len(rows)
+
+
+async def refresh_trending(db: AsyncSession, now: datetime | None = None) -> int | None:
+    """Decay the counters for the time since the last refresh and rebuild the top-K.
+
+    Returns the number of trending books, or None when a concurrent refresh got there first.
+    Does not commit.
+    """
+    now = now or datetime.utcnow()
+    claimed, previous = await _claim_decay(db, now)
+    if not claimed:
+        return None
+    if previous is not None:
+        factor = decay_factor((now - previous).total_seconds())
+        await db.execute(
+            update(BookPopularity).values(
+                borrow_score=BookPopularity.borrow_score * factor, review_score=BookPopularity.review_score * factor
+            )
+        )
+    await db.execute(delete(BookPopularity).where(_score() < PRUNE_BELOW))
+    return await _rebuild_top_k(db, now)
+
+
+async def rebuild_popularity(db: AsyncSession, now: datetime | None = None) -> int:
+    """Recompute every counter from the borrow and review history, then the top-K. Does not commit."""
+    now = now or datetime.utcnow()
+    scores: dict[int, list[float]] = {}
+    for column, model, index in ((Borrow.borrowed_at, Borrow, 0), (Review.created_at, Review, 1)):
+        result = await db.stream(select(model.book_id, column).execution_options(yield_per=1000))
+        async for book_id, at in result:
+            if at is not None:
+                scores.setdefault(book_id, [0.0, 0.0])[index] += decay_factor((now - at).total_seconds())
+    rows = [
+        {"book_id": book_id, "borrow_score": b, "review_score": r}
+        for book_id, (b, r) in scores.items()
+        if BORROW_WEIGHT * b + REVIEW_WEIGHT * r >= PRUNE_BELOW
+    ]
+    await db.execute(delete(BookPopularity))
+    if rows:
+        await db.execute(insert(BookPopularity), rows)
+    await db.execute(delete(TrendingState))
+    db.add(TrendingState(id=1, decayed_at=now))
+    return await _rebuild_top_k(db, now)
+
+
+async def get_trending(db: AsyncSession, limit: int, genre: str | None = None) -> tuple[list[tuple[Book, float]], datetime | None]:
+    """Top trending books (with their scores) from the precomputed table, and when it was computed."""
+    stmt = select(Book, TrendingBook.score, TrendingBook.computed_at).join(TrendingBook, TrendingBook.book_id == Book.id)
+    if genre:
+        stmt = stmt.where(Book.genre == genre)
+    result = await db.execute(stmt.order_by(TrendingBook.rank).limit(limit))
+    rows = result.unique().all()
+    computed_at = rows[0][2] if rows else None
+    return [(book, score) for book, score, _ in rows], computed_at
+
+
+async def popularity_scores(db: AsyncSession, book_ids: set[int]) -> dict[int, float]:
+    """Current popularity of the given books; books without counters are left out."""
+    if not book_ids:
+        return {}
+    result = await db.execute(
+        select(BookPopularity.book_id, _score()).where(BookPopularity.book_id.in_(book_ids))
+    )
+    return {book_id: score for book_id, score in result.all()}
@@ -0,0 +1,229 @@
+"""Deterministic local stand-in for Ollama and OpenAI, for load and latency benchmarks.
+
+Speaks the Ollama `/api/generate` NDJSON streaming protocol (plus `/api/tags`) and the
+OpenAI `/v1/chat/completions` API (streaming and non-streaming). Latency is shaped by a
+time-to-first-token, a token rate and an optional slow tail; errors can be injected at a
+fixed rate. Responses depend only on the prompt and seed, so runs are reproducible.
+
+Run:
+    python -m benchmarks.llm_stub --port 11500 --ttft 0.2 --token-rate 40 --tail-prob 0.02 --tail-ttft 3
+
+then point the API at it with `LLM_PROVIDER=ollama OLLAMA_BASE_URL=http://127.0.0.1:11500`
+or `LLM_PROVIDER=openai OPENAI_API_KEY=stub OPENAI_BASE_URL=http://127.0.0.1:11500/v1`.
+"""
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CATALOG = [
+    ("Dune", "Frank Herbert", "Sci-Fi"),
+    ("Foundation", "Isaac Asimov", "Sci-Fi"),
+    ("Neuromancer", "William Gibson", "Sci-Fi"),
+    ("The Left Hand of Darkness", "Ursula K. Le Guin", "Sci-Fi"),
+    ("1984", "George Orwell", "Fiction"),
+    ("Pride and Prejudice", "Jane Austen", "Fiction"),
+    ("The Great Gatsby", "F. Scott Fitzgerald", "Fiction"),
+    ("Beloved", "Toni Morrison", "Fiction"),
+    ("Gone Girl", "Gillian Flynn", "Mystery"),
+    ("The Big Sleep", "Raymond Chandler", "Mystery"),
+    ("The Hobbit", "J.R.R. Tolkien", "Fantasy"),
+    ("A Wizard of Earthsea", "Ursula K. Le Guin", "Fantasy"),
+    ("Sapiens", "Yuval Noah Harari", "Non-Fiction"),
+    ("Thinking, Fast and Slow", "Daniel Kahneman", "Non-Fiction"),
+]
+WORDS = (
+    "the story follows a reader who discovers an old library where every book changes "
+    "depending on who opens it and slowly learns that memory and choice shape the plot"
+).split()
+
+
+@dataclass
+class StubConfig:
+    model: str = "llama3.2"
+    ttft: float = 0.2  # seconds before the first token
+    token_rate: float = 50.0  # tokens per second after the first token
+    tail_prob: float = 0.0  # probability a request gets tail_ttft instead of ttft
+    tail_ttft: float = 2.0
+    error_rate: float = 0.0  # probability a request fails with error_status
+    error_status: int = 500
+    max_tokens: int = 120
+    seed: int = 0
+
+
+def _rng(config: StubConfig, key: str) -> random.Random:
+    digest = hashlib.sha256(f"{config.seed}:{key}".encode()).digest()
+    return random.Random(int.from_bytes(digest[:8], "big"))
+
+
+def generate_text(prompt: str, rng: random.Random, max_tokens: int) -> str:
+    """Deterministic reply shaped like what the app's prompts ask for."""
+    if "Title by Author (Genre)" in prompt:
+        m = re.search(r"Suggest (\d+)", prompt)
+        count = int(m.group(1)) if m else 5
+        books = rng.sample(CATALOG, min(count, len(CATALOG)))
+        return "\n".join(f"{t} by {a} ({g})" for t, a, g in books)
+    if "comma-separated list of book IDs" in prompt:
+        ids = re.findall(r"^ID (\d+):", prompt, flags=re.MULTILINE)
+        rng.shuffle(ids)
+        return ", ".join(ids[:10])
+    return " ".join(rng.choice(WORDS) for _ in range(min(max_tokens, 40))).capitalize() + "."
+
+
+def _tokens(text: str) -> list[str]:
+    return re.findall(r"\S+\s*|\n", text)
+
+
+class _Request:
+    """Latency/error plan for one request, decided up front.
+
+    Failures and tails are drawn per request (seeded by its sequence number), so a load test
+    repeating one prompt still sees them at their configured rates. The reply depends only on
+    the prompt, so the same prompt always gets the same text.
+    """
+
+    def __init__(self, config: StubConfig, prompt: str, number: int):
+        plan = _rng(config, f"request:{number}")
+        self.fail = plan.random() < config.error_rate
+        self.ttft = config.tail_ttft if plan.random() < config.tail_prob else config.ttft
+        self.text = generate_text(prompt, _rng(config, prompt), config.max_tokens)
+        self.tokens = _tokens(self.text)
+        self.delay = 1.0 / config.token_rate if config.token_rate > 0 else 0.0
+
+    async def stream(self):
+        await asyncio.sleep(self.ttft)
+        for i, token in enumerate(self.tokens):
+            if i:
+                await asyncio.sleep(self.delay)
+            yield token
+
+    async def full_delay(self):
+        await asyncio.sleep(self.ttft + self.delay * max(0, len(self.tokens) - 1))
+
+
+def create_stub_app(config: StubConfig | None = None) -> FastAPI:
+    config = config or StubConfig()
+    stub = FastAPI(title="LLM stub")
+    stub.state.config = config
+    numbers = itertools.count()
+
+    def _error():
+        return JSONResponse(status_code=config.error_status, content={"error": "injected failure"})
+
+    @stub.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": f"{config.model}:latest"}]}
+
+    @stub.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        req = _Request(config, (body.get("system") or "") + "\n" + (body.get("prompt") or ""), next(numbers))
+        if req.fail:
+            return _error()
+        model = body.get("model") or config.model
+
+        if body.get("stream") is False:
+            await req.full_delay()
+            return {"model": model, "response": req.text, "done": True}
+
+        async def ndjson():
+            started = time.monotonic()
+            async for token in req.stream():
+                yield json.dumps({"model": model, "response": token, "done": False}) + "\n"
+            yield json.dumps({
+                "model": model,
+                "response": "",
+                "done": True,
+                "eval_count": len(req.tokens),
+                "total_duration": int((time.monotonic() - started) * 1e9),
+            }) + "\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    @stub.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        prompt = "\n".join(m.get("content") or "" for m in messages)
+        req = _Request(config, prompt, next(numbers))
+        if req.fail:
+            return _error()
+        model = body.get("model") or config.model
+        completion_id = "chatcmpl-" + hashlib.sha1(prompt.encode()).hexdigest()[:12]
+        created = int(time.time())
+
+        if not body.get("stream"):
+            await req.full_delay()
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": req.text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(_tokens(prompt)), "completion_tokens": len(req.tokens), "total_tokens": len(_tokens(prompt)) + len(req.tokens)},
+            }
+
+        def chunk(delta: dict, finish_reason: str | None = None) -> str:
+            data = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(data)}\n\n"
+
+        async def sse():
+            yield chunk({"role": "assistant", "content": ""})
+            async for token in req.stream():
+                yield chunk({"content": token})
+            yield chunk({}, "stop")
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    return stub
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--ttft", type=float, default=StubConfig.ttft, help="time to first token (s)")
+    parser.add_argument("--token-rate", type=float, default=StubConfig.token_rate, help="tokens per second")
+    parser.add_argument("--tail-prob", type=float, default=StubConfig.tail_prob, help="share of requests with the tail TTFT")
+    parser.add_argument("--tail-ttft", type=float, default=StubConfig.tail_ttft, help="tail time to first token (s)")
+    parser.add_argument("--error-rate", type=float, default=StubConfig.error_rate, help="share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=StubConfig.error_status)
+    parser.add_argument("--seed", type=int, default=StubConfig.seed)
+
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    return StubConfig(
+        ttft=args.ttft,
+        token_rate=args.token_rate,
+        tail_prob=args.tail_prob,
+        tail_ttft=args.tail_ttft,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic Ollama/OpenAI stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    import uvicorn
+    uvicorn.run(create_stub_app(stub_config_from_args(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
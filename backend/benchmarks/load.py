@@ -0,0 +1,263 @@
+"""End-to-end load benchmark of the API routes against the LLM stub server.
+
+By default the FastAPI app is driven in-process (httpx ASGI transport) on a temporary
+SQLite database, with `LLM_PROVIDER` pointed at a `benchmarks.llm_stub` server started on
+a free localhost port, so the real `OllamaLLM` / `OpenAILLM` HTTP paths are exercised.
+Pass `--base-url` to drive an already running API over HTTP instead (then the API's own
+configuration decides which LLM it talks to).
+
+Example:
+    python -m benchmarks.load --provider ollama --requests 200 --concurrency 16 \\
+        --ttft 0.3 --token-rate 40 --tail-prob 0.05 --tail-ttft 4 --output report.json
+
+`--scale small|medium|large` seeds the database with `benchmarks.datagen` (power-law borrow
+histories, reviews, preferences) instead of the minimal default catalogue; with `--db-url`
+pointing at an empty local PostgreSQL database migrated to head, the same data goes there.
+
+Prints (and optionally writes) a JSON report with throughput and p50/p95/p99 latency per
+endpoint; `python -m benchmarks.report base.json head.json` compares two of them.
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from benchmarks.llm_stub import add_stub_arguments, create_stub_app, stub_config_from_args
+from benchmarks.report import environment
+
+ENDPOINTS = {
+    "suggestions": "/recommendations/suggestions?limit=5",
+    "suggestions_stream": "/recommendations/suggestions/stream?limit=5",
+    "similar_suggestions": "/recommendations/suggestions/similar/{book_id}?limit=5",
+    "recommendations": "/recommendations?limit=10",
+    "similar": "/recommendations/similar/{book_id}?limit=10",
+    "list_books": "/books?limit=20",
+    "get_book": "/books/{book_id}",
+}
+GENRES = ["Fiction", "Sci-Fi", "Mystery", "Fantasy", "Non-Fiction"]
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list (q in [0, 100])."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: list[float], wall: float, statuses: Counter) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "throughput_rps": round(len(values) / wall, 2) if wall > 0 else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        "status_codes": {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+
+class StubServer:
+    """Runs the LLM stub (or another stand-in app) under uvicorn in a background thread on a free port."""
+
+    def __init__(self, config, app=None):
+        self.config = config
+        self.app = app
+        self.port = _free_port()
+        self.server = None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        import uvicorn
+        self.server = uvicorn.Server(
+            uvicorn.Config(self.app or create_stub_app(self.config), host="127.0.0.1", port=self.port, log_level="warning")
+        )
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def configure_app_env(args, stub_url: str, workdir: str) -> None:
+    """Must run before `app` is imported: settings are read at import time."""
+    os.environ["DB_URL"] = args.db_url or f"sqlite+aiosqlite:///{workdir}/bench.db"
+    os.environ["LOCAL_STORAGE_PATH"] = os.path.join(workdir, "uploads")
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["RECOMMENDATION_ENGINE"] = args.engine
+    os.environ["LLM_PROVIDER"] = args.provider
+    if args.provider == "ollama":
+        os.environ["OLLAMA_BASE_URL"] = stub_url
+    elif args.provider == "openai":
+        os.environ["OPENAI_API_KEY"] = "stub"
+        os.environ["OPENAI_BASE_URL"] = stub_url + "/v1"
+
+
+async def seed_database(n_books: int) -> None:
+    from sqlalchemy import select
+
+    from app.auth import hash_password
+    from app.db import Base, SessionLocal, engine
+    from app.models import Book, Borrow, User, UserPreference
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        if (await db.execute(select(User).where(User.email == BENCH_EMAIL))).scalar_one_or_none():
+            return  # reused database, already seeded
+        user = User(email=BENCH_EMAIL, hashed_password=hash_password(BENCH_PASSWORD), full_name="Bench")
+        db.add(user)
+        await db.flush()
+        books = [
+            Book(
+                title=f"Benchmark Book {i}",
+                author=f"Author {i % 97}",
+                genre=GENRES[i % len(GENRES)],
+                summary=f"A {GENRES[i % len(GENRES)].lower()} story number {i} about libraries and readers.",
+                added_by_user_id=user.id,
+            )
+            for i in range(n_books)
+        ]
+        db.add_all(books)
+        db.add_all(UserPreference(user_id=user.id, genre=g, weight=1.0) for g in GENRES[:2])
+        await db.flush()
+        db.add_all(Borrow(user_id=user.id, book_id=b.id) for b in books[:5])
+        await db.commit()
+
+
+async def seed_scale(scale: str, seed: int) -> None:
+    """Seed with a `benchmarks.datagen` preset; the bench user is the dataset's first reader."""
+    from sqlalchemy import select
+
+    from app.db import Base, SessionLocal, engine
+    from app.models import User
+    from benchmarks.datagen import SCALES, generate
+    from benchmarks.datagen import seed as seed_dataset
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with SessionLocal() as db:
+        if (await db.execute(select(User).where(User.email == BENCH_EMAIL))).scalar_one_or_none():
+            return  # reused database, already seeded
+        await seed_dataset(db, generate(SCALES[scale], seed))
+
+
+async def _login(client) -> dict:
+    r = await client.post("/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    r.raise_for_status()
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _book_ids(client, headers) -> list[int]:
+    r = await client.get("/books?limit=100", headers=headers)
+    r.raise_for_status()
+    return [b["id"] for b in r.json()["items"]] or [1]
+
+
+async def run_endpoint(client, headers, path_template: str, book_ids: list[int], requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        path = path_template.format(book_id=book_ids[i % len(book_ids)])
+        async with sem:
+            start = time.perf_counter()
+            r = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return summarize_latencies(latencies, time.perf_counter() - start, statuses)
+
+
+async def run_benchmark(client, endpoints: list[str], requests: int, concurrency: int) -> dict:
+    headers = await _login(client)
+    book_ids = await _book_ids(client, headers)
+    results = {}
+    for name in endpoints:
+        results[name] = await run_endpoint(client, headers, ENDPOINTS[name], book_ids, requests, concurrency)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+    return results
+
+
+async def _main(args) -> dict:
+    import httpx
+
+    meta = {
+        "provider": args.provider,
+        "engine": args.engine,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "scale": args.scale,
+        "data_seed": args.data_seed,
+        "books": None if args.scale else args.books,
+        "stub": vars(stub_config_from_args(args)),
+    }
+    report = {"environment": environment(), "meta": meta}
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=300) as client:
+            return {**report, "endpoints": await run_benchmark(client, args.endpoints, args.requests, args.concurrency)}
+
+    with tempfile.TemporaryDirectory() as workdir, StubServer(stub_config_from_args(args)) as stub:
+        configure_app_env(args, stub.url, workdir)
+        if args.scale:
+            await seed_scale(args.scale, args.data_seed)
+        else:
+            await seed_database(args.books)
+        from app.main import app
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+            return {**report, "endpoints": await run_benchmark(client, args.endpoints, args.requests, args.concurrency)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark of API routes against the LLM stub")
+    parser.add_argument("--provider", choices=["ollama", "openai", "mock"], default="ollama")
+    parser.add_argument("--engine", choices=["hybrid", "llm"], default="hybrid", help="RECOMMENDATION_ENGINE")
+    parser.add_argument("--db-url", default="", help="database URL (default: temporary SQLite file)")
+    parser.add_argument("--base-url", default="", help="drive a running API over HTTP instead of in-process")
+    parser.add_argument("--books", type=int, default=200, help="size of the minimal catalogue (without --scale)")
+    parser.add_argument("--scale", choices=["tiny", "small", "medium", "large"], help="seed with a benchmarks.datagen preset")
+    parser.add_argument("--data-seed", type=int, default=0, help="benchmarks.datagen seed")
+    parser.add_argument("--requests", type=int, default=100, help="requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--endpoints", nargs="+", choices=sorted(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--output", default="", help="write the JSON report to this file")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(_main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Micro-benchmarks of the recommendation and text-extraction hot paths.
+
+Each benchmark runs a function on fixed inputs built from `benchmarks.datagen`. First one
+warm-up call, then rounds until `--min-time` seconds have passed or `--max-rounds` is hit.
+A fast function is called several times per round so that timer resolution does not
+dominate. Results are per call and use pytest-benchmark's statistics (min, max, mean,
+median, stddev, iqr, ops), but without the pytest plugin:
+
+    python -m benchmarks.micro --scale small --output micro.json
+    python -m benchmarks.micro --only collaborative_scores book_vectors_similar
+    python -m benchmarks.report base-micro.json micro.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from benchmarks.datagen import SCALES, Dataset, generate
+from benchmarks.report import environment
+
+MIN_ROUND_SECONDS = 0.002
+
+
+@dataclass
+class Inputs:
+    books: list  # transient Book objects, newest first, as the recommendation routes load them
+    user_borrowed: set[int]
+    all_borrows: list[tuple[int, int]]
+    candidate_ids: set[int]
+    pdf: bytes
+    text: bytes
+
+
+def build_inputs(dataset: Dataset, pdf_pages: int = 50) -> Inputs:
+    from app.models import Book
+    from app.recommendation_ml import MAX_BOOKS_FOR_ML
+    from benchmarks.upload import make_pdf
+
+    newest = sorted(dataset.books, key=lambda b: b["created_at"], reverse=True)[:MAX_BOOKS_FOR_ML]
+    books = [Book(**{k: b[k] for k in ("id", "title", "author", "genre", "summary")}) for b in newest]
+    by_user: dict[int, set[int]] = {}
+    for borrow in dataset.borrows:
+        by_user.setdefault(borrow["user_id"], set()).add(borrow["book_id"])
+    # The median reader, not the heaviest: the typical request. Only readers with a borrow among
+    # the loaded books, or the content scores have nothing to work with.
+    loaded = {b.id for b in books}
+    readers = sorted(((u, ids) for u, ids in by_user.items() if ids & loaded), key=lambda item: len(item[1]))
+    user_borrowed = readers[len(readers) // 2][1] if readers else set()
+    text = "\n".join(b["summary"] for b in dataset.books).encode()
+    return Inputs(
+        books=books,
+        user_borrowed=user_borrowed,
+        all_borrows=[(b["user_id"], b["book_id"]) for b in dataset.borrows],
+        candidate_ids={b.id for b in books} - user_borrowed,
+        pdf=make_pdf(pdf_pages, seed=dataset.seed),
+        text=text,
+    )
+
+
+def _benchmarks(inputs: Inputs) -> dict[str, Callable[[], object]]:
+    from app import book_vectors
+    from app.recommendation_ml import collaborative_scores
+    from app.summarization import iter_chunks, iter_document_text
+
+    vectors = book_vectors.BookVectors.from_arrays(1, book_vectors._build(inputs.books))
+    some_book = inputs.books[len(inputs.books) // 2].id
+    return {
+        "collaborative_scores": lambda: collaborative_scores(inputs.user_borrowed, inputs.all_borrows, inputs.candidate_ids),
+        "book_vectors_build": lambda: book_vectors._build(inputs.books),
+        "book_vectors_similar": lambda: vectors.similar(some_book, 10),
+        "book_vectors_similarity_to": lambda: vectors.similarity_to(inputs.user_borrowed),
+        # iter_document_text is the summary path's text extraction (run inside the extraction pool)
+        "extract_text_pdf": lambda: sum(len(piece) for piece in iter_document_text(inputs.pdf, "book.pdf")),
+        "extract_text_txt": lambda: sum(len(piece) for piece in iter_document_text(inputs.text, "book.txt")),
+        "iter_chunks": lambda: sum(1 for _ in iter_chunks(iter_document_text(inputs.text, "book.txt"), 4000)),
+    }
+
+
+def measure(fn: Callable[[], object], min_time: float = 1.0, max_rounds: int = 1000) -> dict:
+    """Per-call timing statistics of fn, pytest-benchmark style."""
+    fn()  # warm-up: imports, caches, lazy initialisation
+    start = time.perf_counter()
+    fn()
+    once = time.perf_counter() - start
+    iterations = max(1, int(MIN_ROUND_SECONDS / once)) if once > 0 else 1000
+    samples = []
+    deadline = time.perf_counter() + min_time
+    while len(samples) < max_rounds and (time.perf_counter() < deadline or len(samples) < 3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations)
+    quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+    mean = statistics.fmean(samples)
+    return {
+        "rounds": len(samples),
+        "iterations": iterations,
+        "min_s": min(samples),
+        "max_s": max(samples),
+        "mean_s": mean,
+        "median_s": statistics.median(samples),
+        "stddev_s": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "iqr_s": quartiles[2] - quartiles[0],
+        "ops": 1 / mean if mean > 0 else 0.0,
+    }
+
+
+def run(scale: str = "small", seed: int = 0, only: list[str] | None = None, min_time: float = 1.0, max_rounds: int = 1000) -> dict:
+    dataset = generate(SCALES[scale], seed)
+    benchmarks = _benchmarks(build_inputs(dataset))
+    results = {}
+    for name, fn in benchmarks.items():
+        if only and name not in only:
+            continue
+        results[name] = measure(fn, min_time=min_time, max_rounds=max_rounds)
+        print(f"{name}: median {results[name]['median_s'] * 1000:.3f} ms ({results[name]['rounds']} rounds)", file=sys.stderr)
+    return {
+        "environment": environment(),
+        "meta": {"kind": "micro", "scale": scale, "seed": seed, "rows": dataset.counts()},
+        "benchmarks": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of recommendation and extraction functions")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", help="run only these benchmarks")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds per benchmark")
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument("--output", default="", help="write the JSON report to this file")
+    args = parser.parse_args()
+    report = run(args.scale, args.seed, args.only, args.min_time, args.max_rounds)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark report metadata and comparison across commits.
+
+Every report written by `benchmarks.micro` and `benchmarks.load` carries an `environment`
+block (commit, Python, CPU count) next to its numbers. `compare` lines up two reports by
+metric path and flags changes beyond a threshold in the bad direction:
+
+    python -m benchmarks.report base.json head.json --threshold 10
+
+Exits 1 when something regressed, so it can gate a CI job. Only like-for-like runs are
+meaningful: same scale, seed and machine.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+
+# Metric name -> True if lower is better. Paths ending in other keys are not compared.
+DIRECTIONS = {
+    "median_s": True,
+    "mean_s": True,
+    "min_s": True,
+    "p50_ms": True,
+    "p95_ms": True,
+    "p99_ms": True,
+    "throughput_rps": False,
+    "ops": False,
+}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _metrics(report: dict, prefix: str = "") -> dict[str, float]:
+    out = {}
+    for key, value in report.items():
+        if key in ("environment", "meta"):
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_metrics(value, path + "."))
+        elif key in DIRECTIONS and isinstance(value, (int, float)):
+            out[path] = float(value)
+    return out
+
+
+def compare(base: dict, head: dict, threshold_pct: float = 10.0) -> list[dict]:
+    """One row per metric present in both reports, with the change in percent and whether it is
+    a regression (worse by more than threshold_pct)."""
+    before, after = _metrics(base), _metrics(head)
+    rows = []
+    for path in sorted(before.keys() & after.keys()):
+        old, new = before[path], after[path]
+        change = (new - old) / old * 100 if old else 0.0
+        lower_is_better = DIRECTIONS[path.rsplit(".", 1)[-1]]
+        worse = change > threshold_pct if lower_is_better else change < -threshold_pct
+        better = change < -threshold_pct if lower_is_better else change > threshold_pct
+        rows.append({
+            "metric": path,
+            "base": old,
+            "head": new,
+            "change_pct": round(change, 1),
+            "verdict": "regression" if worse else "improvement" if better else "",
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change treated as significant")
+    args = parser.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    rows = compare(base, head, args.threshold)
+    print(f"base {base.get('environment', {}).get('commit')}  head {head.get('environment', {}).get('commit')}")
+    width = max((len(r["metric"]) for r in rows), default=10)
+    for r in rows:
+        print(f"{r['metric']:<{width}}  {r['base']:>12.4g}  {r['head']:>12.4g}  {r['change_pct']:>+7.1f}%  {r['verdict']}")
+    sys.exit(1 if any(r["verdict"] == "regression" for r in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Local stand-in for S3, for storage benchmarks and tests without AWS, MinIO or moto.
+
+Speaks the small part of the S3 REST API that `S3Storage` uses, path-style: HeadBucket,
+PutObject, GetObject (404 `NoSuchKey` when absent), DeleteObject and DeleteObjects. Objects
+live in memory and any bucket name exists. Request signatures are not checked. Every request
+can be delayed by `latency` seconds to stand in for the round trip to a real region, which is
+what connection reuse and transfer concurrency save.
+
+Run:
+    python -m benchmarks.s3_stub --port 9500 --latency 0.02
+
+then point the API at it with `STORAGE_BACKEND=s3 AWS_BUCKET=books
+AWS_ENDPOINT_URL=http://127.0.0.1:9500 AWS_ACCESS_KEY_ID=stub AWS_SECRET_ACCESS_KEY=stub`.
+"""
+import argparse
+import asyncio
+import hashlib
+from dataclasses import dataclass, field
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+from fastapi import FastAPI, Request, Response
+
+XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+
+
+@dataclass
+class S3StubConfig:
+    latency: float = 0.0  # seconds added to every request
+    objects: dict[tuple[str, str], bytes] = field(default_factory=dict)
+    requests: int = 0
+    connections: set = field(default_factory=set)  # client (host, port) pairs seen: one per connection
+
+
+def _xml(body: str, status: int = 200) -> Response:
+    return Response(
+        content=f'<?xml version="1.0" encoding="UTF-8"?>\n{body}', status_code=status, media_type="application/xml"
+    )
+
+
+def _no_such_key(key: str) -> Response:
+    return _xml(f"<Error><Code>NoSuchKey</Code><Message>The specified key does not exist.</Message><Key>{escape(key)}</Key></Error>", 404)
+
+
+def create_s3_stub_app(config: S3StubConfig | None = None) -> FastAPI:
+    config = config or S3StubConfig()
+    stub = FastAPI(title="S3 stub")
+    stub.state.config = config
+
+    @stub.middleware("http")
+    async def delay(request: Request, call_next):
+        config.requests += 1
+        if request.client:
+            config.connections.add((request.client.host, request.client.port))
+        if config.latency:
+            await asyncio.sleep(config.latency)
+        return await call_next(request)
+
+    @stub.head("/{bucket}")
+    async def head_bucket(bucket: str):
+        return Response(status_code=200)
+
+    @stub.post("/{bucket}")
+    async def delete_objects(bucket: str, request: Request):
+        if "delete" not in request.query_params:
+            return _xml("<Error><Code>NotImplemented</Code></Error>", 501)
+        root = ElementTree.fromstring(await request.body())
+        keys = [el.text or "" for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "Key"]
+        for key in keys:
+            config.objects.pop((bucket, key), None)
+        quiet = any(el.tag.rsplit("}", 1)[-1] == "Quiet" and (el.text or "").lower() == "true" for el in root.iter())
+        deleted = "" if quiet else "".join(f"<Deleted><Key>{escape(key)}</Key></Deleted>" for key in keys)
+        return _xml(f'<DeleteResult xmlns="{XMLNS}">{deleted}</DeleteResult>')
+
+    @stub.put("/{bucket}/{key:path}")
+    async def put_object(bucket: str, key: str, request: Request):
+        body = await request.body()
+        config.objects[(bucket, key)] = body
+        return Response(status_code=200, headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'})
+
+    @stub.get("/{bucket}/{key:path}")
+    async def get_object(bucket: str, key: str):
+        body = config.objects.get((bucket, key))
+        if body is None:
+            return _no_such_key(key)
+        return Response(
+            content=body,
+            media_type="application/octet-stream",
+            headers={"ETag": f'"{hashlib.md5(body).hexdigest()}"'},
+        )
+
+    @stub.delete("/{bucket}/{key:path}")
+    async def delete_object(bucket: str, key: str):
+        config.objects.pop((bucket, key), None)
+        return Response(status_code=204)
+
+    return stub
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory S3 stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9500)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    args = parser.parse_args()
+    import uvicorn
+    uvicorn.run(create_s3_stub_app(S3StubConfig(latency=args.latency)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Throughput of the API under 1..N worker processes.
+
+Seeds a temporary SQLite database (as `benchmarks.load` does), then for each worker count
+starts the real server, either gunicorn with `gunicorn.conf.py` or `uvicorn --workers`, and
+drives CPU-bound, uncached routes (search, hybrid recommendations) from several client
+processes for a fixed time, so the load generator is not the bottleneck. The clients share
+the machine with the server: with C cores, expect throughput to stop growing well before
+C workers, and check `cpu_count` in the report before drawing conclusions.
+
+Example:
+    python -m benchmarks.scaling --workers 1 2 4 --duration 15 --clients 4 --output scaling.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.load import (
+    BENCH_EMAIL,
+    BENCH_PASSWORD,
+    _free_port,
+    configure_app_env,
+    seed_database,
+    summarize_latencies,
+)
+
+ROUTES = {
+    "search": "/books/search?q={word}",
+    "recommendations": "/recommendations?limit=10",
+    "similar": "/recommendations/similar/{book_id}?limit=10",
+}
+WORDS = ["fiction", "story", "libraries", "readers", "mystery", "fantasy", "book", "author", "sci"]
+
+
+def _client_process(base_url: str, routes: list[str], duration: float, concurrency: int, token: str, seed: int, out):
+    """One load-generating process: closed loop of `concurrency` requests for `duration` seconds."""
+    import httpx
+
+    rng = random.Random(seed)
+
+    async def run():
+        latencies: list[float] = []
+        statuses: Counter = Counter()
+        headers = {"Authorization": f"Bearer {token}"}
+        deadline = time.perf_counter() + duration
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+
+            async def loop():
+                while time.perf_counter() < deadline:
+                    path = ROUTES[rng.choice(routes)].format(word=rng.choice(WORDS), book_id=rng.randint(1, 200))
+                    start = time.perf_counter()
+                    r = await client.get(path, headers=headers)
+                    latencies.append(time.perf_counter() - start)
+                    statuses[r.status_code] += 1
+
+            await asyncio.gather(*(loop() for _ in range(concurrency)))
+        out.put((latencies, dict(statuses)))
+
+    asyncio.run(run())
+
+
+def _start_server(args, workers: int, port: int, env: dict) -> subprocess.Popen:
+    if args.server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app.main:app", "--access-logfile", "/dev/null"]
+        env = {**env, "WEB_CONCURRENCY": str(workers), "BIND": f"127.0.0.1:{port}"}
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def _wait_ready(base_url: str, proc: subprocess.Popen, timeout: float = 60) -> None:
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}")
+        try:
+            if httpx.get(base_url + "/health", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def _login(base_url: str) -> str:
+    import httpx
+
+    r = httpx.post(base_url + "/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+    r.raise_for_status()
+    return r.json()["access_token"]
+
+
+def run_workers(args, workers: int, env: dict) -> dict:
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    proc = _start_server(args, workers, port, env)
+    try:
+        _wait_ready(base_url, proc)
+        token = _login(base_url)
+        ctx = multiprocessing.get_context("spawn")
+        out = ctx.Queue()
+        # Warm every worker's caches (search index, mapped vectors) before measuring.
+        warm = ctx.Process(target=_client_process, args=(base_url, args.routes, args.warmup, args.concurrency, token, 0, out))
+        warm.start()
+        out.get()
+        warm.join()
+        clients = [
+            ctx.Process(target=_client_process, args=(base_url, args.routes, args.duration, args.concurrency, token, i + 1, out))
+            for i in range(args.clients)
+        ]
+        start = time.perf_counter()
+        for c in clients:
+            c.start()
+        latencies: list[float] = []
+        statuses: Counter = Counter()
+        for _ in clients:
+            lat, st = out.get()
+            latencies.extend(lat)
+            statuses.update(st)
+        wall = time.perf_counter() - start
+        for c in clients:
+            c.join()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+    return {"workers": workers, **summarize_latencies(latencies, wall, statuses)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API throughput scaling across worker processes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--server", choices=["gunicorn", "uvicorn"], default="gunicorn")
+    parser.add_argument("--routes", nargs="+", choices=sorted(ROUTES), default=["search", "recommendations"])
+    parser.add_argument("--books", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per worker count")
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--clients", type=int, default=max(2, os.cpu_count() or 2), help="load-generating processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="in-flight requests per client process")
+    parser.add_argument("--output", default="", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.provider, args.engine, args.db_url = "mock", "hybrid", ""
+        configure_app_env(args, "", workdir)
+        os.environ["TRENDING_REFRESH_SECONDS"] = "0"
+        os.environ["EXTRACTION_WORKERS"] = "0"
+        os.environ["SHARED_STATE_DIR"] = os.path.join(workdir, "shared")
+        asyncio.run(seed_database(args.books))
+        results = []
+        for n in args.workers:
+            result = run_workers(args, n, dict(os.environ))
+            print(json.dumps(result), file=sys.stderr)
+            results.append(result)
+    base = results[0]["throughput_rps"] or 1.0
+    for r in results:
+        r["speedup"] = round(r["throughput_rps"] / base, 2)
+    report = {
+        "meta": {"cpu_count": os.cpu_count(), "server": args.server, "routes": args.routes, "books": args.books},
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""S3 storage throughput: one shared client and transfer pool versus a client per call.
+
+Puts, gets and deletes `--objects` objects of `--size` bytes, `--concurrency` at a time. It does
+this twice, through `S3Storage` as it is and through `per_call`, a copy that builds a boto3
+client for every operation and runs it on the default thread pool. Deletes go through
+`delete_many` for the shared client and one request per key for `per_call`. By default both run
+against a `benchmarks.s3_stub` server started on a free localhost port, with `--latency` added to
+every request to stand in for the trip to a region. The report counts the TCP connections each
+run opened. Pass `--endpoint-url` to use MinIO or another running S3-compatible server (the
+bucket must exist).
+
+    python -m benchmarks.storage --objects 500 --size 65536 --concurrency 32 --latency 0.01
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from benchmarks.load import StubServer, summarize_latencies
+from benchmarks.report import environment
+from benchmarks.s3_stub import S3StubConfig, create_s3_stub_app
+
+
+def _per_call_storage(bucket: str, endpoint_url: str):
+    """S3Storage as it was: a new client per operation, on the default executor."""
+    from app.storage.s3 import S3Storage
+
+    class PerCallS3Storage(S3Storage):
+        def _client(self):
+            import boto3
+            from botocore.config import Config
+
+            return boto3.client(
+                "s3", region_name=self.region, endpoint_url=self.endpoint_url, config=Config(s3={"addressing_style": "path"})
+            )
+
+        async def _run(self, fn, *args, **kwargs):
+            return await asyncio.to_thread(fn, *args, **kwargs)
+
+        async def delete_many(self, keys) -> int:
+            return sum(await asyncio.gather(*(self.delete(key) for key in keys)))
+
+    return PerCallS3Storage(bucket=bucket, endpoint_url=endpoint_url)
+
+
+async def _phase(concurrency: int, ops) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def one(op):
+        async with sem:
+            started = time.perf_counter()
+            try:
+                await op()
+                statuses["ok"] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(op) for op in ops))
+    return summarize_latencies(latencies, time.perf_counter() - start, statuses)
+
+
+async def bench(storage, objects: int, size: int, concurrency: int, prefix: str) -> dict:
+    body = os.urandom(size)
+    keys = [f"{prefix}/{i}" for i in range(objects)]
+    report = {
+        "put": await _phase(concurrency, [lambda k=k: storage.put(k, io.BytesIO(body)) for k in keys]),
+        "get": await _phase(concurrency, [lambda k=k: storage.get(k) for k in keys]),
+    }
+    started = time.perf_counter()
+    deleted = await storage.delete_many(keys)
+    report["delete_all_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    report["deleted"] = deleted
+    report["all_deleted"] = await storage.get(keys[0]) is None and deleted == objects
+    return report
+
+
+async def run(
+    objects: int = 200,
+    size: int = 64 * 1024,
+    concurrency: int = 16,
+    latency: float = 0.005,
+    endpoint_url: str = "",
+    bucket: str = "bench",
+) -> dict:
+    from app.storage.s3 import S3Storage
+
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "stub")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "stub")
+    config = S3StubConfig(latency=latency)
+    server = None if endpoint_url else StubServer(config, app=create_s3_stub_app(config))
+    if server:
+        server.__enter__()
+        endpoint_url = server.url
+    results = {}
+    try:
+        for mode, storage in (
+            ("per_call", _per_call_storage(bucket, endpoint_url)),
+            ("shared", S3Storage(bucket=bucket, endpoint_url=endpoint_url, max_connections=concurrency)),
+        ):
+            seen = len(config.connections)
+            results[mode] = await bench(storage, objects, size, concurrency, mode)
+            if server:
+                results[mode]["connections"] = len(config.connections) - seen
+            storage.close()
+    finally:
+        if server:
+            server.__exit__(None, None, None)
+    return {
+        "environment": environment(),
+        "meta": {"kind": "storage", "objects": objects, "size": size, "concurrency": concurrency, "latency_s": latency, "stub": server is not None},
+        "modes": results,
+        "ok": all(r["all_deleted"] and r["put"]["status_codes"] == {"ok": objects} for r in results.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="S3 put/get/delete throughput, shared client vs client per call")
+    parser.add_argument("--objects", type=int, default=200)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per object")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.005, help="stub: seconds added to every request")
+    parser.add_argument("--endpoint-url", default="", help="a running S3-compatible server instead of the stub")
+    parser.add_argument("--bucket", default="bench")
+    parser.add_argument("--output", default="", help="write the JSON report to this file")
+    args = parser.parse_args()
+    report = asyncio.run(run(args.objects, args.size, args.concurrency, args.latency, args.endpoint_url, args.bucket))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""Upload latency and concurrent-request latency while large PDFs are being summarised.
+
+Generates a multi-page text PDF, uploads it `--uploads` times (at `--upload-concurrency`)
+while a steady stream of `GET /books` requests runs for `--duration` seconds, and reports
+upload latency plus `GET /books` latency with and without uploads in flight. Run it once
+per extraction mode to compare, e.g.:
+
+    python -m benchmarks.upload --extraction-workers 0   # extract in the API process
+    python -m benchmarks.upload --extraction-workers 2   # extract in the process pool
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from benchmarks.load import BENCH_EMAIL, BENCH_PASSWORD, seed_database, summarize_latencies
+
+PDF_WORDS = (
+    "library reader chapter river winter lantern garden letter journey silence harbor "
+    "mountain promise shadow morning archive compass window candle story"
+).split()
+
+
+def make_pdf(pages: int, words_per_page: int = 400, seed: int = 0) -> bytes:
+    """Build a valid multi-page PDF with extractable Helvetica text, without extra dependencies."""
+    rng = random.Random(seed)
+    objects: list[bytes] = []
+    page_ids = [4 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i in range(pages):
+        words = [rng.choice(PDF_WORDS) for _ in range(words_per_page)]
+        lines = [" ".join(words[j : j + 12]) for j in range(0, len(words), 12)]
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+        ops += [f"({line}) Tj T*" for line in lines]
+        ops.append("ET")
+        stream = "\n".join(ops).encode()
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_ids[i] + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % n + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+async def _get_books_for(client, headers, seconds: float, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            r = await client.get("/books?limit=20", headers=headers)
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize_latencies(latencies, time.perf_counter() - start, statuses)
+
+
+async def _uploads(client, headers, pdf: bytes, count: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with sem:
+            start = time.perf_counter()
+            r = await client.post(
+                "/books",
+                headers=headers,
+                data={"title": f"Large upload {i}", "author": "Bench", "genre": "Fiction"},
+                files={"file": (f"large-{i}.pdf", pdf, "application/pdf")},
+            )
+            latencies.append(time.perf_counter() - start)
+            statuses[r.status_code] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize_latencies(latencies, time.perf_counter() - start, statuses)
+
+
+async def _main(args) -> dict:
+    import httpx
+
+    pdf = make_pdf(args.pages)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["DB_URL"] = f"sqlite+aiosqlite:///{workdir}/bench.db"
+        os.environ["LOCAL_STORAGE_PATH"] = os.path.join(workdir, "uploads")
+        os.environ["LLM_PROVIDER"] = "mock"
+        os.environ["EXTRACTION_WORKERS"] = str(args.extraction_workers)
+        await seed_database(200)
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            r = await client.post("/auth/login", json={"email": BENCH_EMAIL, "password": BENCH_PASSWORD})
+            headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+            idle = await _get_books_for(client, headers, args.duration, args.concurrency)
+            busy_task = asyncio.create_task(_get_books_for(client, headers, args.duration, args.concurrency))
+            uploads = await _uploads(client, headers, pdf, args.uploads, args.upload_concurrency)
+            busy = await busy_task
+    return {
+        "meta": {
+            "extraction_workers": args.extraction_workers,
+            "pdf_pages": args.pages,
+            "pdf_bytes": len(pdf),
+            "uploads": args.uploads,
+            "duration_s": args.duration,
+        },
+        "uploads": uploads,
+        "list_books_idle": idle,
+        "list_books_during_uploads": busy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload and concurrent-request latency during large PDF uploads")
+    parser.add_argument("--extraction-workers", type=int, default=2, help="0 = extract in the API process")
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--uploads", type=int, default=4)
+    parser.add_argument("--upload-concurrency", type=int, default=2)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of GET /books load per phase")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--output", default="")
+    args = parser.parse_args()
+    report = asyncio.run(_main(args))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+    sys.stdout.flush()
+    from app.extraction import shutdown_pool
+
+    shutdown_pool()
+    os._exit(0)  # don't wait for summary threads still working on the uploads
+
+
+if __name__ == "__main__":
+    main()
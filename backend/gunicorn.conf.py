@@ -0,0 +1,28 @@
+"""Gunicorn settings for running the API with several worker processes.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+WEB_CONCURRENCY sets the number of workers (default: one per CPU). Each worker is a separate
+uvicorn event loop with its own database pool, LLM scheduler, response cache and extraction
+pool; large read-only data is shared through SHARED_STATE_DIR (see app/shared_state.py).
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Import the app in each worker, not in the master: workers must not inherit its threads or event loop.
+preload_app = False
+timeout = int(os.environ.get("WORKER_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+
+
+def on_starting(server):
+    # Artefacts left by an earlier deployment may describe another database's catalogue versions.
+    from app.config import settings
+
+    shutil.rmtree(settings.shared_state_dir, ignore_errors=True)
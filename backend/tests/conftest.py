@@ -6,9 +6,12 @@ from sqlalchemy.pool import NullPool
 from httpx import AsyncClient
 from fastapi.testclient import TestClient
 
+from app import book_vectors, query_budget, rate_limit
 from app.main import app
 from app.db import Base, get_db
 from app.config import settings
+from app.http_cache import response_cache
+from app.search import search_index
 from app.models import User, Book, Borrow, Review, UserPreference
 
 
@@ -18,6 +21,7 @@ TEST_DB_URL = "sqlite+aiosqlite:///:memory:"
 # Create test engine
 test_engine = create_async_engine(TEST_DB_URL, echo=False, poolclass=NullPool)
 TestSessionLocal = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+query_budget.instrument_engine(test_engine)
 
 
 @pytest.fixture(scope="session")
@@ -29,8 +33,16 @@ def event_loop():
 
 
 @pytest.fixture(scope="function", autouse=True)
-async def setup_database():
+async def setup_database(monkeypatch, tmp_path):
     """Create all tables before each test and drop them after."""
+    # Versions restart with every fresh database, so anything keyed by them must start empty too
+    response_cache.clear()
+    search_index.clear()
+    book_vectors.reset()
+    rate_limit.memory_store.clear()
+    monkeypatch.setattr(settings, "shared_state_dir", str(tmp_path / "shared"))
+    # A request over its route's query budget, or repeating a statement N+1 style, fails the test
+    monkeypatch.setattr(settings, "query_budget_mode", "raise")
     async with test_engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
     yield
@@ -0,0 +1,66 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog import catalog_version
+from app.models import Book, BookStats, Borrow, Review, User
+from benchmarks.datagen import SCALES, generate, seed, top_share
+from benchmarks.micro import measure
+from benchmarks.report import compare
+
+
+def test_datagen_is_deterministic_and_skewed():
+    """Test the same seed gives the same rows and borrows follow a power law."""
+    a, b = generate(SCALES["tiny"], seed=3), generate(SCALES["tiny"], seed=3)
+    assert a.books == b.books and a.borrows == b.borrows and a.reviews == b.reviews
+    assert generate(SCALES["tiny"], seed=4).borrows != a.borrows
+    small = generate(SCALES["small"])
+    assert small.counts()["books"] == 1000
+    assert top_share(small) > 0.5  # the top 10% of books get most of the borrows
+
+
+@pytest.mark.asyncio
+async def test_datagen_seeds_database_with_derived_tables(db_session: AsyncSession):
+    """Test seeding inserts every row and rebuilds rating stats and the catalogue version."""
+    dataset = generate(SCALES["tiny"], seed=1)
+    await seed(db_session, dataset)
+    for model, name in ((User, "users"), (Book, "books"), (Borrow, "borrows"), (Review, "reviews")):
+        assert (await db_session.execute(select(func.count(model.id)))).scalar() == dataset.counts()[name]
+    rated = (await db_session.execute(select(func.sum(BookStats.rating_count)))).scalar()
+    assert rated == len(dataset.reviews)
+    assert await catalog_version(db_session) == len(dataset.books)
+
+
+def test_report_compare_flags_regressions():
+    """Test latencies going up and throughput going down beyond the threshold are regressions."""
+    base = {"environment": {"commit": "a"}, "endpoints": {"list": {"p95_ms": 10.0, "throughput_rps": 100.0, "requests": 50}}}
+    head = {"environment": {"commit": "b"}, "endpoints": {"list": {"p95_ms": 12.0, "throughput_rps": 95.0, "requests": 50}}}
+    rows = {r["metric"]: r for r in compare(base, head, threshold_pct=10)}
+    assert set(rows) == {"endpoints.list.p95_ms", "endpoints.list.throughput_rps"}
+    assert rows["endpoints.list.p95_ms"]["verdict"] == "regression"
+    assert rows["endpoints.list.p95_ms"]["change_pct"] == 20.0
+    assert rows["endpoints.list.throughput_rps"]["verdict"] == ""
+    assert compare(head, base)[0]["verdict"] == "improvement"
+
+
+def test_measure_reports_per_call_statistics():
+    """Test the micro-benchmark harness batches fast calls and reports per-call numbers."""
+    calls = []
+    stats = measure(lambda: calls.append(1), min_time=0.01)
+    assert stats["rounds"] >= 3
+    assert stats["iterations"] > 1
+    assert len(calls) == stats["rounds"] * stats["iterations"] + 2
+    assert 0 < stats["min_s"] <= stats["median_s"] <= stats["max_s"]
+    assert stats["ops"] > 0
+
+
+@pytest.mark.asyncio
+async def test_storage_benchmark_shared_client_reuses_connections():
+    """Test both S3 modes move every object through the stand-in and the shared client stays in its pool."""
+    from benchmarks.storage import run
+
+    report = await run(objects=20, size=1024, concurrency=4, latency=0.0)
+    assert report["ok"]
+    shared, per_call = report["modes"]["shared"], report["modes"]["per_call"]
+    assert shared["deleted"] == per_call["deleted"] == 20
+    assert shared["connections"] <= 4 < per_call["connections"]
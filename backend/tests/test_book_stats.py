@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, BookStats, Borrow, Review, User
+from app.stats import rebuild_book_stats
+
+
+@pytest.fixture(autouse=True)
+def no_sentiment(monkeypatch):
+    """Skip the review sentiment thread; these tests only look at the counters."""
+    from app.routers import books
+
+    monkeypatch.setattr(books, "run_sentiment_task", lambda *args: None)
+
+
+async def _review(client: AsyncClient, db: AsyncSession, user_id: int, headers: dict, book_id: int, rating: int):
+    # Returned, so the same reader can borrow the book again (one active loan per reader)
+    db.add(Borrow(user_id=user_id, book_id=book_id, returned_at=datetime.utcnow()))
+    await db.commit()
+    response = await client.post(f"/books/{book_id}/reviews", headers=headers, json={"rating": rating})
+    assert response.status_code == 200
+    db.expire_all()  # the app shares this session in tests; drop the book's cached stats
+
+
+@pytest.mark.asyncio
+async def test_review_updates_stats(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, auth_headers: dict, test_book: Book
+):
+    """Test each review bumps the book's count, average and histogram in the same request."""
+    user_id, book_id = test_user.id, test_book.id
+    await _review(client, db_session, user_id, auth_headers, book_id, 4)
+    await _review(client, db_session, user_id, auth_headers, book_id, 1)
+    data = (await client.get(f"/books/{book_id}")).json()
+    assert data["rating_count"] == 2
+    assert data["rating_average"] == 2.5
+    assert data["rating_histogram"] == {"1": 1, "2": 0, "3": 0, "4": 1, "5": 0}
+
+    item = (await client.get("/books")).json()["items"][0]
+    assert item["rating_count"] == 2 and item["rating_average"] == 2.5
+
+
+@pytest.mark.asyncio
+async def test_list_books_sorted_by_rating(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, auth_headers: dict
+):
+    """Test sort=rating puts the best-rated first and unreviewed books last."""
+    books = [Book(title=t) for t in ("Unrated", "Good", "Best")]
+    db_session.add_all(books)
+    await db_session.commit()
+    user_id, good, best = test_user.id, books[1].id, books[2].id
+    await _review(client, db_session, user_id, auth_headers, good, 3)
+    await _review(client, db_session, user_id, auth_headers, best, 5)
+    await _review(client, db_session, user_id, auth_headers, best, 4)
+
+    response = await client.get("/books", params={"sort": "rating"})
+    assert [b["title"] for b in response.json()["items"]] == ["Best", "Good", "Unrated"]
+    response = await client.get("/books", params={"sort": "reviews"})
+    assert [b["title"] for b in response.json()["items"]][0] == "Best"
+    assert (await client.get("/books", params={"sort": "popular"})).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_rebuild_book_stats(db_session: AsyncSession, test_user: User, test_book: Book):
+    """Test the backfill recomputes stats from reviews written without the counters."""
+    db_session.add_all([Review(user_id=test_user.id, book_id=test_book.id, rating=r) for r in (5, 5, 2)])
+    await db_session.commit()
+    assert await rebuild_book_stats(db_session) == 1
+    await db_session.commit()
+    stats = (await db_session.execute(select(BookStats))).scalar_one()
+    assert (stats.rating_count, stats.rating_sum) == (3, 12)
+    assert stats.rating_average == 4.0
+    assert stats.histogram() == {"1": 0, "2": 1, "3": 0, "4": 0, "5": 2}
@@ -0,0 +1,78 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, Borrow, Review, User
+from app.query_budget import count_queries
+from app.routers.books import MAX_BATCH_IDS
+
+
+@pytest.fixture
+async def shelf(db_session: AsyncSession, test_user: User) -> list[int]:
+    """Five books; test_user has the second on loan and has reviewed the fourth."""
+    books = [Book(title=f"Book {i}", author="Author", genre="Fiction") for i in range(5)]
+    db_session.add_all(books)
+    await db_session.commit()
+    db_session.add(Borrow(user_id=test_user.id, book_id=books[1].id))
+    db_session.add(Review(user_id=test_user.id, book_id=books[3].id, rating=4, text="Good"))
+    await db_session.commit()
+    return [b.id for b in books]
+
+
+@pytest.mark.asyncio
+async def test_batch_keeps_input_order_and_reports_missing(client: AsyncClient, shelf: list[int]):
+    """Test items follow the requested order, duplicates collapse and unknown ids are listed."""
+    ids = [shelf[3], 999999, shelf[0], shelf[3], shelf[2]]
+    response = await client.get("/books/batch", params={"ids": ",".join(map(str, ids))})
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["id"] for item in data["items"]] == [shelf[3], shelf[0], shelf[2]]
+    assert data["missing"] == [999999]
+    assert data["items"][0]["my_review"] is None and data["items"][0]["rating_count"] == 0
+    assert "public" in response.headers["cache-control"]
+
+
+@pytest.mark.asyncio
+async def test_batch_includes_my_state(client: AsyncClient, auth_headers: dict, shelf: list[int]):
+    """Test a signed-in batch carries the caller's loans and reviews, privately cached."""
+    response = await client.get("/books/batch", headers=auth_headers, params={"ids": ",".join(map(str, shelf))})
+    items = response.json()["items"]
+    assert [item["currently_borrowed_by_me"] for item in items] == [False, True, False, False, False]
+    assert items[1]["can_review"] is True and items[0]["can_review"] is False
+    assert items[3]["my_review"] == {"rating": 4, "text": "Good"}
+    assert "private" in response.headers["cache-control"]
+
+    post = await client.post("/books/batch", headers=auth_headers, json={"ids": list(reversed(shelf))})
+    assert post.status_code == 200
+    assert post.json()["items"] == list(reversed(items))
+
+
+@pytest.mark.asyncio
+async def test_batch_query_count_is_constant(
+    client: AsyncClient, db_session: AsyncSession, auth_headers: dict, test_user: User
+):
+    """Test a batch of many books costs the same queries as a batch of one."""
+    books = [Book(title=f"Many {i}") for i in range(MAX_BATCH_IDS)]
+    db_session.add_all(books)
+    await db_session.commit()
+    ids = [b.id for b in books]
+    db_session.add_all([Borrow(user_id=test_user.id, book_id=book_id) for book_id in ids[::7]])
+    await db_session.commit()
+
+    counts = []
+    for batch in (ids[:1], ids):
+        with count_queries() as log:
+            response = await client.post("/books/batch", headers=auth_headers, json={"ids": batch})
+        assert len(response.json()["items"]) == len(batch)
+        counts.append(log.count)
+    assert counts[0] == counts[1] == 4  # user, books with stats, active loans, reviews
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_bad_ids(client: AsyncClient):
+    """Test empty, malformed and oversized id lists are a 400."""
+    assert (await client.get("/books/batch", params={"ids": ""})).status_code == 400
+    assert (await client.get("/books/batch", params={"ids": "1,two"})).status_code == 400
+    too_many = list(range(1, MAX_BATCH_IDS + 2))
+    assert (await client.post("/books/batch", json={"ids": too_many})).status_code == 400
+    assert (await client.get("/books/batch")).status_code == 422
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog import catalog_version, prune_changes, record_change, record_changes
+from app.models import Book, CatalogState
+
+
+@pytest.mark.asyncio
+async def test_writes_are_logged_in_order(client: AsyncClient, auth_headers: dict):
+    """Test create, update and delete each append a change and advance the version."""
+    book_id = (await client.post("/books", headers=auth_headers, data={"title": "One"})).json()["id"]
+    await client.put(f"/books/{book_id}", headers=auth_headers, json={"title": "Uno"})
+    await client.delete(f"/books/{book_id}", headers=auth_headers)
+
+    data = (await client.get("/changes")).json()
+    assert [(c["version"], c["kind"], c["book_id"]) for c in data["changes"]] == [
+        (1, "created", book_id),
+        (2, "updated", book_id),
+        (3, "deleted", book_id),
+    ]
+    assert data["version"] == data["next_since"] == 3
+    assert not data["has_more"]
+    assert (await client.get("/changes/version")).json() == {"version": 3}
+
+
+@pytest.mark.asyncio
+async def test_new_database_feed_starts_at_zero(client: AsyncClient, auth_headers: dict, db_session: AsyncSession):
+    """Test a freshly migrated database (catalog_state at 0, no changes) serves since=0 before and after writes."""
+    db_session.add(CatalogState(id=1, version=0))
+    await db_session.commit()
+    response = await client.get("/changes", params={"since": 0})
+    assert response.status_code == 200 and response.json()["changes"] == []
+    book_id = (await client.post("/books", headers=auth_headers, data={"title": "First"})).json()["id"]
+    data = (await client.get("/changes", params={"since": 0})).json()
+    assert [(c["version"], c["book_id"]) for c in data["changes"]] == [(1, book_id)]
+
+
+@pytest.mark.asyncio
+async def test_books_from_before_the_feed_need_a_resync(client: AsyncClient, db_session: AsyncSession):
+    """Test a database upgraded with books already in it (version 1, no changes) sends since=0 readers to reload."""
+    db_session.add_all([CatalogState(id=1, version=1), Book(title="Older than the feed")])
+    await db_session.commit()
+    response = await client.get("/changes", params={"since": 0})
+    assert response.status_code == 410
+    assert (await client.get("/changes", params={"since": 1})).json()["changes"] == []
+
+
+@pytest.mark.asyncio
+async def test_feed_pages_and_resync(client: AsyncClient, db_session: AsyncSession):
+    """Test the feed pages by version and answers 410 once the needed entries are pruned."""
+    assert await record_changes(db_session, "created", [1, 2, 3]) == 3
+    await db_session.commit()
+    page = (await client.get("/changes", params={"since": 0, "limit": 2})).json()
+    assert [c["book_id"] for c in page["changes"]] == [1, 2]
+    assert page["has_more"]
+    rest = (await client.get("/changes", params={"since": page["next_since"]})).json()
+    assert [c["book_id"] for c in rest["changes"]] == [3]
+    assert (await client.get("/changes", params={"since": 9})).status_code == 410
+
+    await prune_changes(db_session, datetime.utcnow() + timedelta(seconds=1))
+    await record_change(db_session, "updated", 2)
+    await db_session.commit()
+    assert await catalog_version(db_session) == 4
+    response = await client.get("/changes", params={"since": 1})
+    assert response.status_code == 410
+    assert response.headers["X-Catalog-Version"] == "4"
+    assert [c["version"] for c in (await client.get("/changes", params={"since": 3})).json()["changes"]] == [4]
+
+
+@pytest.mark.asyncio
+async def test_search_index_follows_the_feed(client: AsyncClient, auth_headers: dict):
+    """Test the in-process search index picks up logged changes without a rebuild."""
+    from app.search import search_index
+
+    await client.post("/books", headers=auth_headers, data={"title": "Dragon Tales"})
+    assert len((await client.get("/books/search", params={"q": "dragon"})).json()["items"]) == 1
+    version = search_index.version
+    book_id = (await client.post("/books", headers=auth_headers, data={"title": "Dragon Lore"})).json()["id"]
+    assert len((await client.get("/books/search", params={"q": "dragon"})).json()["items"]) == 2
+    assert search_index.version == version + 1
+    await client.delete(f"/books/{book_id}", headers=auth_headers)
+    assert len((await client.get("/books/search", params={"q": "lore"})).json()["items"]) == 0
@@ -0,0 +1,103 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models import Book, Review, User
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture(autouse=True)
+def export_settings(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    monkeypatch.setattr(settings, "export_commit_lag_seconds", 0)  # export rows the tests just wrote
+
+
+@pytest.fixture
+async def books(db_session: AsyncSession, test_user: User) -> list[Book]:
+    base = datetime(2025, 1, 1)
+    rows = [
+        Book(title=f"Book {i}", genre="Fiction", created_at=base, updated_at=base + timedelta(days=i))
+        for i in range(3)
+    ]
+    db_session.add_all(rows)
+    await db_session.commit()
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_export_ndjson_with_watermark(client: AsyncClient, books: list[Book]):
+    """Test NDJSON export returns every row and a watermark that makes the next export incremental."""
+    response = await client.get("/export/books", headers=ADMIN)
+    assert response.status_code == 200
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["title"] for r in rows] == ["Book 0", "Book 1", "Book 2"]
+    assert "file_path" not in rows[0]
+    watermark = response.headers["X-Export-Watermark"]
+    assert watermark == "2025-01-03T00:00:00"
+
+    response = await client.get("/export/books", headers=ADMIN, params={"since": "2025-01-01T12:00:00"})
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["Book 1", "Book 2"]
+
+    response = await client.get("/export/books", headers=ADMIN, params={"since": watermark})
+    assert response.text == ""
+    assert response.headers["X-Export-Watermark"] == watermark
+
+
+@pytest.mark.asyncio
+async def test_export_watermark_trails_open_transactions(
+    client: AsyncClient, db_session: AsyncSession, books: list[Book], monkeypatch
+):
+    """Test a row stamped within the commit lag waits for a later export instead of being skipped for good."""
+    monkeypatch.setattr(settings, "export_commit_lag_seconds", 60)
+    recent = datetime.utcnow() - timedelta(seconds=5)
+    db_session.add(Book(title="Recent", genre="Fiction", created_at=recent, updated_at=recent))
+    await db_session.commit()
+    response = await client.get("/export/books", headers=ADMIN, params={"since": "2025-01-03T00:00:00"})
+    assert response.text == ""
+    watermark = datetime.fromisoformat(response.headers["X-Export-Watermark"])
+    assert watermark < recent
+
+    monkeypatch.setattr(settings, "export_commit_lag_seconds", 0)
+    response = await client.get("/export/books", headers=ADMIN, params={"since": watermark.isoformat()})
+    assert [json.loads(line)["title"] for line in response.text.splitlines()] == ["Recent"]
+
+
+@pytest.mark.asyncio
+async def test_export_csv(
+    client: AsyncClient, db_session: AsyncSession, test_user: User, books: list[Book]
+):
+    """Test CSV export has a header row and one line per row."""
+    db_session.add(Review(user_id=test_user.id, book_id=books[0].id, rating=4, text="Good, really"))
+    await db_session.commit()
+    response = await client.get("/export/reviews", headers=ADMIN, params={"format": "csv"})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]["text"] == "Good, really"
+    assert rows[0]["rating"] == "4"
+
+
+@pytest.mark.asyncio
+async def test_export_parquet(client: AsyncClient, books: list[Book]):
+    """Test Parquet export round-trips through pyarrow."""
+    pq = pytest.importorskip("pyarrow.parquet")
+    response = await client.get("/export/books", headers=ADMIN, params={"format": "parquet"})
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column("title").to_pylist() == ["Book 0", "Book 1", "Book 2"]
+
+
+@pytest.mark.asyncio
+async def test_export_errors(client: AsyncClient, auth_headers: dict):
+    """Test unknown tables and formats are rejected, and export needs the admin token, not a reader's."""
+    assert (await client.get("/export/users", headers=ADMIN)).status_code == 404
+    assert (await client.get("/export/books", headers=ADMIN, params={"format": "xml"})).status_code == 400
+    assert (await client.get("/export/books")).status_code == 403
+    assert (await client.get("/export/reviews", headers=auth_headers)).status_code == 403
+    assert (await client.get("/export", headers=auth_headers)).status_code == 403
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app import extraction
+from app.extraction import ExtractionError, extracted_text, run_in_pool
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    monkeypatch.setattr(extraction.settings, "extraction_workers", 1)
+    monkeypatch.setattr(extraction.settings, "extraction_memory_limit_mb", 512)
+    yield
+    extraction.shutdown_pool()
+
+
+@pytest.mark.asyncio
+async def test_extracted_text_in_process_pool(pool_settings):
+    """Test text is extracted by a pool worker and streamed back."""
+    content = ("word " * 30000).encode()
+    async with extracted_text(content, "book.txt") as pieces:
+        text = "".join(pieces)
+    assert text == content.decode()
+
+
+@pytest.mark.asyncio
+async def test_run_in_pool_timeout_kills_the_worker(pool_settings):
+    """Test a stuck worker is killed on timeout and the next extraction still runs."""
+    with pytest.raises(ExtractionError, match="timed out"):
+        await run_in_pool(time.sleep, 30, timeout=1)
+    assert await run_in_pool(len, b"abc", timeout=30) == 3
+
+
+@pytest.mark.asyncio
+async def test_a_stuck_extraction_fails_only_itself(pool_settings, monkeypatch):
+    """Test extractions running alongside one that times out or crashes still succeed."""
+    monkeypatch.setattr(extraction.settings, "extraction_workers", 3)
+    stuck = run_in_pool(time.sleep, 30, timeout=0.5)
+    crashed = run_in_pool(os._exit, 3, timeout=30)
+    healthy = run_in_pool(time.sleep, 1.5, timeout=30)
+    results = await asyncio.gather(stuck, crashed, healthy, return_exceptions=True)
+    assert isinstance(results[0], ExtractionError) and "timed out" in str(results[0])
+    assert isinstance(results[1], ExtractionError) and "exit code 3" in str(results[1])
+    assert results[2] is None
+
+
+@pytest.mark.asyncio
+async def test_run_in_pool_memory_limit(pool_settings):
+    """Test a worker exceeding the memory limit fails with ExtractionError."""
+    with pytest.raises(ExtractionError):
+        await run_in_pool(bytearray, 2 * 1024 * 1024 * 1024, timeout=30)
+
+
+@pytest.mark.asyncio
+async def test_extracted_text_without_pool(monkeypatch):
+    """Test extraction_workers=0 extracts in a thread."""
+    monkeypatch.setattr(extraction.settings, "extraction_workers", 0)
+    async with extracted_text(b"a" * 100, "book.txt") as pieces:
+        assert "".join(pieces) == "a" * 100
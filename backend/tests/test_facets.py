@@ -0,0 +1,85 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.facets import get_facets, rebuild_facet_counts
+from app.models import Book, CatalogFacetCount, User
+
+
+def _counts(facets: dict, facet: str) -> dict[str, int]:
+    return {f["value"]: f["count"] for f in facets[facet]}
+
+
+async def _create(client: AsyncClient, headers: dict, title: str, author: str, genre: str) -> int:
+    response = await client.post("/books", headers=headers, data={"title": title, "author": author, "genre": genre})
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_facet_counts_follow_create_update_delete(client: AsyncClient, auth_headers: dict):
+    """Test facet counts are maintained incrementally by the book handlers."""
+    first = await _create(client, auth_headers, "One", "Ann", "Fantasy")
+    await _create(client, auth_headers, "Two", "Ann", "Fantasy")
+    await _create(client, auth_headers, "Three", "Bob", "Mystery")
+    facets = (await client.get("/books")).json()["facets"]
+    assert _counts(facets, "genre") == {"Fantasy": 2, "Mystery": 1}
+    assert _counts(facets, "author") == {"Ann": 2, "Bob": 1}
+    assert _counts(facets, "has_summary") == {"false": 3}
+
+    await client.put(f"/books/{first}", headers=auth_headers, json={"genre": "Mystery"})
+    facets = (await client.get("/books")).json()["facets"]
+    assert _counts(facets, "genre") == {"Fantasy": 1, "Mystery": 2}
+
+    await client.delete(f"/books/{first}", headers=auth_headers)
+    facets = (await client.get("/books")).json()["facets"]
+    assert _counts(facets, "genre") == {"Fantasy": 1, "Mystery": 1}
+    assert _counts(facets, "author") == {"Ann": 1, "Bob": 1}
+
+
+@pytest.mark.asyncio
+async def test_list_books_filters(client: AsyncClient, db_session: AsyncSession, test_user: User, test_user2: User):
+    """Test genre, author, has_summary and added_by narrow the listing and its total."""
+    db_session.add_all([
+        Book(title="A", author="Ann", genre="Fantasy", summary="s", added_by_user_id=test_user.id),
+        Book(title="B", author="Ann", genre="Mystery", added_by_user_id=test_user2.id),
+        Book(title="C", author="Bob", genre="Fantasy", added_by_user_id=test_user2.id),
+    ])
+    await db_session.commit()
+
+    async def titles(**params) -> tuple[list[str], int]:
+        data = (await client.get("/books", params={**params, "facets": "false"})).json()
+        assert data["facets"] is None
+        return sorted(b["title"] for b in data["items"]), data["total"]
+
+    assert await titles(genre="Fantasy") == (["A", "C"], 2)
+    assert await titles(author="Ann", genre="Mystery") == (["B"], 1)
+    assert await titles(has_summary="true") == (["A"], 1)
+    assert await titles(has_summary="false") == (["B", "C"], 2)
+    assert await titles(added_by=test_user2.id) == (["B", "C"], 2)
+
+
+@pytest.mark.asyncio
+async def test_rebuild_facet_counts(db_session: AsyncSession, test_user: User):
+    """Test the backfill recounts books added outside the API."""
+    db_session.add_all([Book(title="A", genre="Poetry"), Book(title="B", genre="Poetry", summary="x")])
+    await db_session.commit()
+    await rebuild_facet_counts(db_session)
+    await db_session.commit()
+    facets = await get_facets(db_session)
+    assert _counts(facets, "genre") == {"Poetry": 2}
+    assert _counts(facets, "has_summary") == {"false": 1, "true": 1}
+
+
+@pytest.mark.asyncio
+async def test_get_facets_keeps_the_top_values_of_each_facet(db_session: AsyncSession):
+    """Test the limit applies per facet, keeps the most common values and skips zero counts."""
+    db_session.add_all(
+        [CatalogFacetCount(facet="author", value=f"A{i}", count=i) for i in range(6)]
+        + [CatalogFacetCount(facet="genre", value=g, count=n) for g, n in (("Poetry", 3), ("Drama", 3), ("Epic", 1))]
+    )
+    await db_session.commit()
+    facets = await get_facets(db_session, limit=2)
+    assert facets["author"] == [{"value": "A5", "count": 5}, {"value": "A4", "count": 4}]
+    assert facets["genre"] == [{"value": "Drama", "count": 3}, {"value": "Poetry", "count": 3}]
+    assert facets["has_summary"] == []
+    assert _counts(await get_facets(db_session), "author") == {f"A{i}": i for i in range(1, 6)}
@@ -0,0 +1,78 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.http_cache import ResponseCache, etag_matches, response_cache
+from app.models import Book
+
+
+def test_etag_matching():
+    """Test If-None-Match lists, weak validators and the wildcard."""
+    assert etag_matches('"a", W/"book-1-2"', '"book-1-2"')
+    assert etag_matches("*", '"x"')
+    assert not etag_matches('"book-1-1"', '"book-1-2"')
+    assert not etag_matches(None, '"x"')
+
+
+def test_response_cache_lru_and_tags():
+    """Test entries are evicted least recently used first and dropped by tag."""
+    cache = ResponseCache(max_entries=2)
+    cache.put("/a", '"1"', b"a", ("catalog",))
+    cache.put("/b", '"1"', b"b", (("book", 1),))
+    assert cache.get("/a", '"1"') == b"a"
+    assert cache.get("/a", '"2"') is None
+    cache.put("/c", '"1"', b"c", ("catalog",))
+    assert cache.get("/b", '"1"') is None
+    assert cache.invalidate("catalog") == 2
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_book_detail_etag_and_304(client: AsyncClient, auth_headers: dict, test_book: Book):
+    """Test anonymous detail reads get an ETag, revalidate with 304 and change after an update."""
+    response = await client.get(f"/books/{test_book.id}")
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"].startswith("public")
+    assert response.json()["title"] == test_book.title
+
+    response = await client.get(f"/books/{test_book.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    await client.put(f"/books/{test_book.id}", headers=auth_headers, json={"title": "Renamed"})
+    response = await client.get(f"/books/{test_book.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["title"] == "Renamed"
+
+    private = await client.get(f"/books/{test_book.id}", headers=auth_headers)
+    assert private.headers["Cache-Control"] == "private, no-cache"
+    assert "ETag" not in private.headers
+
+
+@pytest.mark.asyncio
+async def test_list_served_from_cache_until_a_write(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, test_book: Book
+):
+    """Test list responses are reused while the catalogue version holds and invalidated by writes."""
+    first = await client.get("/books")
+    hits = response_cache.hits
+    again = await client.get("/books")
+    assert response_cache.hits == hits + 1
+    assert again.content == first.content and again.headers["ETag"] == first.headers["ETag"]
+
+    await client.post("/books", headers=auth_headers, data={"title": "New"})
+    response = await client.get("/books")
+    assert response.headers["ETag"] != first.headers["ETag"]
+    assert response.json()["total"] == 2
+
+
+@pytest.mark.asyncio
+async def test_analysis_and_similar_are_validated(client: AsyncClient, test_book: Book):
+    """Test the analysis and similar-books endpoints answer 304 to a matching ETag."""
+    for path in (f"/books/{test_book.id}/analysis", f"/recommendations/similar/{test_book.id}"):
+        response = await client.get(path)
+        assert response.status_code == 200
+        cached = await client.get(path, headers={"If-None-Match": response.headers["ETag"]})
+        assert cached.status_code == 304
+    assert (await client.get("/books/99999/analysis")).status_code == 404
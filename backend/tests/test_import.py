@@ -0,0 +1,115 @@
+import io
+import json
+import zipfile
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.catalog_import import iter_rows
+from app.models import Book, ImportJob
+
+
+def _zip(files: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return buf.getvalue()
+
+
+@pytest.fixture
+def queued(monkeypatch, tmp_path) -> list:
+    """Capture bulk summary jobs instead of starting threads, and store files under tmp_path."""
+    from app.config import settings
+    from app.routers import books
+
+    items = []
+    monkeypatch.setattr(settings, "local_storage_path", str(tmp_path))
+    monkeypatch.setattr(books, "run_bulk_summary_task", items.extend)
+    return items
+
+
+def test_iter_rows_reports_invalid_records():
+    """Test rows are numbered in order and bad rows carry an error."""
+    ndjson = io.StringIO('{"title": "A"}\n\nnot json\n{"author": "x"}\n')
+    rows = list(iter_rows(ndjson, "ndjson"))
+    assert [(n, e is None) for n, _, e in rows] == [(1, True), (2, False), (3, False)]
+    csv_rows = list(iter_rows(io.StringIO("Title,Author\nB,Bee\n"), "csv"))
+    assert csv_rows[0][1]["author"] == "Bee"
+
+
+@pytest.mark.asyncio
+async def test_import_csv_with_files(client: AsyncClient, auth_headers: dict, db_session: AsyncSession, queued: list):
+    """Test a CSV import creates books, stores files, updates facets and queues summaries in bulk."""
+    metadata = "title,author,genre,file\nOne,Ann,Poetry,one.txt\nTwo,Bob,Poetry,\nThree,,Drama,missing.txt\n"
+    archive = _zip({"one.txt": b"A long enough text for the summariser to bother with it." * 2})
+    response = await client.post(
+        "/books/import",
+        headers=auth_headers,
+        files={"metadata": ("books.csv", metadata, "text/csv"), "files": ("books.zip", archive, "application/zip")},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["status"] == "done"
+    assert report["books_created"] == 2
+    assert report["files_uploaded"] == 1
+    assert report["rows_invalid"] == 1
+    assert "missing.txt" in report["errors"][0]
+    assert report["rows_per_second"] > 0
+    assert len(queued) == 1 and queued[0][2] == "one.txt"
+
+    facets = (await client.get("/books")).json()["facets"]
+    assert {f["value"]: f["count"] for f in facets["genre"]} == {"Poetry": 2}
+    job = (await client.get(f"/books/import/{report['job_id']}", headers=auth_headers)).json()
+    assert job["rows_done"] == 3 and job["status"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_import_resumes_after_failure(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, queued: list, monkeypatch
+):
+    """Test a run that fails midway keeps earlier batches and a resumed run finishes without duplicates."""
+    from app.config import settings
+    from app.storage.local import LocalStorage
+
+    monkeypatch.setattr(settings, "import_batch_size", 2)
+    metadata = "".join(json.dumps({"title": f"Book {i}", "file": f"{i}.txt"}) + "\n" for i in range(5))
+    archive = _zip({f"{i}.txt": f"content {i}".encode() for i in range(5)})
+    files = {"metadata": ("books.ndjson", metadata), "files": ("books.zip", archive)}
+
+    real_put = LocalStorage.put
+
+    async def failing_put(self, key, content, content_type=""):
+        if key.endswith("-3.txt"):
+            raise OSError("disk full")
+        return await real_put(self, key, content, content_type)
+
+    monkeypatch.setattr(LocalStorage, "put", failing_put)
+    report = (await client.post("/books/import", headers=auth_headers, files=files)).json()
+    assert report["status"] == "failed"
+    assert "disk full" in report["error"]
+    assert report["books_created"] == 2
+
+    monkeypatch.setattr(LocalStorage, "put", real_put)
+    resumed = (
+        await client.post("/books/import", headers=auth_headers, files=files, data={"job_id": report["job_id"]})
+    ).json()
+    assert resumed["status"] == "done"
+    assert resumed["rows_skipped"] == 2
+    assert resumed["books_created"] == 3
+    assert (await db_session.execute(select(func.count(Book.id)))).scalar() == 5
+    job = await db_session.get(ImportJob, report["job_id"])
+    await db_session.refresh(job)
+    assert job.books_created == 5
+
+    again = await client.post("/books/import", headers=auth_headers, files=files, data={"job_id": report["job_id"]})
+    assert again.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_unknown_format(client: AsyncClient, auth_headers: dict):
+    """Test metadata that is neither CSV nor NDJSON is refused up front."""
+    response = await client.post("/books/import", headers=auth_headers, files={"metadata": ("books.xlsx", b"x")})
+    assert response.status_code == 400
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth import hash_password
+from app.config import settings
+from app.models import Book, Borrow, User
+from benchmarks.contention import run as run_contention
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "secret")
+
+
+async def _reader(client: AsyncClient, db_session: AsyncSession, email: str) -> dict:
+    db_session.add(User(email=email, hashed_password=hash_password("testpassword")))
+    await db_session.commit()
+    response = await client.post("/auth/login", json={"email": email, "password": "testpassword"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.mark.asyncio
+async def test_copies_run_out_and_returns_go_to_the_hold_queue(
+    client: AsyncClient, db_session: AsyncSession, auth_headers: dict, test_book: Book
+):
+    """Test borrows stop at the number of copies and a returned copy is lent to the oldest hold."""
+    book_id = test_book.id  # failed requests roll back the shared session, expiring test_book
+    second, third = [await _reader(client, db_session, f"reader{i}@example.com") for i in (2, 3)]
+    assert (await client.put(f"/books/{book_id}/inventory", json={"total_copies": 2}, headers={**auth_headers, **ADMIN})).status_code == 200
+    assert (await client.post(f"/books/{book_id}/borrow", headers=auth_headers)).status_code == 200
+    assert (await client.post(f"/books/{book_id}/borrow", headers=second)).status_code == 200
+
+    response = await client.post(f"/books/{book_id}/borrow", headers=third)
+    assert response.status_code == 409
+    assert "hold" in response.json()["detail"]
+    assert (await client.post(f"/books/{book_id}/hold", headers=third)).json() == {"book_id": book_id, "position": 1}
+    availability = (await client.get(f"/books/{book_id}/availability", headers=third)).json()
+    assert availability == {
+        "book_id": book_id, "total_copies": 2, "available_copies": 0, "on_loan": 2, "holds": 1, "my_hold_position": 1,
+    }
+
+    assert (await client.post(f"/books/{book_id}/return", headers=auth_headers)).status_code == 200
+    availability = (await client.get(f"/books/{book_id}/availability")).json()
+    assert (availability["available_copies"], availability["on_loan"], availability["holds"]) == (0, 2, 0)
+    assert (await client.get(f"/books/{book_id}", headers=third)).json()["currently_borrowed_by_me"] is True
+
+    assert (await client.post(f"/books/{book_id}/return", headers=second)).status_code == 200
+    assert (await client.get(f"/books/{book_id}/availability")).json()["available_copies"] == 1
+
+
+@pytest.mark.asyncio
+async def test_hold_rules(client: AsyncClient, db_session: AsyncSession, auth_headers: dict, test_book: Book):
+    """Test holds are refused while a copy is free, for the borrower and twice; and can be cancelled."""
+    book_id = test_book.id  # failed requests roll back the shared session, expiring test_book
+    other = await _reader(client, db_session, "other@example.com")
+    assert (await client.post(f"/books/{book_id}/hold", headers=other)).status_code == 409
+    assert (await client.post(f"/books/{book_id}/borrow", headers=auth_headers)).status_code == 200
+    assert (await client.post(f"/books/{book_id}/hold", headers=auth_headers)).status_code == 400
+    assert (await client.post(f"/books/{book_id}/hold", headers=other)).status_code == 200
+    assert (await client.post(f"/books/{book_id}/hold", headers=other)).status_code == 409
+    assert (await client.delete(f"/books/{book_id}/hold", headers=other)).status_code == 200
+    assert (await client.delete(f"/books/{book_id}/hold", headers=other)).status_code == 404
+    assert (await client.post("/books/99999/hold", headers=other)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_setting_copies(client: AsyncClient, db_session: AsyncSession, auth_headers: dict, test_book: Book):
+    """Test only an admin sets copies, the total cannot drop below the loans out, and added copies go to holds."""
+    book_id = test_book.id  # failed requests roll back the shared session, expiring test_book
+    other = await _reader(client, db_session, "other@example.com")
+    await client.post(f"/books/{book_id}/borrow", headers=auth_headers)
+    await client.post(f"/books/{book_id}/hold", headers=other)
+    admin = {**auth_headers, **ADMIN}
+    assert (await client.put(f"/books/{book_id}/inventory", json={"total_copies": 3}, headers=auth_headers)).status_code == 403
+    assert (await client.put(f"/books/{book_id}/inventory", json={"total_copies": 0}, headers=admin)).status_code == 409
+    response = await client.put(f"/books/{book_id}/inventory", json={"total_copies": 3}, headers=admin)
+    assert response.status_code == 200
+    assert {k: response.json()[k] for k in ("total_copies", "available_copies", "on_loan", "holds")} == {
+        "total_copies": 3, "available_copies": 1, "on_loan": 2, "holds": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_one_active_loan_per_reader_is_enforced_by_the_database(
+    db_session: AsyncSession, test_user: User, test_book: Book, test_book_borrowed: Borrow
+):
+    """Test the partial unique index rejects a second active loan but not a new one after returning."""
+    user_id, book_id = test_user.id, test_book.id
+    db_session.add(Borrow(user_id=user_id, book_id=book_id))
+    with pytest.raises(IntegrityError):
+        await db_session.flush()
+    await db_session.rollback()
+    await db_session.execute(update(Borrow).values(returned_at=datetime.utcnow()))
+    db_session.add(Borrow(user_id=user_id, book_id=book_id))
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_borrow_stress_under_contention(tmp_path):
+    """Test concurrent readers never exceed the copies and simultaneous duplicate borrows yield one loan."""
+    report = await run_contention(
+        f"sqlite+aiosqlite:///{tmp_path / 'contention.db'}",
+        readers=12, copies=3, loans_per_reader=4, hold_ms=0.5, duplicate_attempts=8, create_tables=True,
+    )
+    assert report["invariants"] == {name: True for name in report["invariants"]}
+    assert report["borrows"] == 48
+    assert report["peak_on_loan"] <= 3
+    assert report["borrows_per_s"] > 0
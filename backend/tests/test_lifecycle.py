@@ -0,0 +1,75 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import book_vectors
+from app.deps import get_storage
+from app.lifecycle import StartupReport, startup, warm_up
+from app.models import Book
+
+
+@pytest.fixture
+def fresh_startup(monkeypatch, tmp_path):
+    """Start from a report of an app that has not warmed up, with storage under tmp_path."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "local_storage_path", str(tmp_path / "files"))
+    monkeypatch.setattr(startup, "complete", False)
+    monkeypatch.setattr(startup, "phases_ms", {})
+    monkeypatch.setattr(startup, "errors", {})
+    return startup
+
+
+def test_storage_is_shared_per_configuration(monkeypatch, tmp_path):
+    """Test get_storage returns one backend per configuration instead of a new one per call."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "local_storage_path", str(tmp_path / "a"))
+    first = get_storage()
+    assert get_storage() is first
+    monkeypatch.setattr(settings, "local_storage_path", str(tmp_path / "b"))
+    assert get_storage() is not first
+
+
+@pytest.mark.asyncio
+async def test_warm_up_times_phases_and_preloads_vectors(db_session: AsyncSession, fresh_startup: StartupReport):
+    """Test warm-up records every phase and leaves the book vectors built for the first request."""
+    db_session.add_all([Book(title="Dune", genre="Sci-Fi"), Book(title="Emma", genre="Romance")])
+    await db_session.commit()
+    report = await warm_up(db_session, fresh_startup)
+    assert report.complete
+    assert report.errors == {}
+    assert list(report.phases_ms) == ["database", "storage", "llm", "recommendations"]
+    assert report.total_ms >= 0
+    assert len(book_vectors._current) == 2
+
+
+@pytest.mark.asyncio
+async def test_ready_only_after_startup(client: AsyncClient, db_session: AsyncSession, fresh_startup: StartupReport):
+    """Test /health/ready is 503 until warm-up has run while /health answers throughout."""
+    assert (await client.get("/health")).status_code == 200
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"] == {"database": "ok", "storage": "ok"}
+
+    await warm_up(db_session, fresh_startup)
+    response = await client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert body["startup"]["complete"] is True
+    assert "database" in body["startup"]["phases_ms"]
+
+
+@pytest.mark.asyncio
+async def test_failed_phase_is_recorded(db_session: AsyncSession, fresh_startup: StartupReport, monkeypatch):
+    """Test a failing phase does not abort startup and shows up in the report."""
+    from app.storage.local import LocalStorage
+
+    async def unwritable(self):
+        raise OSError("read-only file system")
+
+    monkeypatch.setattr(LocalStorage, "check", unwritable)
+    report = await warm_up(db_session, fresh_startup)
+    assert report.complete
+    assert report.errors == {"storage": "read-only file system"}
@@ -80,3 +80,35 @@ async def test_mock_llm_suggest_books_similar_to():
     assert len(suggestions) <= 5
     assert all(isinstance(s, dict) for s in suggestions)
     assert all("title" in s and "author" in s for s in suggestions)
+
+
+@pytest.mark.asyncio
+async def test_mock_llm_suggest_books_by_genre_stream():
+    """Test default streaming replays the non-streaming suggestions."""
+    llm = MockLLM()
+    expected = await llm.suggest_books_by_genre(["Fantasy"], limit=3)
+    streamed = [s async for s in llm.suggest_books_by_genre_stream(["Fantasy"], limit=3)]
+    assert streamed == expected
+
+
+@pytest.mark.asyncio
+async def test_ollama_suggestions_stream_emits_each_line(monkeypatch):
+    """Test Ollama streaming yields a suggestion as soon as its line completes."""
+    from app.llm.ollama import OllamaLLM
+
+    fragments = ["1. Dune by Frank ", "Herbert (Sci-Fi)\nFoundation by", " Isaac Asimov (Sci-Fi)\n", "Neuromancer by William Gibson"]
+    consumed = []
+
+    async def fake_stream(self, prompt, system=""):
+        for fragment in fragments:
+            consumed.append(fragment)
+            yield fragment
+
+    monkeypatch.setattr(OllamaLLM, "_stream", fake_stream)
+    llm = OllamaLLM()
+    stream = llm.suggest_books_by_genre_stream(["Sci-Fi"], limit=2)
+    first = await stream.__anext__()
+    assert first == {"title": "Dune", "author": "Frank Herbert", "genre": "Sci-Fi"}
+    assert len(consumed) == 2
+    rest = [s async for s in stream]
+    assert [s["title"] for s in rest] == ["Foundation"]
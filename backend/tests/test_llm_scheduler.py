@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.deps import get_llm
+from app.llm.mock import MockLLM
+from app.llm.scheduler import LLMOverloadedError, LLMScheduler, Priority, ScheduledLLM
+from app.main import app
+
+
+class SlowLLM(MockLLM):
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.order: list[str] = []
+
+    async def summarize(self, text: str) -> str:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.order.append(text)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        return text
+
+
+@pytest.mark.asyncio
+async def test_scheduler_limits_concurrency():
+    """Test no more than max_concurrency calls run at once."""
+    backend = SlowLLM()
+    llm = ScheduledLLM(backend, LLMScheduler(max_concurrency=2, max_queue=10))
+    results = await asyncio.gather(*(llm.summarize(f"text {i}") for i in range(6)))
+    assert len(results) == 6
+    assert backend.max_running == 2
+
+
+@pytest.mark.asyncio
+async def test_scheduler_serves_interactive_before_background():
+    """Test queued interactive calls jump ahead of queued background calls."""
+    backend = SlowLLM()
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=10)
+    interactive = ScheduledLLM(backend, scheduler, Priority.INTERACTIVE)
+    background = ScheduledLLM(backend, scheduler, Priority.BACKGROUND)
+
+    first = asyncio.create_task(background.summarize("bg-0"))
+    await asyncio.sleep(0)
+    queued = [asyncio.create_task(background.summarize("bg-1")), asyncio.create_task(interactive.summarize("fg"))]
+    await asyncio.gather(first, *queued)
+    assert backend.order == ["bg-0", "fg", "bg-1"]
+
+
+@pytest.mark.asyncio
+async def test_scheduler_sheds_load_when_queue_full():
+    """Test calls beyond the queue bound are rejected and counted."""
+    backend = SlowLLM()
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=1)
+    llm = ScheduledLLM(backend, scheduler)
+    results = await asyncio.gather(*(llm.summarize(str(i)) for i in range(3)), return_exceptions=True)
+    assert sum(isinstance(r, LLMOverloadedError) for r in results) == 1
+    snapshot = scheduler.snapshot()
+    assert snapshot["priorities"]["interactive"]["rejected"] == 1
+    assert snapshot["priorities"]["interactive"]["admitted"] == 2
+    assert snapshot["active"] == 0 and snapshot["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_queue_timeout_releases_slot():
+    """Test a waiter that times out does not leak its slot."""
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=5, queue_timeout=0.01)
+    async with scheduler.slot():
+        with pytest.raises(LLMOverloadedError):
+            async with scheduler.slot():
+                pass
+    async with scheduler.slot():
+        assert scheduler.snapshot()["active"] == 1
+    assert scheduler.snapshot()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_scheduler_never_sheds_background_calls():
+    """Test background calls wait past the queue bound and timeout, and do not use up the interactive bound."""
+    backend = SlowLLM()
+    scheduler = LLMScheduler(max_concurrency=1, max_queue=1, queue_timeout=0.025)
+    background = ScheduledLLM(backend, scheduler, Priority.BACKGROUND)
+    interactive = ScheduledLLM(backend, scheduler)
+    jobs = [asyncio.create_task(background.summarize(f"bg-{i}")) for i in range(4)]
+    await asyncio.sleep(0)
+    assert scheduler.snapshot()["priorities"]["background"]["queued"] == 3
+    calls = await asyncio.gather(*(interactive.summarize(f"fg-{i}") for i in range(2)), return_exceptions=True)
+    assert [isinstance(r, LLMOverloadedError) for r in calls] == [False, True]  # fg-1 exceeds max_queue
+    assert await asyncio.gather(*jobs) == [f"bg-{i}" for i in range(4)]  # all waited well past the timeout
+    snapshot = scheduler.snapshot()
+    assert snapshot["priorities"]["background"]["rejected"] == 0
+    assert snapshot["queued"] == 0 and snapshot["priorities"]["background"]["queued"] == 0
+
+
+@pytest.mark.asyncio
+async def test_overloaded_llm_returns_503(client: AsyncClient, auth_headers: dict, test_book):
+    """Test load shedding surfaces as 503 with Retry-After."""
+    class OverloadedLLM(MockLLM):
+        async def suggest_books_similar_to(self, *args, **kwargs):
+            raise LLMOverloadedError("LLM is busy", retry_after=7)
+
+    app.dependency_overrides[get_llm] = lambda: OverloadedLLM()
+    response = await client.get(f"/recommendations/suggestions/similar/{test_book.id}", headers=auth_headers)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "7"
+
+
+@pytest.mark.asyncio
+async def test_health_llm(client: AsyncClient):
+    """Test scheduler metrics endpoint."""
+    response = await client.get("/health/llm")
+    assert response.status_code == 200
+    data = response.json()
+    assert "queued" in data
+    assert set(data["priorities"]) == {"interactive", "background"}
@@ -0,0 +1,90 @@
+import json
+
+import httpx
+import pytest
+
+from benchmarks.llm_stub import StubConfig, _Request, create_stub_app
+
+FAST = StubConfig(ttft=0.0, token_rate=0.0)
+
+
+def _client(config: StubConfig = FAST) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=create_stub_app(config)), base_url="http://stub")
+
+
+@pytest.mark.asyncio
+async def test_stub_ollama_generate_streams_ndjson():
+    """Test the stub speaks the Ollama NDJSON protocol with a final done message."""
+    async with _client() as client:
+        r = await client.post("/api/generate", json={"model": "llama3.2", "prompt": "Summarize this book content"})
+    assert r.status_code == 200
+    lines = [json.loads(line) for line in r.text.splitlines() if line]
+    assert all(not d["done"] for d in lines[:-1])
+    assert lines[-1]["done"] is True
+    assert "".join(d["response"] for d in lines).strip()
+
+
+@pytest.mark.asyncio
+async def test_stub_is_deterministic():
+    """Test the same prompt and seed produce the same reply."""
+    body = {"prompt": "Suggest 3 well-known books. Reply in this exact format: Title by Author (Genre)", "stream": False}
+    async with _client() as client:
+        first = (await client.post("/api/generate", json=body)).json()["response"]
+        second = (await client.post("/api/generate", json=body)).json()["response"]
+    assert first == second
+    assert len(first.splitlines()) == 3
+
+
+@pytest.mark.asyncio
+async def test_stub_openai_chat_completions():
+    """Test the stub speaks the OpenAI chat completions API, streaming and not."""
+    body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hello"}]}
+    async with _client() as client:
+        plain = (await client.post("/v1/chat/completions", json=body)).json()
+        streamed = await client.post("/v1/chat/completions", json={**body, "stream": True})
+    assert plain["choices"][0]["message"]["content"]
+    events = [e[len("data: "):] for e in streamed.text.split("\n\n") if e]
+    assert events[-1] == "[DONE]"
+    content = "".join(json.loads(e)["choices"][0]["delta"].get("content") or "" for e in events[:-1])
+    assert content == plain["choices"][0]["message"]["content"]
+
+
+@pytest.mark.asyncio
+async def test_stub_error_injection():
+    """Test error_rate=1 fails every request with the configured status."""
+    async with _client(StubConfig(ttft=0.0, error_rate=1.0, error_status=503)) as client:
+        r = await client.post("/api/generate", json={"prompt": "x"})
+    assert r.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_stub_errors_and_tails_vary_per_request():
+    """Test the same prompt repeated fails and hits the tail at about the configured rates, with the same reply."""
+    config = StubConfig(ttft=0.0, tail_ttft=0.0, token_rate=0.0, error_rate=0.3, tail_prob=0.3, seed=7)
+    body = {"prompt": "Summarize this book content", "stream": False}
+    async with _client(config) as client:
+        responses = [await client.post("/api/generate", json=body) for _ in range(400)]
+    failed = sum(r.status_code == 500 for r in responses)
+    assert 0.22 < failed / len(responses) < 0.38
+    assert len({r.json()["response"] for r in responses if r.status_code == 200}) == 1
+
+    tailed = StubConfig(ttft=0.1, tail_ttft=2.0, tail_prob=0.3, seed=7)
+    plans = [_Request(tailed, "same prompt", n) for n in range(400)]
+    assert 0.22 < sum(p.ttft == 2.0 for p in plans) / len(plans) < 0.38
+
+
+@pytest.mark.asyncio
+async def test_ollama_llm_against_stub(monkeypatch):
+    """Test OllamaLLM parses suggestions from the stub over its real HTTP path."""
+    from app.llm import ollama
+
+    stub = create_stub_app(FAST)
+
+    class StubClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.ASGITransport(app=stub), **kwargs)
+
+    monkeypatch.setattr(ollama.httpx, "AsyncClient", StubClient)
+    suggestions = await ollama.OllamaLLM().suggest_books_by_genre(["Sci-Fi"], limit=4)
+    assert len(suggestions) == 4
+    assert all(s["title"] and s["author"] for s in suggestions)
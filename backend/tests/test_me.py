@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, Borrow, Review, User
+from app.query_budget import count_queries
+
+T0 = datetime(2025, 3, 1, 12, 0)
+
+
+@pytest.fixture
+async def history(db_session: AsyncSession, test_user: User, test_user2: User) -> list[int]:
+    """Seven borrows by test_user, two still active, two sharing a timestamp; plus one by someone else."""
+    books = [Book(title=f"Book {i}", genre="Fiction") for i in range(7)]
+    db_session.add_all(books)
+    await db_session.commit()
+    times = [T0 + timedelta(days=i) for i in range(6)] + [T0 + timedelta(days=5)]
+    for i, (book, at) in enumerate(zip(books, times)):
+        returned = None if i in (2, 6) else at + timedelta(days=3)
+        db_session.add(Borrow(user_id=test_user.id, book_id=book.id, borrowed_at=at, returned_at=returned))
+        if returned:
+            db_session.add(Review(user_id=test_user.id, book_id=book.id, rating=1 + i % 5, created_at=returned))
+    db_session.add(Borrow(user_id=test_user2.id, book_id=books[0].id, borrowed_at=T0))
+    await db_session.commit()
+    return [b.id for b in books]
+
+
+async def _all_pages(client: AsyncClient, path: str, headers: dict, **params) -> list[dict]:
+    items, cursor = [], None
+    while True:
+        page = (await client.get(path, headers=headers, params={**params, **({"cursor": cursor} if cursor else {})})).json()
+        items += page["items"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+@pytest.mark.asyncio
+async def test_my_borrows_pages_newest_first(client: AsyncClient, auth_headers: dict, history: list[int]):
+    """Test keyset pages cover every borrow once, newest first, ties broken by id, with book metadata."""
+    items = await _all_pages(client, "/me/borrows", auth_headers, limit=2)
+    assert len(items) == 7
+    keys = [(item["borrowed_at"], item["id"]) for item in items]
+    assert keys == sorted(keys, reverse=True)
+    assert items[0]["book"]["id"] == history[6] and items[1]["book"]["id"] == history[5]  # same time, higher id first
+    assert items[0]["book"]["title"] == "Book 6" and items[0]["returned_at"] is None
+
+    active = await _all_pages(client, "/me/borrows", auth_headers, active="true")
+    assert [item["book"]["id"] for item in active] == [history[6], history[2]]
+    returned = await _all_pages(client, "/me/borrows", auth_headers, active="false", limit=3)
+    assert len(returned) == 5 and all(item["returned_at"] for item in returned)
+
+
+@pytest.mark.asyncio
+async def test_my_reviews_pages_with_books(client: AsyncClient, auth_headers: dict, history: list[int]):
+    """Test reviews come back newest first with their books and rating stats."""
+    items = await _all_pages(client, "/me/reviews", auth_headers, limit=2)
+    assert [item["book"]["id"] for item in items] == [history[i] for i in (5, 4, 3, 1, 0)]
+    assert items[0]["rating"] == 1 and items[0]["book"]["genre"] == "Fiction"
+
+
+@pytest.mark.asyncio
+async def test_history_page_is_one_query(client: AsyncClient, auth_headers: dict, history: list[int]):
+    """Test a full page with books costs the user lookup plus one joined query, however many rows."""
+    with count_queries() as log:
+        page = (await client.get("/me/borrows", headers=auth_headers)).json()
+    assert len(page["items"]) == 7
+    assert log.count == 2
+    assert "JOIN books" in log.statements[1]
+
+
+@pytest.mark.asyncio
+async def test_history_requires_auth_and_valid_cursor(client: AsyncClient, auth_headers: dict):
+    """Test anonymous requests are refused and a garbled cursor is a 400."""
+    assert (await client.get("/me/borrows")).status_code in (401, 403)
+    assert (await client.get("/me/reviews", headers=auth_headers, params={"cursor": "nope"})).status_code == 400
@@ -0,0 +1,129 @@
+from io import BytesIO
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.llm.base import LLMBackend
+from app.llm.mock import MockLLM
+from app.llm.scheduler import LLMScheduler, ScheduledLLM
+from app.models import Book
+from app.storage.instrumented import InstrumentedStorage
+from app.storage.local import LocalStorage
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    metrics.clear()
+    yield
+    metrics.clear()
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the text format: cumulative buckets ending in +Inf, then sum and count."""
+    histogram = metrics.Histogram("test_seconds", "Test.", ("route",), buckets=(0.1, 1.0))
+    try:
+        histogram.observe(0.05, "/a")
+        histogram.observe(0.5, "/a")
+        histogram.observe(5, "/a")
+        lines = histogram.render().splitlines()
+    finally:
+        metrics._registry.remove(histogram)
+    assert lines == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{route="/a",le="0.1"} 1',
+        'test_seconds_bucket{route="/a",le="1"} 2',
+        'test_seconds_bucket{route="/a",le="+Inf"} 3',
+        'test_seconds_sum{route="/a"} 5.55',
+        'test_seconds_count{route="/a"} 3',
+    ]
+
+
+def test_metric_kinds_must_render_and_clear():
+    """Test a metric class missing samples() or clear() fails when created, not at the first scrape."""
+
+    class Incomplete(metrics._Metric):
+        kind = "gauge"
+
+        def samples(self) -> list[str]:
+            return []
+
+    size = len(metrics._registry)
+    with pytest.raises(TypeError, match="clear"):
+        Incomplete("test_incomplete", "Test.")
+    assert len(metrics._registry) == size
+
+
+@pytest.mark.asyncio
+async def test_requests_timed_per_route_template(client: AsyncClient, db_session: AsyncSession):
+    """Test requests are labelled by route template and charged with the queries they ran."""
+    metrics.instrument_engine(db_session.bind)
+    book = Book(title="Dune", genre="Sci-Fi")
+    db_session.add(book)
+    await db_session.commit()
+    book_id = book.id
+    metrics.clear()
+
+    assert (await client.get(f"/books/{book_id}")).status_code == 200
+    assert (await client.get("/books/999999")).status_code == 404
+    assert (await client.get("/no/such/path")).status_code == 404
+
+    assert metrics.REQUESTS.value("GET", "/books/{book_id}", "200") == 1
+    assert metrics.REQUESTS.value("GET", "/books/{book_id}", "404") == 1
+    assert metrics.REQUESTS.value("GET", "unmatched", "404") == 1
+    assert metrics.REQUEST_LATENCY.count("GET", "/books/{book_id}") == 2
+    assert metrics.REQUEST_QUERIES.count("/books/{book_id}") == 2
+    assert metrics.REQUEST_QUERIES.sum("/books/{book_id}") >= 2
+    assert metrics.DB_QUERY_LATENCY.count() >= 2
+    assert metrics.IN_FLIGHT.value("GET") == 0
+
+    body = (await client.get("/metrics")).text
+    assert 'http_requests_total{method="GET",route="/books/{book_id}",status="200"} 1' in body
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert "llm_calls_queued 0" in body
+
+
+class _FailingLLM(MockLLM):
+    async def summarize(self, text: str) -> str:
+        raise RuntimeError("model crashed")
+
+
+class _SwallowingLLM(MockLLM):
+    async def analyze_sentiment(self, reviews: list[str]) -> str:
+        metrics.note_llm_failure()
+        return ""
+
+
+@pytest.mark.asyncio
+async def test_llm_calls_timed_per_backend_and_method():
+    """Test scheduled LLM calls record latency and count raised and swallowed failures as errors."""
+    scheduler = LLMScheduler()
+    await ScheduledLLM(MockLLM(), scheduler).summarize("A long enough text to summarise.")
+    assert metrics.LLM_LATENCY.count("mock", "summarize") == 1
+    assert metrics.LLM_ERRORS.value("mock", "summarize") == 0
+
+    failing: LLMBackend = ScheduledLLM(_FailingLLM(), scheduler)
+    with pytest.raises(RuntimeError):
+        await failing.summarize("text")
+    assert metrics.LLM_ERRORS.value("_failing", "summarize") == 1
+
+    await ScheduledLLM(_SwallowingLLM(), scheduler).analyze_sentiment(["fine"])
+    assert metrics.LLM_ERRORS.value("_swallowing", "analyze_sentiment") == 1
+    metrics.note_llm_failure()  # outside a call: ignored
+    assert metrics.LLM_ERRORS.value("_swallowing", "analyze_sentiment") == 1
+
+
+@pytest.mark.asyncio
+async def test_storage_operations_timed(tmp_path):
+    """Test the storage decorator times each operation and counts the ones that raise."""
+    storage = InstrumentedStorage(LocalStorage(str(tmp_path)))
+    await storage.put("a.txt", BytesIO(b"hello"))
+    assert await storage.get("a.txt") == b"hello"
+    assert await storage.delete("a.txt")
+    with pytest.raises(IsADirectoryError):
+        await storage.put("", BytesIO(b"x"))
+    assert metrics.STORAGE_LATENCY.count("local", "put") == 2
+    assert metrics.STORAGE_LATENCY.count("local", "get") == 1
+    assert metrics.STORAGE_ERRORS.value("local", "put") == 1
@@ -0,0 +1,91 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import profiling
+from app.models import Book, Borrow, User
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def profiled(monkeypatch, db_session: AsyncSession):
+    """Profiling on for every request slower than 1 microsecond, with an admin token and an empty buffer."""
+    from app.config import settings
+
+    profiling.instrument_engine(db_session.bind)
+    monkeypatch.setattr(settings, "profile_slow_ms", 0.001)
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    profiling.profiles.clear()
+    yield settings
+    profiling.profiles.clear()
+
+
+def test_fingerprint_groups_queries_by_shape():
+    """Test literals, placeholders and IN-lists are normalised away."""
+    a = profiling.fingerprint("SELECT * FROM books WHERE id IN ($1, $2, $3) AND title = 'x'  LIMIT 10")
+    b = profiling.fingerprint("SELECT * FROM books WHERE id IN (?, ?) AND title = 'it''s' LIMIT 5")
+    assert a == b == "SELECT * FROM books WHERE id IN (?...) AND title = ? LIMIT ?"
+    assert profiling.fingerprint("SELECT rating_1 FROM book_stats") == "SELECT rating_1 FROM book_stats"
+
+
+def test_span_is_noop_without_trace():
+    """Test spans outside a profiled request record nothing and do not fail."""
+    assert profiling.current_trace() is None
+    with profiling.span("ml", "anything"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_slow_recommendations_request_is_captured(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, test_user: User, profiled
+):
+    """Test a slow request keeps its DB, ML and stage spans and is listed by the admin endpoint."""
+    books = [Book(title=f"Space opera {i}", genre="Sci-Fi", summary="stars and ships") for i in range(3)]
+    db_session.add_all(books)
+    await db_session.commit()
+    db_session.add(Borrow(user_id=test_user.id, book_id=books[0].id))
+    await db_session.commit()
+    profiling.profiles.clear()
+
+    assert (await client.get("/recommendations", headers=auth_headers)).status_code == 200
+    listing = (await client.get("/admin/profiles", headers=ADMIN)).json()
+    assert listing["enabled"] is True
+    summary = next(p for p in listing["profiles"] if p["route"] == "/recommendations")
+    assert summary["reason"] == "slow"
+    assert "db" in summary["time_by_kind_ms"] and "ml" in summary["time_by_kind_ms"]
+
+    profile = (await client.get(f"/admin/profiles/{summary['id']}", headers=ADMIN)).json()
+    ml_stages = [s["name"] for s in profile["spans"] if s["kind"] == "ml"]
+    assert {"preference", "collaborative", "book_vectors", "tfidf_fit", "content", "blend"} <= set(ml_stages)
+    assert any(q["fingerprint"].startswith("SELECT") and q["count"] >= 1 for q in profile["queries"])
+    assert profile["cpu_profile"] is None
+
+    assert (await client.delete("/admin/profiles", headers=ADMIN)).status_code == 204
+    assert (await client.get(f"/admin/profiles/{summary['id']}", headers=ADMIN)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_sampled_request_gets_cpu_profile(client: AsyncClient, profiled, monkeypatch):
+    """Test sampled requests carry collapsed CPU stacks when PROFILE_CPU is on."""
+    monkeypatch.setattr(profiled, "profile_slow_ms", 0.0)
+    monkeypatch.setattr(profiled, "profile_sample_rate", 1.0)
+    monkeypatch.setattr(profiled, "profile_cpu", True)
+    monkeypatch.setattr(profiled, "profile_cpu_interval_ms", 0.5)
+    await client.get("/books")
+    profile = profiling.profiles.list()[0]
+    assert profile["reason"] == "sampled"
+    assert isinstance(profile["cpu_profile"], list)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in profile["cpu_profile"])
+
+
+@pytest.mark.asyncio
+async def test_admin_requires_configured_token(client: AsyncClient, monkeypatch):
+    """Test admin endpoints are closed without ADMIN_TOKEN and with a wrong header."""
+    from app.config import settings
+
+    assert (await client.get("/admin/profiles", headers=ADMIN)).status_code == 403
+    monkeypatch.setattr(settings, "admin_token", "secret")
+    assert (await client.get("/admin/profiles", headers={"X-Admin-Token": "guess"})).status_code == 403
+    assert (await client.get("/admin/profiles")).status_code == 403
+    assert (await client.get("/admin/profiles", headers=ADMIN)).status_code == 200
@@ -0,0 +1,88 @@
+import logging
+
+import pytest
+from fastapi.routing import APIRoute
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import query_budget
+from app.main import app
+from app.models import Book, Borrow, Review, User
+from app.query_budget import QueryBudgetExceededError, QueryLog, assert_max_queries, count_queries
+from app.routers import books
+
+
+def test_every_router_endpoint_declares_a_budget():
+    """Test each route from app/routers carries @query_budget, so none goes unchecked by accident."""
+    routes = [r for r in app.routes if isinstance(r, APIRoute) and r.endpoint.__module__.startswith("app.routers.")]
+    assert len(routes) > 30
+    missing = [r.path for r in routes if query_budget.route_budget(r) is query_budget._UNDECLARED]
+    assert missing == []
+
+
+@pytest.mark.asyncio
+async def test_count_queries_and_assert_max_queries(db_session: AsyncSession, test_book: Book):
+    """Test statements are counted per block, nested blocks included, and overruns raise."""
+    with count_queries() as outer:
+        with assert_max_queries(1) as inner:
+            await db_session.execute(select(Book))
+        await db_session.execute(select(Book.id))
+    assert (inner.count, outer.count) == (1, 2)
+    with pytest.raises(QueryBudgetExceededError, match="2 queries, budget 1"):
+        with assert_max_queries(1):
+            await db_session.execute(select(Book))
+            await db_session.execute(select(Book))
+
+
+def test_repeated_statements_are_reported_as_n_plus_one():
+    """Test one statement shape run per row is flagged whatever its parameters."""
+    log = QueryLog([f"SELECT * FROM reviews WHERE book_id = {i}" for i in range(12)] + ["SELECT * FROM books"])
+    assert log.repeated(10) == {"SELECT * FROM reviews WHERE book_id = ?": 12}
+    problem = query_budget.check(log, 20, "GET /books")
+    assert "N+1" in problem and "ran 13 queries" not in problem
+    assert "ran 13 queries, budget 5" in query_budget.check(log, 5, "GET /books")
+
+
+def test_short_requests_skip_fingerprinting(monkeypatch):
+    """Test a request with fewer queries than the repeat threshold is not fingerprinted at all."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "query_repeat_threshold", 10)
+    monkeypatch.setattr(query_budget, "fingerprint", lambda sql: pytest.fail("fingerprinted"))
+    assert query_budget.check(QueryLog(["SELECT 1"] * 9), 20, "GET /books") is None
+
+
+@pytest.mark.asyncio
+async def test_request_over_budget_raises_in_tests_and_logs_in_production(
+    client: AsyncClient, test_book: Book, monkeypatch, caplog
+):
+    """Test the middleware fails an over-budget request in raise mode and only warns in log mode."""
+    from app.config import settings
+
+    monkeypatch.setattr(books.list_books, "__query_budget__", 0)
+    with pytest.raises(QueryBudgetExceededError, match="GET /books ran"):
+        await client.get("/books")
+    monkeypatch.setattr(settings, "query_budget_mode", "log")
+    with caplog.at_level(logging.WARNING, logger="app.query_budget"):
+        assert (await client.get("/books", params={"limit": 5})).status_code == 200
+    assert "GET /books ran" in caplog.text and "budget 0" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_catalogue_routes_do_not_grow_with_rows(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, test_user: User, test_user2: User
+):
+    """Test listing, detail and recommendations stay within budget with many books, borrows and reviews."""
+    shelf = [Book(title=f"Book {i}", author=f"Author {i}", genre="Fiction", summary="a quiet story") for i in range(25)]
+    db_session.add_all(shelf)
+    await db_session.commit()
+    for book in shelf:
+        for user in (test_user, test_user2):
+            db_session.add(Borrow(user_id=user.id, book_id=book.id))
+            db_session.add(Review(user_id=user.id, book_id=book.id, rating=4, text="good"))
+    await db_session.commit()
+
+    # The autouse raise mode fails any of these that goes over its budget or loops per row
+    for path in ("/books", f"/books/{shelf[0].id}", "/recommendations", f"/recommendations/similar/{shelf[0].id}"):
+        assert (await client.get(path, headers=auth_headers)).status_code == 200
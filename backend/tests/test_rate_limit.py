@@ -0,0 +1,94 @@
+import pytest
+from httpx import AsyncClient
+from pydantic import ValidationError
+
+from app import rate_limit
+from app.config import Settings, settings
+from app.metrics import RATE_LIMITED
+from app.rate_limit import MemoryBucketStore, SharedBucketStore
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    """A small bucket refilling at one token every two seconds."""
+    monkeypatch.setattr(settings, "rate_limit_burst", 3.0)
+    monkeypatch.setattr(settings, "rate_limit_per_second", 0.5)
+
+
+@pytest.mark.asyncio
+async def test_burst_then_429_with_retry_after(client: AsyncClient, limits):
+    """Test a client gets its burst, then 429s saying when to retry, while free routes still answer."""
+    assert [(await client.get("/books")).status_code for _ in range(3)] == [200, 200, 200]
+    response = await client.get("/books")
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2"
+    assert (await client.get("/health")).status_code == 200
+    assert RATE_LIMITED.value("/books", "rate") >= 1
+
+
+@pytest.mark.asyncio
+async def test_buckets_are_per_user_and_costed_per_route(client: AsyncClient, auth_headers: dict, monkeypatch):
+    """Test a signed-in user has their own bucket and an LLM route spends more of it than a plain one."""
+    monkeypatch.setattr(settings, "rate_limit_burst", 12.0)
+    monkeypatch.setattr(settings, "rate_limit_per_second", 0.01)
+    assert (await client.get("/recommendations/suggestions", headers=auth_headers)).status_code == 200
+    assert (await client.get("/recommendations/suggestions", headers=auth_headers)).status_code == 429
+    assert (await client.get("/books", headers=auth_headers)).status_code == 200  # 2 tokens left, this costs 1
+    assert (await client.get("/books")).status_code == 200  # anonymous: the address's bucket
+
+
+@pytest.mark.asyncio
+async def test_expensive_routes_share_a_concurrency_cap(client: AsyncClient, auth_headers: dict, monkeypatch):
+    """Test expensive routes are refused at once with 503 while the cap is taken, and cheap ones are not."""
+    monkeypatch.setattr(settings, "expensive_max_concurrency", 2)
+    monkeypatch.setattr(rate_limit.expensive_gate, "in_flight", 2)
+    response = await client.get("/recommendations/suggestions", headers=auth_headers)
+    assert response.status_code == 503 and response.headers["retry-after"] == "1"
+    assert (await client.get("/books")).status_code == 200
+    rate_limit.expensive_gate.in_flight = 1
+    assert (await client.get("/recommendations/suggestions", headers=auth_headers)).status_code == 200
+    assert rate_limit.expensive_gate.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_limiter_admits_everything(client: AsyncClient, limits, monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_enabled", False)
+    assert [(await client.get("/books")).status_code for _ in range(5)] == [200] * 5
+
+
+def test_memory_bucket_refills_over_time(monkeypatch):
+    """Test tokens come back at the rate, up to the burst, and refusals spend nothing."""
+    now = [100.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    store = MemoryBucketStore()
+    assert [store.take("a", 1, rate=2, burst=2) for _ in range(3)] == [0, 0, 0.5]
+    now[0] += 0.25
+    assert store.take("a", 1, rate=2, burst=2) == 0.25
+    now[0] += 0.25
+    assert store.take("a", 1, rate=2, burst=2) == 0
+    now[0] += 60
+    assert [store.take("a", 1, rate=2, burst=2) for _ in range(3)] == [0, 0, 0.5]
+
+
+def test_memory_store_forgets_least_recent_clients():
+    store = MemoryBucketStore(max_keys=2)
+    for key in ("a", "b", "a", "c"):
+        store.take(key, 1, rate=1, burst=1)
+    assert store.take("a", 1, rate=1, burst=1) > 0  # kept: seen more recently than b
+    assert store.take("b", 1, rate=1, burst=1) == 0  # dropped, back to a full bucket
+
+
+def test_shared_store_is_one_bucket_across_processes(tmp_path):
+    """Test two stores on the same file, as two workers would open it, spend from one bucket."""
+    path = str(tmp_path / "limits" / "rate-limits.bin")
+    worker1, worker2 = SharedBucketStore(path, slots=64), SharedBucketStore(path, slots=64)
+    assert worker1.take("user:1", 2, rate=0.001, burst=3) == 0
+    assert worker2.take("user:1", 2, rate=0.001, burst=3) > 0
+    assert worker2.take("user:1", 1, rate=0.001, burst=3) == 0
+    assert worker1.take("user:2", 3, rate=0.001, burst=3) == 0
+
+
+def test_refill_rate_must_be_positive():
+    """Test a zero refill rate is refused at startup; every bucket would divide by it."""
+    with pytest.raises(ValidationError, match="rate_limit_per_second"):
+        Settings(rate_limit_per_second=0)
@@ -1,11 +1,8 @@
 import pytest
-from app.recommendation_ml import (
-    similar_books,
-    collaborative_scores,
-    content_similarity_to_user_books,
-    build_book_matrix,
-)
+
+from app.book_vectors import BookVectors, _build
 from app.models import Book
+from app.recommendation_ml import collaborative_scores
 
 
 @pytest.fixture
@@ -19,21 +16,20 @@ def sample_books():
     ]
 
 
-def test_build_book_matrix(sample_books):
-    """Test building TF-IDF matrix from books."""
-    ids, matrix = build_book_matrix(sample_books)
-    assert len(ids) == len(sample_books)
-    assert matrix is not None
-    assert matrix.shape[0] == len(sample_books)
+def test_build_book_vectors(sample_books):
+    """Test building the TF-IDF vectors of the books."""
+    vectors = BookVectors.from_arrays(1, _build(sample_books))
+    assert len(vectors) == len(sample_books)
+    assert vectors.matrix.shape[0] == len(sample_books)
 
 
 def test_similar_books(sample_books):
     """Test finding similar books."""
-    similar = similar_books(sample_books, book_id=1, limit=3)
+    similar = BookVectors.from_arrays(1, _build(sample_books)).similar(1, limit=3)
     assert isinstance(similar, list)
     assert len(similar) <= 3
     # Should not include the book itself
-    similar_ids = [b.id for b, _ in similar]
+    similar_ids = [book_id for book_id, _ in similar]
     assert 1 not in similar_ids
 
 
@@ -60,8 +56,7 @@ def test_collaborative_scores():
 def test_content_similarity_to_user_books(sample_books):
     """Test content similarity scoring."""
     borrowed_ids = {1, 3}
-    ids, X = build_book_matrix(sample_books)
-    scores = content_similarity_to_user_books(sample_books, borrowed_ids, X)
+    scores = BookVectors.from_arrays(1, _build(sample_books)).similarity_to(borrowed_ids)
     assert isinstance(scores, dict)
     # Books similar to borrowed books should have higher scores
     assert len(scores) > 0
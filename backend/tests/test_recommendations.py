@@ -177,3 +177,25 @@ async def test_get_ai_suggestions_similar_to_book_not_found(client: AsyncClient,
         headers=auth_headers
     )
     assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_stream_ai_suggestions(client: AsyncClient, auth_headers: dict, db_session: AsyncSession, test_user):
+    """Test AI suggestions streamed as Server-Sent Events."""
+    pref = UserPreference(user_id=test_user.id, genre="Fantasy", weight=1.0)
+    db_session.add(pref)
+    await db_session.commit()
+
+    response = await client.get("/recommendations/suggestions/stream?limit=2", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert [e.split("\n")[0] for e in events] == ["event: suggestion", "event: suggestion", "event: done"]
+    assert '"count": 2' in events[-1]
+
+
+@pytest.mark.asyncio
+async def test_stream_ai_suggestions_similar_to_book_not_found(client: AsyncClient, auth_headers: dict):
+    """Test streaming similar suggestions for non-existent book."""
+    response = await client.get("/recommendations/suggestions/similar/99999/stream", headers=auth_headers)
+    assert response.status_code == 404
@@ -0,0 +1,110 @@
+from datetime import datetime
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.cursor import decode_cursor, encode_cursor
+from app.models import Book, User
+from app.search import InMemorySearchIndex
+
+
+@pytest.fixture
+async def catalog(db_session: AsyncSession, test_user: User) -> list[Book]:
+    books = [
+        Book(title="The Hobbit", author="J.R.R. Tolkien", genre="Fantasy", summary="A hobbit goes on a journey."),
+        Book(title="Dragon Tales", author="Anne Author", genre="Fantasy", summary="Hobbits and dragons."),
+        Book(title="Journey Home", author="Tolkien Scholar", genre="Biography", summary="A life."),
+        Book(title="Cooking Basics", author="Chef", genre="Cooking", summary=None),
+    ]
+    db_session.add_all(books)
+    await db_session.commit()
+    return books
+
+
+def test_index_ranks_title_over_summary_and_matches_prefixes():
+    """Test title matches outrank summary matches and terms match as prefixes."""
+    index = InMemorySearchIndex()
+    index.add(1, "Dragon Tales", None, None, "a hobbit story")
+    index.add(2, "The Hobbit", None, None, None)
+    assert [book_id for book_id, _ in index.search(["hob"])] == [2, 1]
+    assert index.search(["hob", "dragon"])[0][0] == 1
+    assert index.search(["missing"]) == []
+
+
+def test_index_remove_and_reindex():
+    """Test removed and re-added documents leave no stale postings."""
+    index = InMemorySearchIndex()
+    index.add(1, "Old Title", None, None, None)
+    index.add(1, "New Title", None, None, None)
+    assert index.search(["old"]) == []
+    index.remove(1)
+    assert index.search(["new"]) == []
+    assert len(index) == 0
+
+
+def test_cursor_round_trip():
+    """Test cursors decode to what was encoded, ranks and timestamps alike, and garbage is rejected."""
+    assert decode_cursor(encode_cursor(0.123456, 42), float) == (0.123456, 42)
+    at = datetime(2025, 3, 8, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(at, 7), datetime.fromisoformat) == (at, 7)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor", float)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(0.5, 1), datetime.fromisoformat)
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_ranked(client: AsyncClient, catalog: list[Book]):
+    """Test search returns ranked hits with their rank."""
+    response = await client.get("/books/search", params={"q": "hobbit"})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [i["title"] for i in items] == ["The Hobbit", "Dragon Tales"]
+    assert items[0]["rank"] > items[1]["rank"]
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_filters(client: AsyncClient, catalog: list[Book]):
+    """Test genre and author filters narrow the results."""
+    response = await client.get("/books/search", params={"q": "journey", "genre": "biography"})
+    assert [i["title"] for i in response.json()["items"]] == ["Journey Home"]
+    response = await client.get("/books/search", params={"q": "hob", "author": "tolkien"})
+    assert [i["title"] for i in response.json()["items"]] == ["The Hobbit"]
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_keyset_pagination(client: AsyncClient, db_session: AsyncSession, test_user: User):
+    """Test paging with the cursor visits every hit exactly once."""
+    db_session.add_all([Book(title=f"Saga part {i}", genre="Fantasy") for i in range(5)])
+    await db_session.commit()
+    seen, cursor = [], None
+    while True:
+        params = {"q": "saga", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        data = (await client.get("/books/search", params=params)).json()
+        seen += [i["id"] for i in data["items"]]
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_sees_updates(client: AsyncClient, auth_headers: dict, catalog: list[Book]):
+    """Test edits and deletes are reflected in later searches."""
+    book = catalog[3]
+    await client.put(f"/books/{book.id}", headers=auth_headers, json={"title": "Baking Bread"})
+    response = await client.get("/books/search", params={"q": "baking"})
+    assert [i["id"] for i in response.json()["items"]] == [book.id]
+    await client.delete(f"/books/{book.id}", headers=auth_headers)
+    response = await client.get("/books/search", params={"q": "baking"})
+    assert response.json()["items"] == []
+
+
+@pytest.mark.asyncio
+async def test_search_endpoint_bad_cursor(client: AsyncClient):
+    """Test a malformed cursor is a client error."""
+    response = await client.get("/books/search", params={"q": "x", "cursor": "!!"})
+    assert response.status_code == 400
@@ -0,0 +1,99 @@
+import mmap
+import multiprocessing
+import os
+import shutil
+import time
+
+import numpy as np
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import book_vectors, shared_state
+from app.models import Book
+
+
+def _file_backed(array) -> bool:
+    while array is not None and not isinstance(array, (np.memmap, mmap.mmap)):
+        array = getattr(array, "base", None)
+    return array is not None
+
+
+def _worker(shared_dir: str, log: str, version: int) -> list[int]:
+    """Runs in a separate process, like one API worker asking for the artefact."""
+    from app.config import settings
+
+    settings.shared_state_dir = shared_dir
+
+    def build():
+        with open(log, "a") as f:
+            f.write(f"{os.getpid()}\n")
+        time.sleep(0.2)  # let the other workers pile up on the lock
+        return {"values": np.arange(5, dtype=np.int64) * version}
+
+    arrays = shared_state.load_or_build("demo", version, build)
+    assert isinstance(arrays["values"], np.memmap)
+    return arrays["values"].tolist()
+
+
+def test_artefact_built_once_across_processes(tmp_path):
+    """Test concurrent worker processes build an artefact once and all map the same data."""
+    shared, log = str(tmp_path / "shared"), str(tmp_path / "builds.log")
+    with multiprocessing.get_context("spawn").Pool(3) as pool:
+        results = pool.starmap(_worker, [(shared, log, 7)] * 3)
+    assert results == [[0, 7, 14, 21, 28]] * 3
+    with open(log) as f:
+        assert len(f.readlines()) == 1
+
+    _worker(shared, log, 8)
+    assert sorted(os.listdir(shared)) == [".demo.lock", "demo-8"]
+
+
+def test_load_races_removal_of_an_old_version(tmp_path, monkeypatch):
+    """Test a version removed between listing and mapping it reads as missing, and is then rebuilt."""
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "shared_state_dir", str(tmp_path))
+    shared_state.load_or_build("demo", 1, lambda: {"values": np.arange(3)})
+    real_load, raced = np.load, []
+
+    def load_after_removal(path, **kwargs):
+        if not raced:  # another worker published version 2 and removed version 1 just now
+            raced.append(path)
+            shutil.rmtree(os.path.dirname(path))
+        return real_load(path, **kwargs)
+
+    monkeypatch.setattr(np, "load", load_after_removal)
+    assert shared_state.load("demo", 1) is None
+    arrays = shared_state.load_or_build("demo", 1, lambda: {"values": np.arange(3) * 2})
+    assert arrays["values"].tolist() == [0, 2, 4]
+
+
+@pytest.mark.asyncio
+async def test_book_vectors_follow_catalog_version(client: AsyncClient, auth_headers: dict, db_session: AsyncSession):
+    """Test the shared vectors are rebuilt when the catalogue version moves, and drive similar books."""
+    first = (await client.post("/books", headers=auth_headers, data={"title": "Dragon riders of the north"})).json()
+    vectors = await book_vectors.get_book_vectors(db_session)
+    assert len(vectors) == 1
+    assert await book_vectors.get_book_vectors(db_session) is vectors
+
+    second = (await client.post("/books", headers=auth_headers, data={"title": "Dragon riders return"})).json()
+    vectors = await book_vectors.get_book_vectors(db_session)
+    assert len(vectors) == 2
+    assert _file_backed(vectors.matrix.data)
+
+    similar = (await client.get(f"/recommendations/similar/{first['id']}")).json()
+    assert [b["id"] for b in similar] == [second["id"]]
+    assert similar[0]["score"] > 0
+
+
+@pytest.mark.asyncio
+async def test_similarity_to_profile(db_session: AsyncSession):
+    """Test the user-profile similarity excludes the profile's own books."""
+    db_session.add_all([Book(title="Space opera fleet"), Book(title="Space fleet battles"), Book(title="Garden roses")])
+    await db_session.commit()
+    vectors = await book_vectors.get_book_vectors(db_session)
+    space, fleet, garden = (int(i) for i in sorted(vectors.book_ids))
+    scores = vectors.similarity_to({space})
+    assert space not in scores
+    assert scores[fleet] > scores[garden]
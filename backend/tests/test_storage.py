@@ -1,9 +1,14 @@
-import pytest
-import tempfile
+import asyncio
 import os
+import tempfile
+import threading
 from io import BytesIO
-from app.storage.local import LocalStorage
+
+import pytest
+
 from app.storage.base import StorageBackend
+from app.storage.cached import CachedStorage
+from app.storage.local import LocalStorage
 
 
 @pytest.mark.asyncio
@@ -59,3 +64,194 @@ async def test_local_storage_nonexistent_file():
         storage = LocalStorage(root=tmpdir)
         retrieved = await storage.get("nonexistent/file.txt")
         assert retrieved is None
+
+
+class StandInStore(StorageBackend):
+    """An object store in memory that counts fetches and can hold them until released."""
+
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+        self.gets = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def put(self, key, content, content_type=""):
+        self.objects[key] = content.read()
+        return key
+
+    async def get(self, key):
+        self.gets += 1
+        await self.release.wait()
+        return self.objects.get(key)
+
+    async def delete(self, key):
+        return self.objects.pop(key, None) is not None
+
+
+def _cached(tmp_path, backend, max_bytes=1000, memory_max_bytes=100, memory_object_max_bytes=10) -> CachedStorage:
+    return CachedStorage(backend, str(tmp_path / "cache"), max_bytes, memory_max_bytes, memory_object_max_bytes)
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_serves_repeat_reads_locally(tmp_path):
+    """Test small objects come from memory, large ones from disk, and a restart keeps the disk tier."""
+    store = StandInStore()
+    await store.put("small", BytesIO(b"tiny"))
+    await store.put("large", BytesIO(b"x" * 50))
+    cached = _cached(tmp_path, store)
+    for _ in range(3):
+        assert await cached.get("small") == b"tiny"
+        assert await cached.get("large") == b"x" * 50
+    assert store.gets == 2
+    assert cached.stats["memory_objects"] == 1 and cached.stats["disk_objects"] == 2
+
+    restarted = _cached(tmp_path, store)
+    assert await restarted.get("large") == b"x" * 50
+    assert store.gets == 2
+    assert await restarted.get("missing") is None
+    assert await restarted.get("missing") is None
+    assert store.gets == 4  # absent keys are not cached
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_single_flight(tmp_path):
+    """Test concurrent misses for one key make one backend fetch, even if a waiter is cancelled."""
+    store = StandInStore()
+    await store.put("book", BytesIO(b"content" * 10))
+    cached = _cached(tmp_path, store)
+    store.release.clear()
+    readers = [asyncio.ensure_future(cached.get("book")) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    readers[0].cancel()
+    store.release.set()
+    results = await asyncio.gather(*readers[1:])
+    assert results == [b"content" * 10] * 4
+    assert store.gets == 1
+    assert cached.stats["inflight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_evicts_least_recently_used_bytes(tmp_path):
+    store = StandInStore()
+    for key in "abc":
+        await store.put(key, BytesIO(key.encode() * 40))
+    cached = _cached(tmp_path, store, max_bytes=100, memory_max_bytes=0)
+    await cached.get("a")
+    await cached.get("b")
+    await cached.get("a")  # b is now the least recently used
+    await cached.get("c")
+    assert cached.stats["disk_bytes"] == 80
+    assert len(os.listdir(tmp_path / "cache")) == 2
+    store.gets = 0
+    await cached.get("a")
+    await cached.get("b")
+    assert store.gets == 1
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_drops_corrupt_files_and_writes(tmp_path):
+    """Test a cached file that no longer matches its hash is refetched, and writes invalidate."""
+    store = StandInStore()
+    await store.put("book", BytesIO(b"y" * 50))
+    cached = _cached(tmp_path, store)
+    await cached.get("book")
+    (name,) = os.listdir(tmp_path / "cache")
+    (tmp_path / "cache" / name).write_bytes(b"y" * 20)
+    assert await cached.get("book") == b"y" * 50
+    assert store.gets == 2
+
+    await cached.put("book", BytesIO(b"z" * 50))
+    assert await cached.get("book") == b"z" * 50
+    await cached.delete("book")
+    assert await cached.get("book") is None
+    assert os.listdir(tmp_path / "cache") == []
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_does_not_cache_a_fetch_raced_by_a_write(tmp_path):
+    store = StandInStore()
+    await store.put("book", BytesIO(b"old" * 20))
+    cached = _cached(tmp_path, store)
+    store.release.clear()
+    reader = asyncio.ensure_future(cached.get("book"))
+    await asyncio.sleep(0.01)
+    await cached.put("book", BytesIO(b"new" * 20))
+    store.release.set()
+    await reader
+    assert await cached.get("book") == b"new" * 20
+
+
+def test_get_storage_adds_cache_when_configured(monkeypatch, tmp_path):
+    from app.config import settings
+    from app.deps import get_storage
+
+    monkeypatch.setattr(settings, "local_storage_path", str(tmp_path / "files"))
+    assert not isinstance(get_storage(), CachedStorage)
+    monkeypatch.setattr(settings, "storage_cache_dir", str(tmp_path / "cache"))
+    storage = get_storage()
+    assert isinstance(storage, CachedStorage) and storage.cache_dir == str(tmp_path / "cache")
+
+
+@pytest.fixture
+def s3_stub(monkeypatch):
+    """The in-memory S3 stand-in on a free local port, with dummy credentials for signing."""
+    from benchmarks.load import StubServer
+    from benchmarks.s3_stub import S3StubConfig, create_s3_stub_app
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "stub")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "stub")
+    config = S3StubConfig()
+    with StubServer(config, app=create_s3_stub_app(config)) as server:
+        yield config, server.url
+
+
+@pytest.mark.asyncio
+async def test_s3_storage_against_stand_in(s3_stub):
+    """Test put/get/delete/delete_many through boto3 share one client and a few pooled connections."""
+    from app.storage.s3 import S3Storage
+
+    config, url = s3_stub
+    storage = S3Storage(bucket="books", endpoint_url=url, max_connections=4)
+    await storage.check()
+    await storage.put("books/a.txt", BytesIO(b"hello"), "text/plain")
+    assert await storage.get("books/a.txt") == b"hello"
+    assert await storage.get("books/missing.txt") is None
+    await asyncio.gather(*(storage.put(f"bulk/{i}", BytesIO(b"x" * 100)) for i in range(12)))
+    assert await storage.delete_many([f"bulk/{i}" for i in range(12)] + ["bulk/0"]) == 12
+    assert await storage.delete("books/a.txt") is True
+    assert config.objects == {}
+    assert storage._client() is storage._client()
+    assert len(config.connections) <= 4 < config.requests
+    storage.close()
+
+
+class ThreadGatedStore(StandInStore):
+    """StandInStore whose fetches wait on a threading.Event, so loops in any thread can use it."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = threading.Event()
+
+    async def get(self, key):
+        self.gets += 1
+        await asyncio.to_thread(self.gate.wait, 5)
+        return self.objects.get(key)
+
+
+@pytest.mark.asyncio
+async def test_cached_storage_serves_a_background_thread_loop(tmp_path):
+    """Test a get from another thread's event loop, during a miss on this loop, fetches on its own loop."""
+    store = ThreadGatedStore()
+    await store.put("book", BytesIO(b"content" * 10))
+    cached = _cached(tmp_path, store)
+    reader = asyncio.ensure_future(cached.get("book"))
+    await asyncio.sleep(0.01)
+    from_thread = []
+    thread = threading.Thread(target=lambda: from_thread.append(asyncio.run(cached.get("book"))))
+    thread.start()
+    await asyncio.sleep(0.05)
+    store.gate.set()
+    assert await reader == b"content" * 10
+    await asyncio.to_thread(thread.join, 5)
+    assert from_thread == [b"content" * 10]
+    assert cached.stats["inflight"] == 0 and cached.stats["disk_objects"] == 1
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+
+from app.llm.mock import MockLLM
+from app.models import Book
+from app.summarization import (
+    TEXT_READ_SIZE,
+    get_progress,
+    iter_chunks,
+    iter_document_text,
+    reduce_summaries,
+    summarize_document,
+)
+
+
+class RecordingLLM(MockLLM):
+    def __init__(self):
+        self.summarized: list[str] = []
+        self.combined: list[list[str]] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def summarize(self, text: str) -> str:
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.001)
+        self.running -= 1
+        self.summarized.append(text)
+        return f"S({text.split()[0]})"
+
+    async def combine_summaries(self, summaries: list[str]) -> str:
+        self.combined.append(summaries)
+        return "+".join(summaries)
+
+
+def test_iter_document_text_reads_whole_file_across_blocks():
+    """Test text files are read past the old truncation limit without splitting characters."""
+    content = ("é" * (TEXT_READ_SIZE // 2 + 7) + " end").encode()
+    text = "".join(iter_document_text(content, "book.txt"))
+    assert text.endswith(" end")
+    assert text.count("é") == TEXT_READ_SIZE // 2 + 7
+
+
+def test_iter_document_text_skips_unusable_content():
+    """Test tiny and raw-PDF content yield nothing."""
+    assert list(iter_document_text(b"short", "a.txt")) == []
+    assert list(iter_document_text(b"%PDF-1.4" + b"x" * 100, "a.txt")) == []
+
+
+def test_iter_chunks_breaks_on_whitespace():
+    """Test chunks stay under the size and keep every word."""
+    words = [f"w{i}" for i in range(500)]
+    chunks = list(iter_chunks(iter([" ".join(words[:250]) + " ", " ".join(words[250:])]), 100))
+    assert all(len(c) <= 100 for c in chunks)
+    assert " ".join(chunks).split() == words
+
+
+@pytest.mark.asyncio
+async def test_summarize_document_map_reduce(monkeypatch):
+    """Test every chunk is summarised under the concurrency cap and reduced in order."""
+    from app import summarization
+
+    monkeypatch.setattr(summarization.settings, "summary_concurrency", 2)
+    monkeypatch.setattr(summarization, "REDUCE_BATCH", 3)
+    llm = RecordingLLM()
+    chunks = [f"chunk{i} unique-{id(llm)} text" for i in range(7)]
+    summary = await summarize_document(llm, iter(chunks), book_id=900004)
+    assert llm.max_running <= 2
+    assert len(llm.summarized) == 7
+    assert summary == "+".join(f"S(chunk{i})" for i in range(7))
+    assert [len(batch) for batch in llm.combined] == [3, 3, 3]
+    progress = get_progress(900004)
+    assert progress.status == "done"
+    assert progress.chunks_extracted == progress.chunks_summarized == 7
+
+
+@pytest.mark.asyncio
+async def test_summarize_document_uses_chunk_cache():
+    """Test repeated chunks are served from the hash cache."""
+    llm = RecordingLLM()
+    chunks = [f"cached-chunk-{id(llm)} a", f"cached-chunk-{id(llm)} b"]
+    await summarize_document(llm, iter(chunks), book_id=900001)
+    await summarize_document(llm, iter(chunks), book_id=900002)
+    assert len(llm.summarized) == 2
+    assert get_progress(900002).chunks_cached == 2
+
+
+@pytest.mark.asyncio
+async def test_summarize_document_no_text():
+    """Test an empty document produces no summary."""
+    assert await summarize_document(RecordingLLM(), iter([]), book_id=900003) is None
+    assert get_progress(900003).status == "no_text"
+
+
+@pytest.mark.asyncio
+async def test_reduce_summaries_single_partial():
+    """Test a single partial summary is returned without another LLM call."""
+    llm = RecordingLLM()
+    assert await reduce_summaries(llm, ["only"]) == "only"
+    assert llm.combined == []
+
+
+@pytest.mark.asyncio
+async def test_summary_progress_endpoint(client: AsyncClient, test_book: Book):
+    """Test progress falls back to the stored summary state."""
+    response = await client.get(f"/books/{test_book.id}/summary/progress")
+    assert response.status_code == 200
+    assert response.json()["status"] == "not_started"
+
+    response = await client.get("/books/99999/summary/progress")
+    assert response.status_code == 404
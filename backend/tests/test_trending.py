@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Book, BookPopularity, Borrow, User
+from app.trending import decay_factor, rebuild_popularity, record_event, refresh_trending
+
+
+@pytest.fixture
+async def books(db_session: AsyncSession) -> list[Book]:
+    rows = [Book(title=f"Book {i}", genre="Fiction" if i % 2 else "Poetry") for i in range(3)]
+    db_session.add_all(rows)
+    await db_session.commit()
+    return rows
+
+
+def test_decay_factor_halves_per_half_life():
+    """Test a counter loses half its weight every half-life."""
+    assert decay_factor(0, 24) == 1.0
+    assert decay_factor(24 * 3600, 24) == pytest.approx(0.5)
+    assert decay_factor(72 * 3600, 24) == pytest.approx(0.125)
+
+
+@pytest.mark.asyncio
+async def test_borrow_feeds_trending(client: AsyncClient, auth_headers: dict, db_session: AsyncSession, books: list[Book]):
+    """Test borrows bump the counters and the refreshed top-K serves GET /books/trending."""
+    ids = [b.id for b in books]
+    await client.post(f"/books/{ids[2]}/borrow", headers=auth_headers)
+    await record_event(db_session, ids[1], borrows=1, reviews=1)
+    await db_session.commit()
+    assert (await client.get("/books/trending")).json()["items"] == []
+
+    assert await refresh_trending(db_session) == 2
+    await db_session.commit()
+    data = (await client.get("/books/trending")).json()
+    assert [b["id"] for b in data["items"]] == [ids[1], ids[2]]
+    assert data["items"][0]["score"] == 3.0
+    assert data["computed_at"] is not None
+    poetry = (await client.get("/books/trending", params={"genre": "Poetry"})).json()["items"]
+    assert [b["id"] for b in poetry] == [ids[2]]
+
+
+@pytest.mark.asyncio
+async def test_refresh_decays_and_prunes(db_session: AsyncSession, books: list[Book]):
+    """Test each refresh decays by the time since the last one and drops faded counters."""
+    start = datetime(2025, 3, 1)
+    await record_event(db_session, books[0].id, borrows=1)
+    await refresh_trending(db_session, now=start)
+    await refresh_trending(db_session, now=start + timedelta(hours=72))
+    await db_session.commit()
+    score = (await db_session.execute(select(BookPopularity.borrow_score))).scalar_one()
+    assert score == pytest.approx(decay_factor(72 * 3600))
+
+    assert await refresh_trending(db_session, now=start + timedelta(days=60)) == 0
+    await db_session.commit()
+    assert (await db_session.execute(select(BookPopularity))).first() is None
+
+
+@pytest.mark.asyncio
+async def test_rebuild_from_history(db_session: AsyncSession, test_user: User, books: list[Book]):
+    """Test the backfill weights past borrows by their age."""
+    now = datetime(2025, 3, 10)
+    db_session.add_all(
+        [
+            Borrow(user_id=test_user.id, book_id=books[0].id, borrowed_at=now - timedelta(hours=72)),
+            Borrow(user_id=test_user.id, book_id=books[1].id, borrowed_at=now),
+        ]
+    )
+    await db_session.commit()
+    assert await rebuild_popularity(db_session, now=now) == 2
+    await db_session.commit()
+    rows = dict((await db_session.execute(select(BookPopularity.book_id, BookPopularity.borrow_score))).all())
+    assert rows[books[1].id] == pytest.approx(1.0)
+    assert rows[books[0].id] == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio
+async def test_cold_start_recommendations_use_popularity(
+    client: AsyncClient, auth_headers: dict, db_session: AsyncSession, books: list[Book]
+):
+    """Test a user without borrows gets popular books first."""
+    await record_event(db_session, books[0].id, borrows=5)
+    await db_session.commit()
+    data = (await client.get("/recommendations", headers=auth_headers)).json()
+    assert data[0]["id"] == books[0].id
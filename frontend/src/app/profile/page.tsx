@@ -1,23 +1,41 @@
 'use client'
 
 import { useState, useEffect } from 'react'
+import Link from 'next/link'
 import { useRouter } from 'next/navigation'
 import toast from 'react-hot-toast'
 import { useAuth } from '@/lib/auth-context'
-import { api } from '@/lib/api'
-import { IconLoader2, IconUser } from '@tabler/icons-react'
+import { api, type BorrowHistoryItem } from '@/lib/api'
+import { IconBook, IconLoader2, IconUser } from '@tabler/icons-react'
 
 export default function ProfilePage() {
   const { user, loading, refresh } = useAuth()
   const router = useRouter()
   const [fullName, setFullName] = useState('')
   const [err, setErr] = useState('')
+  const [borrows, setBorrows] = useState<BorrowHistoryItem[]>([])
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
 
   useEffect(() => {
     if (!loading && !user) router.push('/login')
     if (user) setFullName(user.full_name || '')
   }, [user, loading, router])
 
+  // One request per page of history, books included
+  async function loadBorrows(cursor: string | null = null) {
+    try {
+      const page = await api.me.borrows({ cursor })
+      setBorrows((prev) => (cursor ? [...prev, ...page.items] : page.items))
+      setNextCursor(page.next_cursor)
+    } catch (e) {
+      toast.error(e instanceof Error ? e.message : 'Could not load your borrows')
+    }
+  }
+
+  useEffect(() => {
+    if (user) loadBorrows()
+  }, [user])
+
   async function handleSubmit(e: React.FormEvent) {
     e.preventDefault()
     setErr('')
@@ -79,6 +97,33 @@ export default function ProfilePage() {
           </button>
         </form>
       </div>
+      <div className="card mt-6">
+        <div className="mb-4 flex items-center gap-3">
+          <IconBook className="h-5 w-5 text-primary-600" />
+          <h2 className="text-lg font-semibold text-slate-800">My borrows</h2>
+        </div>
+        {borrows.length === 0 ? (
+          <p className="text-muted">Nothing borrowed yet.</p>
+        ) : (
+          <ul className="divide-y divide-surface-border">
+            {borrows.map((b) => (
+              <li key={b.id} className="flex items-center justify-between py-2.5">
+                <Link href={`/books/${b.book.id}`} className="text-slate-700 hover:text-primary-600">
+                  {b.book.title}
+                </Link>
+                <span className="text-sm text-muted">
+                  {b.returned_at ? `Returned ${new Date(b.returned_at).toLocaleDateString()}` : 'Borrowed'}
+                </span>
+              </li>
+            ))}
+          </ul>
+        )}
+        {nextCursor && (
+          <button type="button" onClick={() => loadBorrows(nextCursor)} className="btn-secondary mt-4 w-full">
+            Load more
+          </button>
+        )}
+      </div>
     </div>
   )
 }
@@ -74,6 +74,33 @@ describe('API Client', () => {
     })
   })
 
+  describe('me', () => {
+    it('borrows passes filters and cursor in one request', async () => {
+      ;(global.fetch as jest.Mock).mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({ items: [], next_cursor: null }),
+      })
+
+      await api.me.borrows({ active: true, limit: 10, cursor: 'abc=' })
+
+      expect(global.fetch).toHaveBeenCalledWith(
+        expect.stringContaining('/me/borrows?active=true&limit=10&cursor=abc%3D'),
+        expect.any(Object)
+      )
+    })
+
+    it('reviews without options has no query string', async () => {
+      ;(global.fetch as jest.Mock).mockResolvedValueOnce({
+        ok: true,
+        json: async () => ({ items: [], next_cursor: null }),
+      })
+
+      await api.me.reviews()
+
+      expect(global.fetch).toHaveBeenCalledWith(expect.stringMatching(/\/me\/reviews$/), expect.any(Object))
+    })
+  })
+
   describe('books', () => {
     it('list makes correct request', async () => {
       ;(global.fetch as jest.Mock).mockResolvedValueOnce({
@@ -103,6 +130,23 @@ describe('API Client', () => {
       )
     })
 
+    it('batch uses GET for a few ids and POST for many', async () => {
+      ;(global.fetch as jest.Mock).mockResolvedValue({
+        ok: true,
+        json: async () => ({ items: [], missing: [] }),
+      })
+
+      await api.books.batch([3, 1, 2])
+      expect(global.fetch).toHaveBeenCalledWith(expect.stringContaining('/books/batch?ids=3,1,2'), expect.any(Object))
+
+      const ids = Array.from({ length: 120 }, (_, i) => i + 1)
+      await api.books.batch(ids)
+      expect(global.fetch).toHaveBeenLastCalledWith(
+        expect.stringMatching(/\/books\/batch$/),
+        expect.objectContaining({ method: 'POST', body: JSON.stringify({ ids }) })
+      )
+    })
+
     it('create uses FormData', async () => {
       const formData = new FormData()
       formData.append('title', 'Test Book')
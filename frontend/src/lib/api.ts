@@ -54,6 +54,20 @@ export type BookDetail = Book & {
   my_review?: { rating: number; text: string | null } | null
 }
 export type Review = { id: number; user_id: number; book_id: number; rating: number; text: string | null; created_at: string }
+export type BorrowHistoryItem = { id: number; borrowed_at: string; returned_at: string | null; book: Book }
+export type ReviewHistoryItem = { id: number; rating: number; text: string | null; created_at: string; book: Book }
+export type Page<T> = { items: T[]; next_cursor: string | null }
+
+// Longer id lists than this go in a POST body rather than the URL
+const BATCH_GET_MAX = 50
+
+function pageQuery(params: Record<string, string | number | boolean | undefined | null>) {
+  const query = Object.entries(params)
+    .filter(([, v]) => v != null)
+    .map(([k, v]) => `${k}=${encodeURIComponent(String(v))}`)
+    .join('&')
+  return query ? `?${query}` : ''
+}
 
 export const api = {
   auth: {
@@ -71,6 +85,10 @@ export const api = {
         `/books?skip=${skip}&limit=${limit}`
       ),
     get: (id: number) => request<BookDetail>(`/books/${id}`),
+    batch: (ids: number[]) =>
+      ids.length <= BATCH_GET_MAX
+        ? request<{ items: BookDetail[]; missing: number[] }>(`/books/batch?ids=${ids.join(',')}`)
+        : request<{ items: BookDetail[]; missing: number[] }>('/books/batch', { method: 'POST', body: { ids } }),
     create: (form: FormData) => formRequest<Book>('/books', form),
     update: (id: number, data: { title?: string; author?: string; genre?: string }) =>
       request<Book>(`/books/${id}`, { method: 'PUT', body: data }),
@@ -92,6 +110,12 @@ export const api = {
       return res.blob()
     },
   },
+  me: {
+    borrows: (opts: { active?: boolean; limit?: number; cursor?: string | null } = {}) =>
+      request<Page<BorrowHistoryItem>>(`/me/borrows${pageQuery(opts)}`),
+    reviews: (opts: { limit?: number; cursor?: string | null } = {}) =>
+      request<Page<ReviewHistoryItem>>(`/me/reviews${pageQuery(opts)}`),
+  },
   recommendations: {
     list: () => request<{ id: number; title: string; author: string | null; genre: string | null }[]>('/recommendations'),
     suggestions: (limit?: number) =>